@@ -2,11 +2,11 @@ import subprocess
 import streamlit as st
 from typing import Dict, Any
 import logging
-import base64
 from menu_generator import RestaurantMenuGenerator
+from menu_pool import GeneratorPool
 # from secret_key import API_KEY as api_key  # Removed import of API_KEY from file
 from menu_utils import MenuParser, format_menu_for_display
-import os
+from background import set_background
 
 # Set page configuration
 st.set_page_config(
@@ -15,40 +15,37 @@ st.set_page_config(
     layout="wide"
 )
 
-# Function to set background image
-def set_background(image_path):
-    with open(image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode()
-    css_code = f"""
-    <style>
-    .stApp {{
-        background-image: url(data:image/png;base64,{encoded_string});
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-    }}
-    </style>
-    """
-    st.markdown(css_code, unsafe_allow_html=True)
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # Path to your background image
 image_path = "image.png"  # Replace with your local image path
 set_background(image_path)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+
+@st.cache_resource
+def get_generator_pool() -> GeneratorPool:
+    """Return the process-wide pool of warm generators, keyed by API key."""
+    return GeneratorPool(max_size=32, idle_ttl=30 * 60)
+
+
+def get_generator(api_key: str) -> RestaurantMenuGenerator:
+    """
+    Borrow the generator for an API key. Sessions entering the same key share
+    one warm LLM client, which is dropped only after 30 idle minutes.
+    """
+    return get_generator_pool().get(api_key)
 
 
 def initialize_session_state(api_key):
     """Initialize session state variables if they don't exist."""
-    if 'generator' not in st.session_state:
-        try:
-            st.session_state.generator = RestaurantMenuGenerator(key=api_key)
-        except Exception as e:
-            logger.error(f"Failed to initialize generator: {str(e)}")
-            st.error("Failed to initialize the menu generator. Please check your API key.")
-            return False
+    try:
+        get_generator(api_key)
+    except Exception as e:
+        logger.error(f"Failed to initialize generator: {str(e)}")
+        st.error("Failed to initialize the menu generator. Please check your API key.")
+        return False
     if 'last_menu' not in st.session_state:
         st.session_state.last_menu = None
     return True
@@ -142,7 +139,7 @@ def main():
     if inputs["generate_button"]:
         with st.spinner("Generating your restaurant menu..."):
             try:
-                menu_response = st.session_state.generator.generate_menu(
+                menu_response = get_generator(api_key).generate_menu(
                     cuisine=inputs["cuisine"],
                     diets=inputs["diet_options"],
                     no_of_items=inputs["items_per_section"]
@@ -0,0 +1,104 @@
+# menu_pool.py
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import threading
+import time
+
+from menu_generator import RestaurantMenuGenerator
+
+
+@dataclass
+class PoolStats:
+    """Counters describing how often sessions reused a warm generator."""
+    created: int = 0
+    reused: int = 0
+    evicted: int = 0
+
+
+class GeneratorPool:
+    """
+    Process-wide pool of RestaurantMenuGenerator instances keyed by API key.
+
+    Sessions borrow the generator for their key instead of building their own,
+    so every session using the same key shares one LLM client and its open
+    connections. The pool holds at most max_size generators, dropping the
+    least recently used one when full and any that have been idle for longer
+    than idle_ttl seconds.
+    """
+
+    def __init__(self,
+                 max_size: int = 32,
+                 idle_ttl: Optional[float] = 30 * 60,
+                 **generator_kwargs: Any):
+        if max_size < 1:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.generator_kwargs = generator_kwargs
+        self._generators: "OrderedDict[str, RestaurantMenuGenerator]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._stats = PoolStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _pool_key(api_key: str) -> str:
+        # Keep a digest rather than the raw key as the lookup key
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def get(self, api_key: str) -> RestaurantMenuGenerator:
+        """
+        Return the warm generator for an API key, creating it on first use.
+
+        Args:
+            api_key (str): API key the generator's LLM client authenticates with
+
+        Returns:
+            RestaurantMenuGenerator: Generator shared by every caller with this key
+
+        Raises:
+            ValueError: If the API key is empty
+        """
+        if not api_key:
+            raise ValueError("API key must be a non-empty string")
+        pool_key = self._pool_key(api_key)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            generator = self._generators.get(pool_key)
+            if generator is not None:
+                self._generators.move_to_end(pool_key)
+                self._stats.reused += 1
+            else:
+                generator = RestaurantMenuGenerator(key=api_key, **self.generator_kwargs)
+                self._generators[pool_key] = generator
+                self._stats.created += 1
+                while len(self._generators) > self.max_size:
+                    oldest, _ = self._generators.popitem(last=False)
+                    del self._last_used[oldest]
+                    self._stats.evicted += 1
+            self._last_used[pool_key] = now
+            return generator
+
+    def evict_idle(self) -> int:
+        """Drop generators idle for longer than idle_ttl; return how many were dropped."""
+        with self._lock:
+            return self._evict_idle(time.monotonic())
+
+    def _evict_idle(self, now: float) -> int:
+        if self.idle_ttl is None:
+            return 0
+        idle = [key for key, last_used in self._last_used.items() if now - last_used > self.idle_ttl]
+        for key in idle:
+            del self._generators[key]
+            del self._last_used[key]
+        self._stats.evicted += len(idle)
+        return len(idle)
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            return PoolStats(**vars(self._stats))
+
+    def __len__(self) -> int:
+        return len(self._generators)
@@ -0,0 +1,85 @@
+# background.py
+"""
+Page background for the Streamlit dashboards.
+
+Culinary Canvas deploy is deployed on its own and keeps an identical copy
+of this module, so both apps encode and cache the image the same way; keep
+the two in sync.
+
+BACKGROUND_MODE picks how the image is delivered: "inline" embeds the
+original image as a data URI, "webp" embeds a downscaled WebP copy, and
+"static" serves that copy from ./static. Static mode needs
+server.enableStaticServing = true in .streamlit/config.toml, which the
+apps leave off by default; without it the WebP copy is embedded instead.
+"""
+from typing import Tuple
+import base64
+import io
+import logging
+import os
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_MODE = "webp"
+BACKGROUND_MAX_WIDTH = 1920
+BACKGROUND_QUALITY = 80
+STATIC_DIR = "static"
+
+
+def _encode_background(image_path: str, mode: str) -> Tuple[bytes, str]:
+    """Return the image bytes and MIME type to use for the given mode."""
+    with open(image_path, "rb") as image_file:
+        data = image_file.read()
+    if mode == "inline":
+        return data, "image/png"
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow is not installed; using the original background image")
+        return data, "image/png"
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width > BACKGROUND_MAX_WIDTH:
+            height = round(image.height * BACKGROUND_MAX_WIDTH / image.width)
+            image = image.resize((BACKGROUND_MAX_WIDTH, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=BACKGROUND_QUALITY)
+    return buffer.getvalue(), "image/webp"
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_background_css(image_path: str, mtime: float, mode: str) -> str:
+    """
+    Build the background CSS once per process. The file's mtime is part of
+    the cache key, so replacing the image invalidates the cached CSS.
+    """
+    if mode == "static" and not st.get_option("server.enableStaticServing"):
+        logger.warning("server.enableStaticServing is off; embedding the background instead of serving it")
+        mode = "webp"
+    data, mime = _encode_background(image_path, mode)
+    if mode == "static":
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        name = f"background_{int(mtime)}.webp" if mime == "image/webp" else os.path.basename(image_path)
+        with open(os.path.join(STATIC_DIR, name), "wb") as static_file:
+            static_file.write(data)
+        url = f"app/static/{name}"
+    else:
+        url = f"data:{mime};base64,{base64.b64encode(data).decode()}"
+    logger.info(f"Built {mode} background CSS ({len(data) // 1024} KiB image)")
+    return f"""
+    <style>
+    .stApp {{
+        background-image: url({url});
+        background-size: cover;
+        background-position: center;
+        background-attachment: fixed;
+    }}
+    </style>
+    """
+
+
+def set_background(image_path: str, mode: str = BACKGROUND_MODE) -> None:
+    """Use an image as the page background, in one of the BACKGROUND_MODE delivery modes."""
+    css_code = build_background_css(image_path, os.path.getmtime(image_path), mode)
+    st.markdown(css_code, unsafe_allow_html=True)
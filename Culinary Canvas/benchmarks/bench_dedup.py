@@ -0,0 +1,78 @@
+# bench_dedup.py
+"""
+Measure near-duplicate detection throughput on a large synthetic corpus.
+
+Items are random dish names and descriptions, with a share of them reworded
+copies of earlier items. Reports fingerprinting and matching rates and how
+many of the planted duplicates were found:
+
+    python benchmarks/bench_dedup.py --items 300000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from menu_dedup import MenuDeduplicator  # noqa: E402
+
+SYLLABLES = "ka ri mo ta la se po ni chu ba gu de fe zo qui ran tel mar sol ven".split()
+FILLERS = ["crispy", "house", "classic", "our", "fresh"]
+
+
+def vocabulary(rng: random.Random, size: int):
+    """Made-up words, so unrelated synthetic dishes share no more than real ones do."""
+    return list({"".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(size)})
+
+
+def synthetic_items(rng: random.Random, count: int, duplicate_share: float):
+    words = vocabulary(rng, 20000)
+    items, planted = [], 0
+    for index in range(count):
+        if items and rng.random() < duplicate_share:
+            name, description = rng.choice(items)
+            name = f"{rng.choice(FILLERS).title()} {name}"
+            description = " ".join(rng.sample(description.split(), len(description.split())))
+            planted += 1
+        else:
+            name = " ".join(word.title() for word in rng.sample(words, 3))
+            description = " ".join(rng.sample(words, 10))
+        items.append((name, description))
+    return items, planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Share of planted duplicates")
+    args = parser.parse_args()
+
+    items, planted = synthetic_items(random.Random(0), args.items, args.duplicates)
+    deduplicator = MenuDeduplicator()
+
+    start = time.perf_counter()
+    vectors = deduplicator.fingerprinter.embed_many(items)
+    embed_seconds = time.perf_counter() - start
+
+    index = deduplicator.new_index()
+    flagged = 0
+    start = time.perf_counter()
+    for offset in range(0, len(items), args.batch_size):
+        batch = items[offset:offset + args.batch_size]
+        ids = list(range(offset, offset + len(batch)))
+        matches = deduplicator.match_batch(ids, batch, index, vectors[offset:offset + len(batch)])
+        flagged += sum(match is not None for match in matches)
+    match_seconds = time.perf_counter() - start
+
+    print(f"Fingerprinted {len(items)} items in {embed_seconds:.1f}s "
+          f"({len(items) / embed_seconds:,.0f} items/s)")
+    print(f"Matched in {match_seconds:.1f}s ({len(items) / match_seconds:,.0f} items/s), "
+          f"index holds {len(index)} canonical items")
+    print(f"Flagged {flagged} duplicates, {planted} planted")
+
+
+if __name__ == "__main__":
+    main()
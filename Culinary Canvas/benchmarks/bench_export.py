@@ -0,0 +1,110 @@
+# bench_export.py
+"""
+Measure menu export throughput per format, streaming memory and parallel zip export.
+
+Menus come from the fake LLM backend, generated once and then repeated to
+the requested count. Each format is written to a null stream from a
+generator, timing the writer and recording the traced peak memory, which
+stays flat as the count grows because writers hold one menu at a time.
+export_zip is then timed with each worker count:
+
+    python benchmarks/bench_export.py
+    python benchmarks/bench_export.py --menus 5000 --workers 1 2 4 --output export.json
+"""
+from typing import Any, Dict, Iterator, List
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from llm_backends import FakeMenuLLM  # noqa: E402
+from menu_export import FORMATS, export_menus, export_zip  # noqa: E402
+from menu_generator import CUISINES, DIET_OPTIONS, MenuResponse, RestaurantMenuGenerator  # noqa: E402
+
+
+class NullStream(io.RawIOBase):
+    """Counts the bytes written to it and keeps none of them."""
+
+    def __init__(self):
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        return len(data)
+
+
+def sample_menus(count: int, items: int) -> List[MenuResponse]:
+    generator = RestaurantMenuGenerator(key="unused", llm=FakeMenuLLM(first_token_latency=0, seconds_per_char=0))
+    return [generator.generate_menu(CUISINES[index % len(CUISINES)], [DIET_OPTIONS[index % len(DIET_OPTIONS)]],
+                                    no_of_items=items)
+            for index in range(count)]
+
+
+def repeated(menus: List[MenuResponse], count: int) -> Iterator[MenuResponse]:
+    return itertools.islice(itertools.cycle(menus), count)
+
+
+def measure_format(menus: List[MenuResponse], count: int, fmt: str) -> Dict[str, float]:
+    stream = NullStream()
+    tracemalloc.start()
+    start = time.perf_counter()
+    export_menus(repeated(menus, count), stream, fmt)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'menus_per_s': count / elapsed, 'mb': stream.size / 1e6, 'peak_kb': peak / 1e3}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--menus", type=int, default=2000, help="Menus exported per measurement")
+    parser.add_argument("--distinct", type=int, default=40, help="Distinct menus generated and repeated")
+    parser.add_argument("--items", type=int, default=5, help="Items per section")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts for export_zip")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    menus = sample_menus(args.distinct, args.items)
+    results: Dict[str, Any] = {'menus': args.menus, 'formats': {}, 'zip': {}}
+    print(f"{args.menus} menus of {args.items} items per section")
+    print(f"{'format':<10} {'menus/s':>9} {'output':>9} {'peak mem':>10}")
+    for fmt in FORMATS:
+        # Half the count as well, to show the peak does not grow with it
+        half = measure_format(menus, args.menus // 2, fmt)
+        result = measure_format(menus, args.menus, fmt)
+        result['peak_kb_half'] = half['peak_kb']
+        results['formats'][fmt] = result
+        print(f"{fmt:<10} {result['menus_per_s']:9.0f} {result['mb']:7.1f}MB {result['peak_kb']:8.0f}KB "
+              f"({half['peak_kb']:.0f}KB at half)")
+
+    print(f"\nexport_zip, all formats ({os.cpu_count()} CPUs)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            path = os.path.join(tmp, f"menus-{workers}.zip")
+            start = time.perf_counter()
+            export_zip(repeated(menus, args.menus), path, workers=workers)
+            elapsed = time.perf_counter() - start
+            results['zip'][str(workers)] = {'seconds': elapsed, 'mb': os.path.getsize(path) / 1e6}
+            print(f"{workers:2d} workers {elapsed:7.2f}s {args.menus / elapsed:7.0f} menus/s "
+                  f"{os.path.getsize(path) / 1e6:6.1f}MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_load.py
+"""
+Load-test menu generation offline against the fake LLM backend.
+
+Fires concurrent agenerate_menu calls over a spread of cuisines, diets and
+menu sizes, each one parsed and validated as in production, and reports
+throughput and latency percentiles. The fake model is seeded, so two runs
+with the same arguments send the same requests and get the same menus:
+
+    python benchmarks/bench_load.py --requests 5000 --concurrency 500 --ttft 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from menu_generator import RestaurantMenuGenerator  # noqa: E402
+
+CUISINES = ["Indian", "Italian", "Mexican", "Thai", "Japanese", "Greek", "Lebanese", "French"]
+DIETS = ["Vegan", "Vegetarian", "Non-Vegetarian", "Gluten-Free", "Dairy-Free"]
+
+
+def workload(rng: random.Random, count: int) -> list:
+    return [(rng.choice(CUISINES), rng.sample(DIETS, rng.randint(1, 2)), rng.randint(1, 5))
+            for _ in range(count)]
+
+
+async def run_load(generator: RestaurantMenuGenerator, requests: list, concurrency: int) -> list:
+    """Return per-request latencies in seconds, never more than concurrency in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(cuisine, diets, no_of_items):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await generator.agenerate_menu(cuisine, diets, no_of_items)
+            latencies.append(time.perf_counter() - start)
+            assert response.parsed_menu
+
+    await asyncio.gather(*(one(*request) for request in requests))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--strategy", choices=RestaurantMenuGenerator.STRATEGIES, default="single")
+    parser.add_argument("--ttft", type=float, default=0.0,
+                        help="Simulated time to first token per LLM call (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative latency spread")
+    parser.add_argument("--malformed", type=float, default=0.0,
+                        help="Share of menus the fake model writes with loose formatting")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = RestaurantMenuGenerator(
+        key="unused", strategy=args.strategy, backend="fake",
+        backend_options={'first_token_latency': args.ttft, 'latency_jitter': args.jitter,
+                         'malformed_rate': args.malformed, 'seed': args.seed}
+    )
+    requests = workload(random.Random(args.seed), args.requests)
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run_load(generator, requests, args.concurrency))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"{len(latencies)} menus in {elapsed:.2f}s ({len(latencies) / elapsed:,.0f} req/s) "
+          f"at concurrency {args.concurrency}")
+    print(f"latency p50 {cuts[49] * 1000:.1f} ms  p95 {cuts[94] * 1000:.1f} ms  "
+          f"p99 {cuts[98] * 1000:.1f} ms  max {max(latencies) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# bench_model.py
+"""
+Compare the memory and serialization cost of MenuResponse with the dict-based representation it replaced.
+
+The menus are the recorded ones in benchmarks/corpus plus menus generated
+by the fake LLM backend. For each one a response is built both ways from the
+same parse: the legacy dataclass keeps parsed_menu and one dict per item as
+MenuParser returns them, the current MenuResponse keeps frozen MenuItem and
+MenuSection objects with DietaryTag bits. Memory is what holding one menu
+costs a session, measured with tracemalloc. Serialization is timed for the
+JSON the cache and store write, pickle (what Streamlit uses when session
+state has to be serialized) and the compact to_bytes codecs:
+
+    python benchmarks/bench_model.py
+    python benchmarks/bench_model.py --generated 50 --items 8 --output model.json
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import gc
+import glob
+import json
+import os
+import pickle
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+
+from llm_backends import FakeMenuLLM  # noqa: E402
+from menu_generator import DIET_OPTIONS, MenuResponse, RestaurantMenuGenerator  # noqa: E402
+from menu_model import msgpack  # noqa: E402
+from menu_utils import MenuParser  # noqa: E402
+
+CORPUS_DIR = os.path.join(HERE, "corpus")
+
+
+@dataclass
+class LegacyMenuResponse:
+    """MenuResponse as it was before menu_model: mutable, with dict items."""
+    cuisine: str
+    restaurant_name: str
+    menu: str
+    parsed_menu: List[Tuple[str, List[str]]]
+    sections: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'cuisine': self.cuisine,
+            'restaurant_name': self.restaurant_name,
+            'menu': self.menu,
+            'parsed_menu': [[heading, list(items)] for heading, items in self.parsed_menu],
+            'sections': self.sections,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LegacyMenuResponse":
+        return cls(data['cuisine'], data['restaurant_name'], data['menu'],
+                   [(heading, list(items)) for heading, items in data['parsed_menu']], data['sections'])
+
+
+def menu_texts(corpus_dir: str, generated: int, items: int) -> List[str]:
+    """Recorded menus, then menus from the fake backend with varied diets."""
+    texts = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    generator = RestaurantMenuGenerator(key="unused", llm=FakeMenuLLM(first_token_latency=0, seconds_per_char=0))
+    for index in range(generated):
+        diets = [DIET_OPTIONS[index % len(DIET_OPTIONS)], DIET_OPTIONS[(index * 7 + 3) % len(DIET_OPTIONS)]]
+        texts.append(generator.generate_menu("Thai", diets, no_of_items=items).menu)
+    return texts
+
+
+def build_legacy(text: str) -> LegacyMenuResponse:
+    parsed = MenuParser.parse(text)
+    return LegacyMenuResponse("Thai", "The Copper Hearth", text, parsed.parsed_menu, parsed.sections)
+
+
+def build_current(text: str) -> MenuResponse:
+    parsed = MenuParser.parse(text)
+    return MenuResponse.from_sections("Thai", "The Copper Hearth", text, parsed.sections,
+                                      parsed_menu=parsed.parsed_menu)
+
+
+def bytes_per_menu(build: Callable[[str], Any], texts: List[str], sessions: int) -> float:
+    """Traced memory retained per menu when every session holds its own copy of each menu."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # Slicing copies the text, so sessions do not share the menu string
+    held = [build(text[:-1] + text[-1:]) for _ in range(sessions) for text in texts]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained / len(held)
+
+
+def time_codec(encode: Callable[[Any], Any],
+               decode: Callable[[Any], Any],
+               responses: List[Any],
+               repeats: int) -> Dict[str, float]:
+    """Mean microseconds to encode and decode one menu, and mean encoded size."""
+    payloads = [encode(response) for response in responses]
+    encode_times, decode_times = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for response in responses:
+            encode(response)
+        encode_times.append((time.perf_counter() - start) / len(responses))
+        start = time.perf_counter()
+        for payload in payloads:
+            decode(payload)
+        decode_times.append((time.perf_counter() - start) / len(payloads))
+    return {
+        'encode_us': min(encode_times) * 1e6,
+        'decode_us': min(decode_times) * 1e6,
+        'bytes': statistics.mean(len(payload) for payload in payloads),
+    }
+
+
+def codecs() -> Dict[str, Tuple[str, Callable[[Any], Any], Callable[[Any], Any]]]:
+    """(representation, encode, decode) per serialization."""
+    result = {
+        'legacy json': ('legacy', lambda r: json.dumps(r.to_dict(), ensure_ascii=False).encode("utf-8"),
+                        lambda b: LegacyMenuResponse.from_dict(json.loads(b))),
+        'legacy pickle': ('legacy', pickle.dumps, pickle.loads),
+        'json': ('current', lambda r: json.dumps(r.to_dict(), ensure_ascii=False).encode("utf-8"),
+                 lambda b: MenuResponse.from_dict(json.loads(b))),
+        'pickle': ('current', pickle.dumps, pickle.loads),
+        'orjson compact': ('current', MenuResponse.to_bytes, MenuResponse.from_bytes),
+    }
+    if msgpack is not None:
+        result['msgpack compact'] = ('current', lambda r: r.to_bytes("msgpack"),
+                                     lambda b: MenuResponse.from_bytes(b, "msgpack"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="Directory of recorded menus (*.txt)")
+    parser.add_argument("--generated", type=int, default=20, help="Menus to generate with the fake backend")
+    parser.add_argument("--items", type=int, default=5, help="Items per section of the generated menus")
+    parser.add_argument("--sessions", type=int, default=200, help="Copies of every menu held for the memory test")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    texts = menu_texts(args.corpus, args.generated, args.items)
+    if not texts:
+        parser.error("No menus to measure")
+    responses = {'legacy': [build_legacy(text) for text in texts],
+                 'current': [build_current(text) for text in texts]}
+    for legacy, current in zip(responses['legacy'], responses['current']):
+        assert legacy.parsed_menu == current.parsed_menu
+        assert [item['name'] for items in legacy.sections.values() for item in items] == \
+            [item['name'] for items in current.sections.values() for item in items]
+
+    memory = {'legacy': bytes_per_menu(build_legacy, texts, args.sessions),
+              'current': bytes_per_menu(build_current, texts, args.sessions)}
+    print(f"{len(texts)} menus, {args.sessions} sessions each")
+    print(f"memory per menu: legacy {memory['legacy']:,.0f} B, current {memory['current']:,.0f} B "
+          f"({memory['current'] / memory['legacy']:.0%})")
+
+    results: Dict[str, Any] = {'menus': len(texts), 'memory_bytes': memory, 'codecs': {}}
+    print(f"\n{'serialization':<16} {'encode':>10} {'decode':>10} {'bytes':>8}")
+    for name, (representation, encode, decode) in codecs().items():
+        timing = time_codec(encode, decode, responses[representation], args.repeats)
+        results['codecs'][name] = timing
+        print(f"{name:<16} {timing['encode_us']:8.1f}us {timing['decode_us']:8.1f}us {timing['bytes']:8.0f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# bench_overhead.py
+"""
+Measure the Python overhead of generate_menu per call, excluding LLM time.
+
+The LLM is a zero-latency stub, so the timings are prompt formatting, chain
+plumbing and parsing. "per-call chains" rebuilds the PromptTemplates,
+LLMChains and SequentialChain on every call the way generate_menu used to;
+"cached chains" is the current generator, which builds them once:
+
+    python benchmarks/bench_overhead.py --calls 500
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from langchain.chains import LLMChain, SequentialChain  # noqa: E402
+from langchain.prompts import PromptTemplate  # noqa: E402
+
+from llm_backends import create_llm  # noqa: E402
+from menu_generator import (METRICS_CALLBACKS, MENU_TEMPLATE, NAME_TEMPLATE,  # noqa: E402
+                            RestaurantMenuGenerator)
+from menu_metrics import step_tags  # noqa: E402
+
+
+class PerCallChainGenerator(RestaurantMenuGenerator):
+    """The generator as it was before chains were cached: everything is rebuilt per call."""
+
+    def _generate_sequential(self, cuisine, diets, no_of_items):
+        name_template = PromptTemplate(input_variables=NAME_TEMPLATE.input_variables,
+                                       template=NAME_TEMPLATE.template)
+        menu_template = PromptTemplate(input_variables=MENU_TEMPLATE.input_variables,
+                                       template=MENU_TEMPLATE.template)
+        name_chain = LLMChain(llm=self.llm, prompt=name_template, output_key='restaurant_name',
+                              tags=step_tags("name"))
+        menu_chain = LLMChain(llm=self.llm, prompt=menu_template, output_key='menu',
+                              tags=step_tags("menu"))
+        chain = SequentialChain(
+            chains=[name_chain, menu_chain],
+            input_variables=['cuisine', 'diet', 'no_of_items'],
+            output_variables=['restaurant_name', 'menu']
+        )
+        response = chain({'cuisine': cuisine, 'diet': diets, 'no_of_items': no_of_items},
+                         callbacks=METRICS_CALLBACKS)
+        return response['restaurant_name'], response['menu']
+
+
+def per_call_overhead(generator: RestaurantMenuGenerator, calls: int) -> float:
+    """Return mean seconds per generate_menu call."""
+    generator.generate_menu("Thai", ["Vegan"], 3)  # warm up imports and caches
+    start = time.perf_counter()
+    for _ in range(calls):
+        generator.generate_menu("Thai", ["Vegan"], 3)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    stub = create_llm("fake")
+    before = per_call_overhead(PerCallChainGenerator(key="unused", llm=stub), args.calls)
+    after = per_call_overhead(RestaurantMenuGenerator(key="unused", llm=stub), args.calls)
+    print(f"per-call chains: {before * 1e6:9.1f} us/call")
+    print(f"  cached chains: {after * 1e6:9.1f} us/call")
+    print(f"        speedup: {before / after:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# bench_pipeline.py
+"""
+Benchmark the generation -> parse -> render pipeline and catch regressions.
+
+Every stage is timed on the recorded menus in benchmarks/corpus and on menus
+written by the fake LLM backend with 1 to 50 items per section:
+
+    generate_menu      generate_menu with a zero-latency LLM (chains, parsing, validation)
+    generator_parse    RestaurantMenuGenerator.parse_menu
+    parser_parse       MenuParser.parse_menu
+    clean_item         MenuParser.clean_item on every item line
+    validate_dietary   MenuParser.validate_dietary_restrictions on every item
+    format_display     format_menu_for_display
+
+Results are written as JSON. Each timing is also stored relative to a fixed
+pure-Python calibration loop run just before it, so a baseline recorded on
+one machine can be checked on another and a busy machine slows both alike.
+Comparing against a baseline fails (exit status 1) when a stage is slower
+than the tolerance allows, judged by the geometric mean over its menus so a
+single noisy case does not fail the run, or when a case is slower than its
+own "max_ratio" in the baseline. generate_menu runs through LangChain and
+varies more from run to run than the pure parsing stages, so it has its own,
+wider tolerance in STAGE_TOLERANCES:
+
+    python benchmarks/bench_pipeline.py --output results.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/baseline.json
+"""
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import glob
+import json
+import os
+import platform
+import gc
+import statistics
+import sys
+import time
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+
+from llm_backends import FakeMenuLLM  # noqa: E402
+from menu_generator import RestaurantMenuGenerator  # noqa: E402
+from menu_utils import MenuParser, format_menu_for_display  # noqa: E402
+
+CORPUS_DIR = os.path.join(HERE, "corpus")
+SIZES = (1, 2, 3, 5, 10, 20, 50)
+
+# Allowed slowdown over the baseline before a stage counts as a regression
+DEFAULT_TOLERANCE = 0.25
+# Stages too noisy for DEFAULT_TOLERANCE; --tolerance does not change these
+STAGE_TOLERANCES = {'generate_menu': 0.5}
+# Timed batches per case; the best is kept, so more repeats mean less noise
+DEFAULT_REPEATS = 9
+
+
+def calibrate(rounds: int = 3) -> float:
+    """Best-of time of a fixed string/dict workload, the unit timings are scaled by."""
+    def workload():
+        table = {}
+        for i in range(20000):
+            key = f"item {i % 500}".upper()
+            table[key] = table.get(key, 0) + len(key.split())
+        return table
+    return min(_time_once(workload) for _ in range(rounds))
+
+
+def _time_once(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def measure(func: Callable[[], Any], min_time: float, repeats: int) -> float:
+    """
+    Return the best mean seconds per call over several timed batches.
+
+    The garbage collector is paused while timing, as timeit does, so a
+    collection triggered by an earlier case is not charged to this one.
+    """
+    func()
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        loops = 1
+        while _time_once(lambda: [func() for _ in range(loops)]) < min_time / repeats:
+            loops *= 2
+        return min(_time_once(lambda: [func() for _ in range(loops)]) for _ in range(repeats)) / loops
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def menu_cases() -> List[Tuple[str, str]]:
+    """(label, menu text) for the recorded corpus and a fake menu of each size."""
+    cases = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            cases.append((f"corpus/{os.path.splitext(os.path.basename(path))[0]}", f.read()))
+    generator = RestaurantMenuGenerator(key="unused", strategy="single", llm=FakeMenuLLM())
+    for size in SIZES:
+        cases.append((f"items={size}", generator.generate_menu("Indian", ["Vegetarian", "Gluten-Free"], size).menu))
+    return cases
+
+
+def item_lines(menu_text: str) -> List[str]:
+    """The raw item lines of a menu, as clean_item receives them."""
+    return [entry for _, entries in MenuParser.parse(menu_text).parsed_menu for entry in entries]
+
+
+def run_suite(min_time: float, repeats: int, only: str = "") -> Dict[str, Dict[str, float]]:
+    """Time every stage on every menu whose name contains only; keys are "<stage>/<menu>"."""
+    results: Dict[str, Dict[str, float]] = {}
+
+    def record(name: str, func: Callable[[], Any], items: int) -> None:
+        if only not in name:
+            return
+        unit = calibrate()
+        seconds = measure(func, min_time, repeats)
+        results[name] = {'us_per_op': seconds * 1e6, 'items_per_s': items / seconds if seconds else 0.0,
+                         'relative': seconds / unit}
+
+    for label, text in menu_cases():
+        parsed = MenuParser.parse(text)
+        lines = item_lines(text)
+        cleaned = [MenuParser.clean_item(line) for line in lines]
+        items = max(len(lines), 1)
+
+        record(f"generator_parse/{label}", lambda: RestaurantMenuGenerator.parse_menu(text), items)
+        record(f"parser_parse/{label}", lambda: MenuParser.parse_menu(text), items)
+        record(f"clean_item/{label}", lambda: [MenuParser.clean_item(line) for line in lines], items)
+        record(f"validate_dietary/{label}",
+               lambda: [MenuParser.validate_dietary_restrictions(*item) for item in cleaned], items)
+        record(f"format_display/{label}", lambda: format_menu_for_display(parsed.sections), items)
+
+    for size in SIZES:
+        generator = RestaurantMenuGenerator(key="unused", strategy="single", llm=FakeMenuLLM())
+        record(f"generate_menu/items={size}",
+               lambda: generator.generate_menu("Indian", ["Vegetarian"], size),
+               size * len(MenuParser.SECTIONS))
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Return a description of every stage or case slower than the baseline allows.
+
+    Ratios are of calibration-relative timings. A stage fails when the
+    geometric mean of its cases' ratios exceeds 1 + its tolerance, taken from
+    STAGE_TOLERANCES or else the tolerance argument; a case fails when its
+    ratio exceeds its own "max_ratio" in the baseline, if it has one.
+    """
+    failures = []
+    stage_ratios: Dict[str, List[float]] = {}
+    for name, expected in baseline['results'].items():
+        actual = results['results'].get(name)
+        if actual is None:
+            continue
+        ratio = actual['relative'] / expected['relative']
+        stage_ratios.setdefault(name.split("/", 1)[0], []).append(ratio)
+        limit = expected.get('max_ratio')
+        if limit is not None and ratio > limit:
+            failures.append(f"{name}: {actual['us_per_op']:.1f} us/op, "
+                            f"{ratio:.2f}x baseline (limit {limit:.2f}x)")
+    for stage, ratios in sorted(stage_ratios.items()):
+        ratio = statistics.geometric_mean(ratios)
+        limit = 1 + STAGE_TOLERANCES.get(stage, tolerance)
+        print(f"{stage:<20} {ratio:5.2f}x baseline over {len(ratios)} cases (limit {limit:.2f}x)")
+        if ratio > limit:
+            failures.append(f"{stage}: {ratio:.2f}x baseline (limit {limit:.2f}x)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Fail if slower than the results in this JSON file")
+    parser.add_argument("--save-baseline", help="Write results to this file as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown for stages not in STAGE_TOLERANCES")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds spent per case")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Timed batches per case")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    results = {
+        'meta': {'python': platform.python_version(), 'machine': platform.machine(),
+                 'calibration_us': calibrate() * 1e6, 'created': time.strftime("%Y-%m-%dT%H:%M:%S")},
+        'results': run_suite(args.min_time, args.repeats, args.filter),
+    }
+
+    for name, timing in results['results'].items():
+        print(f"{name:<58} {timing['us_per_op']:10.1f} us/op {timing['items_per_s']:12,.0f} items/s")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        print(f"{len(failures)} regressions against {args.baseline}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# bench_store.py
+"""
+Measure MenuStore query latency on a large synthetic corpus.
+
+Fills a temporary store with generated menus (nine items each, tagged with
+random diets) and times typical dashboard queries against it:
+
+    python benchmarks/bench_store.py --items 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from menu_generator import CUISINES, DIET_OPTIONS, MenuResponse  # noqa: E402
+from menu_store import MenuStore  # noqa: E402
+from menu_utils import MenuParser  # noqa: E402
+
+WORDS = ("roasted smoked braised crispy saffron chili garlic lime ginger basil fennel "
+         "tamarind walnut almond lentil mushroom eggplant coconut cheese tofu cream").split()
+
+
+def synthetic_menu(rng: random.Random, index: int) -> MenuResponse:
+    sections = {}
+    for section in MenuParser.SECTIONS:
+        sections[section] = [
+            {
+                'name': f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {index}-{n}",
+                'description': " ".join(rng.choices(WORDS, k=12)),
+                'dietary': rng.sample(DIET_OPTIONS, rng.randint(1, 3)),
+            }
+            for n in range(3)
+        ]
+    return MenuResponse.from_sections(cuisine=rng.choice(CUISINES), restaurant_name=f"Restaurant {index}",
+                                      menu=f"menu {index}", sections=sections)
+
+
+def time_query(store: MenuStore, repeats: int, **filters) -> float:
+    """Return mean milliseconds per search_items call."""
+    store.search_items(**filters)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        store.search_items(**filters)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MenuStore(os.path.join(tmp, "bench_store.db"))
+        start = time.perf_counter()
+        menus = (synthetic_menu(rng, index) for index in range(args.items // 9))
+        store.save_many(menus)
+        print(f"Loaded {store.counts()['items']} items in {time.perf_counter() - start:.1f}s")
+
+        queries = {
+            "Gluten-Free desserts, Thai": dict(cuisine="Thai", diets=["Gluten-Free"], section="Desserts"),
+            "Vegan + Nut-Free, Italian": dict(cuisine="Italian", diets=["Vegan", "Nut-Free"]),
+            "exact name": dict(name="Crispy Saffron 42-1"),
+            "keywords 'saffron tamarind'": dict(text="saffron tamarind", limit=20),
+            "Desserts, Mexican": dict(cuisine="Mexican", section="Desserts"),
+        }
+        for label, filters in queries.items():
+            print(f"{label:<30} {time_query(store, args.repeats, **filters):8.3f} ms/query")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
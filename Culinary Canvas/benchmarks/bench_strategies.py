@@ -0,0 +1,58 @@
+# bench_strategies.py
+"""
+Compare end-to-end latency of the "sequential", "single" and "parallel" generation strategies.
+
+Runs against the offline "fake" LLM backend, so no API key or network access is needed:
+
+    python benchmarks/bench_strategies.py --runs 5 --ttft 0.3
+    python benchmarks/bench_strategies.py --items 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from menu_generator import RestaurantMenuGenerator  # noqa: E402
+
+
+def time_strategy(strategy: str, runs: int, ttft: float, per_char: float, items: int = 3) -> list:
+    """Return wall-clock seconds for each generate_menu call."""
+    generator = RestaurantMenuGenerator(key="unused", strategy=strategy, backend="fake",
+                                        backend_options={'first_token_latency': ttft,
+                                                         'seconds_per_char': per_char})
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = generator.generate_menu("Mexican", ["Vegetarian"], no_of_items=items)
+        timings.append(time.perf_counter() - start)
+        assert response.restaurant_name and response.parsed_menu
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=0.3,
+                        help="Simulated time to first token per LLM call (seconds)")
+    parser.add_argument("--per-char", type=float, default=0.0005,
+                        help="Simulated decode time per output character (seconds)")
+    parser.add_argument("--items", type=int, default=3, help="Items per menu section")
+    args = parser.parse_args()
+
+    results = {}
+    for strategy in RestaurantMenuGenerator.STRATEGIES:
+        results[strategy] = time_strategy(strategy, args.runs, args.ttft, args.per_char, args.items)
+        print(f"{strategy:>10}: mean {statistics.mean(results[strategy]) * 1000:8.1f} ms  "
+              f"min {min(results[strategy]) * 1000:8.1f} ms")
+
+    saved = statistics.mean(results["sequential"]) - statistics.mean(results["single"])
+    print(f"single-call saves {saved * 1000:.1f} ms per menu")
+    saved = statistics.mean(results["sequential"]) - statistics.mean(results["parallel"])
+    print(f"per-section calls save {saved * 1000:.1f} ms per menu")
+
+
+if __name__ == "__main__":
+    main()
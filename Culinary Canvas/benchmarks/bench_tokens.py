@@ -0,0 +1,203 @@
+# bench_tokens.py
+"""
+Report prompt and completion tokens and the latency they imply per menu, for each prompt variant.
+
+Token counts come from the menus recorded in benchmarks/corpus. The "full"
+variant's completion is the recorded text itself; for a compact variant the
+recorded items are rewritten one per line with their descriptions cut to the
+variant's word cap, which is what a model following that prompt returns.
+Prompts are the variant's real templates, filled in for each menu. Latency
+is modelled as time to first token plus decode time per completion token,
+per LLM call of the strategy. Each menu is also checked against the
+output_token_budget the variant would use with limit_output_tokens, so a
+budget that would cut off a real menu shows up as an overrun:
+
+    python benchmarks/bench_tokens.py
+    python benchmarks/bench_tokens.py --strategy single --words 8 12 20
+    python benchmarks/bench_tokens.py --measure --output tokens.json
+
+With --measure every variant also generates menus through the fake LLM
+backend, reporting the token usage attached to each MenuResponse and the
+wall time, which checks the accounting end to end.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+
+from llm_backends import FakeMenuLLM  # noqa: E402
+from menu_generator import (PROMPT_VARIANTS, PromptSet, RestaurantMenuGenerator,  # noqa: E402
+                            output_token_budget)
+from menu_metrics import estimate_tokens  # noqa: E402
+from menu_utils import MenuParser, format_menu_text  # noqa: E402
+
+CORPUS_DIR = os.path.join(HERE, "corpus")
+
+# Inputs the prompts are filled in with; only their length matters here
+PROMPT_INPUTS = {'cuisine': "Mediterranean", 'diet': "Vegetarian, Gluten-Free", 'restaurant_name': "The Olive Grove"}
+
+
+def recorded_menus(corpus_dir: str) -> List[Tuple[str, str]]:
+    """(name, menu text) of every recorded menu."""
+    menus = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            menus.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+    return menus
+
+
+def variants(words: List[int]) -> Dict[str, Tuple[PromptSet, Optional[int]]]:
+    """Prompt set and description cap of "full" and of "compact" at each word cap."""
+    result = {"full": (PROMPT_VARIANTS["full"], None)}
+    for cap in words:
+        result[f"compact/{cap}w"] = (PROMPT_VARIANTS["compact"].with_description_words(cap), cap)
+    return result
+
+
+def compact_completion(menu_text: str, words: int) -> str:
+    """A recorded menu as the compact prompt asks for it: one line per item, short descriptions."""
+    sections = MenuParser.parse(menu_text).sections
+    return format_menu_text({
+        section: [dict(item, description=" ".join(item['description'].split()[:words]))
+                  for item in items]
+        for section, items in sections.items()
+    })
+
+
+def prompt_calls(prompts: PromptSet, strategy: str, no_of_items: int) -> List[str]:
+    """The prompts a strategy sends for one menu, in call order."""
+    inputs = dict(PROMPT_INPUTS, no_of_items=no_of_items)
+    if strategy == "single":
+        return [prompts.single.format(**inputs)]
+    name = prompts.name.format(**inputs)
+    if strategy == "parallel":
+        return [name] + [prompts.section.format(**inputs, section=section) for section in MenuParser.SECTIONS]
+    return [name, prompts.menu.format(**inputs)]
+
+
+def model_menu(prompts: PromptSet,
+               cap: Optional[int],
+               strategy: str,
+               menu_text: str,
+               ttft: float,
+               seconds_per_token: float) -> Dict[str, Any]:
+    """Tokens, modelled latency and output budget of one recorded menu under a variant."""
+    sections = MenuParser.parse(menu_text).sections
+    no_of_items = max((len(items) for items in sections.values()), default=1)
+    completion = menu_text if cap is None else compact_completion(menu_text, cap)
+    completion_tokens = estimate_tokens(completion)
+    name_tokens = estimate_tokens(PROMPT_INPUTS['restaurant_name'])
+
+    if strategy == "parallel":
+        # The name first, then the sections side by side: the longest one counts
+        longest = max(estimate_tokens(block) for block in completion.split("\n\n"))
+        latency = 2 * ttft + (name_tokens + longest) * seconds_per_token
+        budget = output_token_budget(no_of_items, sections=1, description_words=cap)
+        overrun = longest > budget
+        completion_tokens += name_tokens
+    elif strategy == "single":
+        completion_tokens += name_tokens
+        latency = ttft + completion_tokens * seconds_per_token
+        budget = output_token_budget(no_of_items, description_words=cap, include_name=True)
+        overrun = completion_tokens > budget
+    else:
+        latency = 2 * ttft + (name_tokens + completion_tokens) * seconds_per_token
+        budget = output_token_budget(no_of_items, description_words=cap)
+        overrun = completion_tokens > budget
+        completion_tokens += name_tokens
+
+    return {
+        'items': no_of_items,
+        'prompt_tokens': sum(estimate_tokens(prompt) for prompt in prompt_calls(prompts, strategy, no_of_items)),
+        'completion_tokens': completion_tokens,
+        'latency_s': latency,
+        'budget': budget,
+        'overrun': overrun,
+    }
+
+
+def measure(cap: Optional[int],
+            strategy: str,
+            runs: int,
+            ttft: float,
+            per_char: float) -> Dict[str, float]:
+    """Mean usage and wall time of generate_menu with the fake backend."""
+    llm = FakeMenuLLM(first_token_latency=ttft, seconds_per_char=per_char, description_terms=(3, 8))
+    generator = RestaurantMenuGenerator(key="unused", strategy=strategy, llm=llm,
+                                        prompt_variant="full" if cap is None else "compact",
+                                        description_words=cap, limit_output_tokens=True)
+    usages, timings = [], []
+    for run in range(runs):
+        start = time.perf_counter()
+        response = generator.generate_menu(PROMPT_INPUTS['cuisine'], f"Vegetarian {run}", no_of_items=3)
+        timings.append(time.perf_counter() - start)
+        usages.append(response.usage)
+    return {
+        'prompt_tokens': statistics.mean(usage.prompt_tokens for usage in usages),
+        'completion_tokens': statistics.mean(usage.completion_tokens for usage in usages),
+        'calls': statistics.mean(usage.calls for usage in usages),
+        'wall_s': statistics.mean(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--strategy", choices=RestaurantMenuGenerator.STRATEGIES, default="sequential")
+    parser.add_argument("--words", type=int, nargs="+", default=[8, 12, 20],
+                        help="Description word caps of the compact variants")
+    parser.add_argument("--ttft", type=float, default=0.4, help="Modelled time to first token per call (seconds)")
+    parser.add_argument("--tokens-per-s", type=float, default=50.0, help="Modelled decode speed")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="Directory of recorded menus (*.txt)")
+    parser.add_argument("--measure", action="store_true",
+                        help="Also generate menus with the fake backend and report their usage")
+    parser.add_argument("--runs", type=int, default=3, help="Menus generated per variant with --measure")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    menus = recorded_menus(args.corpus)
+    if not menus:
+        parser.error(f"No recorded menus in {args.corpus}")
+
+    report: Dict[str, Any] = {'strategy': args.strategy, 'menus': len(menus), 'variants': {}}
+    print(f"{len(menus)} recorded menus, strategy {args.strategy}, "
+          f"{args.ttft:g} s to first token, {args.tokens_per_s:g} tokens/s")
+    print(f"{'variant':<14} {'prompt':>8} {'completion':>11} {'total':>8} {'latency':>9} {'budget':>8} overruns")
+    seconds_per_token = 1 / args.tokens_per_s
+    for variant, (prompts, cap) in variants(args.words).items():
+        rows = [model_menu(prompts, cap, args.strategy, text, args.ttft, seconds_per_token) for _, text in menus]
+        summary = {key: statistics.mean(row[key] for row in rows)
+                   for key in ('prompt_tokens', 'completion_tokens', 'latency_s', 'budget')}
+        summary['total_tokens'] = summary['prompt_tokens'] + summary['completion_tokens']
+        summary['overruns'] = [name for (name, _), row in zip(menus, rows) if row['overrun']]
+        if args.measure:
+            summary['measured'] = measure(cap, args.strategy, args.runs, 0.05, 0.0001)
+        report['variants'][variant] = summary
+        print(f"{variant:<14} {summary['prompt_tokens']:8.0f} {summary['completion_tokens']:11.0f} "
+              f"{summary['total_tokens']:8.0f} {summary['latency_s']:8.2f}s {summary['budget']:8.0f} "
+              f"{', '.join(summary['overruns']) or '-'}")
+
+    if args.measure:
+        print(f"\nfake backend, {args.runs} menus of 3 items per variant, output limits on")
+        print(f"{'variant':<14} {'prompt':>8} {'completion':>11} {'calls':>6} {'wall':>9}")
+        for variant, summary in report['variants'].items():
+            measured = summary['measured']
+            print(f"{variant:<14} {measured['prompt_tokens']:8.0f} {measured['completion_tokens']:11.0f} "
+                  f"{measured['calls']:6.0f} {measured['wall_s']:8.2f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# parser_parity.py
+"""
+Check that the single-pass MenuParser.parse matches the two parsers it replaced.
+
+The legacy RestaurantMenuGenerator.parse_menu and MenuParser.parse_menu are
+frozen below. Every menu in benchmarks/corpus is parsed by both the legacy
+code and the unified parser, whole and fed in random chunk sizes to
+MenuStreamParser, and any difference is reported:
+
+    python benchmarks/parser_parity.py
+"""
+from typing import Dict, List, Tuple
+import glob
+import os
+import random
+import re
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+
+from menu_utils import MenuParser, MenuStreamParser, ParsedMenu  # noqa: E402
+
+CORPUS_DIR = os.path.join(HERE, "corpus")
+
+
+def legacy_generator_parse(menu_string: str) -> List[Tuple[str, List[str]]]:
+    """RestaurantMenuGenerator.parse_menu before the parsers were unified."""
+    sections = menu_string.strip().split('\n\n')
+    parsed_menu = []
+
+    for section in sections:
+        lines = section.strip().split('\n')
+        if not lines or not lines[0].strip():
+            continue
+
+        heading = lines[0].strip("* ")
+        if heading.startswith("**") and heading.endswith("**"):
+            heading = heading[2:-2].strip()
+
+        items = []
+        current_item = []
+        for line in lines[1:]:
+            line = line.strip()
+            if line.startswith("*"):
+                if current_item:
+                    items.append("\n".join(current_item))
+                    current_item = []
+                current_item.append(line.lstrip("* "))
+            elif line:
+                current_item.append(line)
+        if current_item:
+            items.append("\n".join(current_item))
+
+        if heading and items:
+            parsed_menu.append((heading, items))
+
+    return parsed_menu
+
+
+def legacy_menu_parser_parse(menu_text: str) -> Dict[str, List[Dict[str, str]]]:
+    """MenuParser.parse_menu before the parsers were unified."""
+    menu_lines = menu_text.strip().split('\n')
+    current_section = None
+    sections = {'Appetizers': [], 'Main Courses': [], 'Desserts': []}
+    section_pattern = re.compile(r'\*{0,2}(Appetizers|Main Courses|Desserts)\*{0,2}')
+
+    for line in menu_lines:
+        line = line.strip()
+        if not line:
+            continue
+        section_match = section_pattern.match(line)
+        if section_match:
+            current_section = section_match.group(1)
+            continue
+        if not current_section or current_section not in sections:
+            continue
+        if ':' in line:
+            name, description, dietary = MenuParser.clean_item(line)
+            if name:
+                sections[current_section].append({
+                    'name': name,
+                    'description': description,
+                    'dietary': MenuParser.validate_dietary_restrictions(name, description, dietary)
+                })
+
+    return sections
+
+
+def parse_in_chunks(menu_text: str, rng: random.Random) -> ParsedMenu:
+    parser = MenuStreamParser(include_entries=True)
+    parsed = ParsedMenu.empty()
+    position = 0
+    while position < len(menu_text):
+        size = rng.randint(1, 40)
+        for event in parser.feed(menu_text[position:position + size]):
+            parsed.add(event)
+        position += size
+    for event in parser.close():
+        parsed.add(event)
+    return parsed
+
+
+def check(menu_text: str, rng: random.Random, chunk_trials: int = 20) -> List[str]:
+    """Return a description of every mismatch for one menu."""
+    problems = []
+    expected = ParsedMenu(legacy_menu_parser_parse(menu_text), legacy_generator_parse(menu_text))
+    candidates = [("whole", MenuParser.parse(menu_text))]
+    candidates += [(f"chunked #{trial}", parse_in_chunks(menu_text, rng)) for trial in range(chunk_trials)]
+    for label, parsed in candidates:
+        if parsed.sections != expected.sections:
+            problems.append(f"{label}: sections differ")
+        if parsed.parsed_menu != expected.parsed_menu:
+            problems.append(f"{label}: parsed_menu differs")
+    if MenuParser.parse_blocks(menu_text) != expected.parsed_menu:
+        problems.append("parse_blocks: parsed_menu differs")
+    return problems
+
+
+def main() -> int:
+    rng = random.Random(0)
+    paths = sorted(glob.glob(os.path.join(CORPUS_DIR, "*.txt")))
+    failures = 0
+    for path in paths:
+        with open(path, encoding="utf-8", newline="") as menu_file:
+            problems = check(menu_file.read(), rng)
+        status = "ok" if not problems else "MISMATCH"
+        print(f"{status:>8}  {os.path.basename(path)}")
+        for problem in problems:
+            print(f"          {problem}")
+        failures += bool(problems)
+    print(f"{len(paths) - failures}/{len(paths)} menus match")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,20 @@
 import subprocess
 import streamlit as st
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 import logging
-import base64
-from menu_generator import RestaurantMenuGenerator
+import time
+from background import set_background
+from menu_generator import RestaurantMenuGenerator, CUISINES, DIET_OPTIONS
+from menu_cache import MenuCache, SQLiteCacheBackend
+from menu_pool import GeneratorPool
+from menu_store import MenuStore
+from menu_dedup import MenuDeduplicator
+from menu_export import WRITERS, render_menu
+from llm_backends import backend_from_env
+from menu_metrics import span, start_metrics_server
+from menu_resilience import describe_error
 from secret_key import API_KEY as api_key
-from menu_utils import MenuParser, format_menu_for_display
+from menu_utils import MenuParser, format_item_markdown, format_menu_markdown, format_menu_for_display
 import os
 
 # Set page configuration
@@ -18,36 +27,71 @@ st.set_page_config(
 if api_key:
     print("API Key found.")
 
-# Function to set background image
-def set_background(image_path):
-    with open(image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode()
-    css_code = f"""
-    <style>
-    .stApp {{
-        background-image: url(data:image/png;base64,{encoded_string});
-        background-size: cover;
-        background-position: center;
-        background-attachment: fixed;
-    }}
-    </style>
-    """
-    st.markdown(css_code, unsafe_allow_html=True)
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # Path to your background image
 image_path = "image.png"  # Replace with your local image path
 set_background(image_path)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+
+# Render menus item by item while the model is still writing them
+STREAM_MENUS = True
+
+
+@st.cache_resource
+def get_menu_cache() -> MenuCache:
+    """Return the process-wide menu cache shared by all sessions."""
+    return MenuCache(SQLiteCacheBackend("menu_cache.db", max_entries=10000, ttl=24 * 3600))
+
+
+@st.cache_resource
+def get_deduplicator() -> MenuDeduplicator:
+    """Return the process-wide near-duplicate detector for menu items."""
+    return MenuDeduplicator(threshold=0.8)
+
+
+@st.cache_resource
+def get_menu_store() -> MenuStore:
+    """Return the process-wide corpus of every generated menu."""
+    return MenuStore("menu_store.db", deduplicator=get_deduplicator())
+
+
+@st.cache_resource
+def get_metrics_server():
+    """Serve Prometheus metrics on MENU_METRICS_PORT, once per process, if it is set."""
+    port = os.environ.get("MENU_METRICS_PORT")
+    if not port:
+        return None
+    try:
+        return start_metrics_server(int(port))
+    except OSError as e:
+        logger.warning(f"Could not serve metrics on port {port}: {e}")
+        return None
+
+
+@st.cache_resource
+def get_generator_pool() -> GeneratorPool:
+    """Return the process-wide pool of warm generators, keyed by API key."""
+    # MENU_LLM_BACKEND=fake runs the dashboard offline, e.g. for load tests
+    backend, backend_options = backend_from_env()
+    return GeneratorPool(max_size=32, idle_ttl=30 * 60, cache=get_menu_cache(),
+                         store=get_menu_store(), deduplicator=get_deduplicator(),
+                         backend=backend, backend_options=backend_options)
+
+
+def get_generator() -> RestaurantMenuGenerator:
+    """Borrow the shared generator for this app's API key."""
+    return get_generator_pool().get(api_key)
 
 
 def initialize_session_state():
     """Initialize session state variables if they don't exist."""
-    if 'generator' not in st.session_state:
+    if 'generator_ready' not in st.session_state:
         try:
-            st.session_state.generator = RestaurantMenuGenerator(key=api_key)
+            get_generator()
+            st.session_state.generator_ready = True
         except Exception as e:
             logger.error(f"Failed to initialize generator: {str(e)}")
             st.error("Failed to initialize the menu generator. Please check your API key.")
@@ -63,15 +107,13 @@ def create_sidebar() -> Dict[str, Any]:
         with st.form(key='menu_form'):
             cuisine = st.selectbox(
                 "Select Cuisine (Required)",
-                options=["", "Indian", "Italian", "Mexican", "Chinese", "Japanese", 
-                         "Thai", "American", "Mediterranean", "French", "Spanish"],
+                options=[""] + CUISINES,
                 format_func=lambda x: "Select a Cuisine" if x == "" else x,
                 key="cuisine_select"
             )
             diet_options = st.multiselect(
                 "Select Dietary Requirements (Required)",
-                options=["Vegetarian", "Non-Vegetarian", "Vegan", "Gluten-Free", 
-                         "Dairy-Free", "Nut-Free"],
+                options=DIET_OPTIONS,
                 key="diet_multi_select"
             )
             items_per_section = st.slider(
@@ -81,6 +123,11 @@ def create_sidebar() -> Dict[str, Any]:
                 value=3,
                 key="items_per_section_slider"
             )
+            reuse_dishes = st.checkbox(
+                "Reuse saved dishes when possible (faster)",
+                value=False,
+                key="reuse_dishes_checkbox"
+            )
             generate_button = st.form_submit_button(
                 "Generate Menu", 
             )
@@ -88,10 +135,57 @@ def create_sidebar() -> Dict[str, Any]:
             "cuisine": cuisine,
             "diet_options": diet_options,
             "items_per_section": items_per_section,
+            "reuse_dishes": reuse_dishes,
             "generate_button": generate_button
         }
 
 
+def render_item(item: Dict[str, Any]):
+    """Render a single parsed menu item."""
+    st.markdown(format_item_markdown(item))
+
+
+# Download formats offered under a menu; "Text" is the plain display text
+DOWNLOAD_FORMATS = {"Text": None, "PDF": "pdf", "HTML": "html", "Markdown": "markdown",
+                    "JSON": "json", "CSV": "csv"}
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def build_menu_export(menu_hash: str, fmt: str, _menu_response) -> bytes:
+    """Render a menu in an export format once per content hash and format."""
+    return render_menu(_menu_response, fmt)
+
+
+def render_download(menu_response, menu_text: str):
+    """Render the download button for a menu, in the format chosen next to it."""
+    columns = st.columns([1, 3])
+    choice = columns[0].selectbox("Format", options=list(DOWNLOAD_FORMATS), key="download_format",
+                                  label_visibility="collapsed")
+    stem = f"{menu_response.restaurant_name.lower().replace(' ', '_')}_menu"
+    fmt = DOWNLOAD_FORMATS[choice]
+    if fmt is None:
+        data, file_name, mime = menu_text, f"{stem}.txt", "text/plain"
+    else:
+        data = build_menu_export(menu_response.content_hash(), fmt, menu_response)
+        file_name, mime = f"{stem}.{WRITERS[fmt].extension}", WRITERS[fmt].media_type
+    columns[1].download_button(
+        label="📥 Download Menu",
+        data=data,
+        file_name=file_name,
+        mime=mime
+    )
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def build_menu_render(menu_hash: str, _menu_response) -> Tuple[str, str]:
+    """
+    Build the on-screen markdown and the download text for a menu once.
+    Cached by the menu's content hash, so reruns reuse the same output.
+    """
+    parsed_menu = _menu_response.sections
+    return format_menu_markdown(parsed_menu), format_menu_for_display(parsed_menu)
+
+
 def display_menu(menu_response):
     """
     Display the generated menu with proper formatting and styling.
@@ -100,53 +194,138 @@ def display_menu(menu_response):
     """
     st.title(f"🏺 {menu_response.restaurant_name}")
     st.markdown("---")
-    parser = MenuParser()
     try:
-        parsed_menu = parser.parse_menu(menu_response.menu)
-        for section, items in parsed_menu.items():
-            st.markdown(f"### {section}")
-            for item in items:
-                dietary_info = f" ({', '.join(item['dietary'])})" if item['dietary'] else ""
-                st.markdown(f"#### 🍽️ {item['name']}{dietary_info}")
-                if item['description']:
-                    st.markdown(f"*{item['description']}*")
-                st.markdown("---")
-
-        menu_text = format_menu_for_display(parsed_menu)
-        st.download_button(
-            label="📥 Download Menu",
-            data=menu_text,
-            file_name=f"{menu_response.restaurant_name.lower().replace(' ', '_')}_menu.txt",
-            mime="text/plain"
-        )
+        with span("display_menu", items=sum(len(section.items) for section in menu_response.menu_sections)):
+            menu_markdown, menu_text = build_menu_render(menu_response.content_hash(), menu_response)
+            st.markdown(menu_markdown)
+            render_download(menu_response, menu_text)
 
     except Exception as e:
         logger.error(f"Error parsing menu: {str(e)}")
         st.error("Failed to display the menu. Please check the generated menu text")
 
 
+def display_menu_stream(menu_stream):
+    """
+    Display a menu while it is being generated, rendering each section and
+    item as soon as the model has finished writing it.
+    Args:
+        menu_stream: MenuStream returned by RestaurantMenuGenerator.stream_menu.
+    Returns:
+        The complete MenuResponse once the stream is exhausted.
+    """
+    st.title(f"🏺 {menu_stream.restaurant_name}")
+    st.markdown("---")
+    start = time.perf_counter()
+    first_item_logged = False
+    # Covers the streamed menu call as well as rendering, which are interleaved
+    with span("display_menu_stream") as fields:
+        items = 0
+        for kind, section, item in menu_stream.iter_events():
+            if kind == 'section':
+                st.markdown(f"### {section}")
+                continue
+            if not first_item_logged:
+                fields['first_item_seconds'] = round(time.perf_counter() - start, 6)
+                logger.info(f"Time to first menu item: {time.perf_counter() - start:.2f}s")
+                first_item_logged = True
+            render_item(item)
+            items += 1
+        fields['items'] = items
+
+    menu_response = menu_stream.response
+    _, menu_text = build_menu_render(menu_response.content_hash(), menu_response)
+    render_download(menu_response, menu_text)
+    return menu_response
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def saved_item_count() -> int:
+    """Items in the menu store; counting scans the items table, so it runs at most once a minute."""
+    return get_menu_store().counts()['items']
+
+
+def display_search_panel():
+    """Search the items of every menu generated so far."""
+    store = get_menu_store()
+    with st.expander("🔎 Search saved menus"):
+        with st.form(key='search_form'):
+            columns = st.columns(4)
+            cuisine = columns[0].selectbox("Cuisine", options=["Any"] + CUISINES, key="search_cuisine")
+            diets = columns[1].multiselect("Dietary tags", options=DIET_OPTIONS, key="search_diets")
+            section = columns[2].selectbox("Section", options=["Any"] + list(MenuParser.SECTIONS),
+                                           key="search_section")
+            text = columns[3].text_input("Keywords", key="search_text")
+            unique = st.checkbox("Hide near-duplicate dishes", value=True, key="search_unique")
+            search_button = st.form_submit_button("Search")
+        if not search_button:
+            st.caption(f"{saved_item_count()} items saved across all menus.")
+            return
+        start = time.perf_counter()
+        items = store.search_items(
+            cuisine=None if cuisine == "Any" else cuisine,
+            diets=diets,
+            section=None if section == "Any" else section,
+            text=text or None,
+            limit=50,
+            unique=unique
+        )
+        st.caption(f"{len(items)} matching items ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        for item in items:
+            render_item(item.to_menu_item())
+            st.caption(f"{item.section} · {item.restaurant_name} ({item.cuisine})")
+
+
+def run_generation(inputs: Dict[str, Any]):
+    """Generate (or assemble) the requested menu and display it."""
+    assembled = None
+    if inputs["reuse_dishes"]:
+        assembled = get_generator().assemble_menu(
+            cuisine=inputs["cuisine"],
+            diets=inputs["diet_options"],
+            no_of_items=inputs["items_per_section"]
+        )
+    if assembled is not None:
+        st.session_state.last_menu = assembled
+        display_menu(assembled)
+        st.caption("Assembled from previously generated dishes.")
+    elif STREAM_MENUS:
+        with st.spinner("Naming your restaurant..."):
+            menu_stream = get_generator().stream_menu(
+                cuisine=inputs["cuisine"],
+                diets=inputs["diet_options"],
+                no_of_items=inputs["items_per_section"]
+            )
+        st.session_state.last_menu = display_menu_stream(menu_stream)
+    else:
+        with st.spinner("Generating your restaurant menu..."):
+            menu_response = get_generator().generate_menu(
+                cuisine=inputs["cuisine"],
+                diets=inputs["diet_options"],
+                no_of_items=inputs["items_per_section"]
+            )
+        st.session_state.last_menu = menu_response
+        display_menu(menu_response)
+
+
 def main():
     """Main application function."""
     if not initialize_session_state():
         return
+    get_metrics_server()
     st.title("🎪 Restaurant Menu Generator")
     st.markdown("---")
     inputs = create_sidebar()
+    display_search_panel()
     if not (inputs["cuisine"] and inputs["diet_options"]):
       st.warning("⚠️ Please select a cuisine and at least one dietary requirement.")
     if inputs["generate_button"]:
-        with st.spinner("Generating your restaurant menu..."):
-            try:
-                menu_response = st.session_state.generator.generate_menu(
-                    cuisine=inputs["cuisine"],
-                    diets=inputs["diet_options"],
-                    no_of_items=inputs["items_per_section"]
-                )
-                st.session_state.last_menu = menu_response
-                display_menu(menu_response)
-            except Exception as e:
-                logger.error(f"Error generating menu: {str(e)}")
-                st.error("Failed to generate menu. Please check your API key.")
+        try:
+            with span("dashboard_request", cuisine=inputs["cuisine"], items=inputs["items_per_section"]):
+                run_generation(inputs)
+        except Exception as e:
+            logger.error(f"Error generating menu: {type(e).__name__}: {str(e)}")
+            st.error(describe_error(e))
     elif st.session_state.last_menu:
             display_menu(st.session_state.last_menu)
 
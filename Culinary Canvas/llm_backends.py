@@ -0,0 +1,387 @@
+# llm_backends.py
+"""
+Registry of chat model backends for RestaurantMenuGenerator.
+
+Backends:
+    gemini  Google Gemini through langchain-google-genai (the default)
+    ollama  A local model served by Ollama through langchain-ollama
+    fake    FakeMenuLLM, an offline, deterministic stand-in for load tests
+
+The backend for the dashboard, the service and the batch CLI can be chosen
+with environment variables, for example:
+
+    MENU_LLM_BACKEND=fake MENU_LLM_OPTIONS='{"first_token_latency": 0.2}' streamlit run dashboard.py
+"""
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+LLMFactory = Callable[..., BaseChatModel]
+
+_BACKENDS: Dict[str, LLMFactory] = {}
+
+
+def register_backend(name: str) -> Callable[[LLMFactory], LLMFactory]:
+    """
+    Register a factory under a backend name.
+
+    The factory is called as factory(key, **options) and must return a
+    LangChain chat model.
+    """
+    def decorator(factory: LLMFactory) -> LLMFactory:
+        _BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def available_backends() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+def create_llm(backend: str = "gemini", key: Optional[str] = None, **options: Any) -> BaseChatModel:
+    """
+    Create the chat model for a registered backend.
+
+    Args:
+        backend (str, optional): Registered backend name. Defaults to "gemini"
+        key (Optional[str], optional): API key, for backends that need one
+        **options: Backend specific settings, such as model
+
+    Returns:
+        BaseChatModel: The chat model
+
+    Raises:
+        ValueError: If the backend is not registered
+    """
+    factory = _BACKENDS.get(backend)
+    if factory is None:
+        raise ValueError(f"Unknown LLM backend '{backend}', expected one of {available_backends()}")
+    return factory(key, **options)
+
+
+# How each chat model type (its _llm_type) takes a per-call output token limit
+_OUTPUT_LIMITS: Dict[str, Callable[[BaseChatModel, int], Dict[str, Any]]] = {
+    "chat-google-generative-ai": lambda llm, tokens: {'generation_config': {'max_output_tokens': tokens}},
+    # Ollama replaces all of its options when any are passed, so keep the model's own
+    "chat-ollama": lambda llm, tokens: {'options': {
+        **{name: getattr(llm, name) for name in ("temperature", "top_k", "top_p", "seed", "num_ctx")
+           if getattr(llm, name, None) is not None},
+        'num_predict': tokens,
+    }},
+    "fake-menu": lambda llm, tokens: {'max_tokens': tokens},
+}
+
+
+def output_limit_kwargs(llm: BaseChatModel, max_tokens: int) -> Dict[str, Any]:
+    """
+    Call keyword arguments that cap a chat model's completion at max_tokens.
+
+    Returns an empty dict, leaving the output unbounded, for model types
+    without a known setting.
+    """
+    limit = _OUTPUT_LIMITS.get(getattr(llm, "_llm_type", ""))
+    return limit(llm, max_tokens) if limit is not None else {}
+
+
+# How each chat model type is told to answer in JSON, for prompt_variant="json"
+_JSON_OUTPUT: Dict[str, Dict[str, Any]] = {
+    "chat-google-generative-ai": {'generation_config': {'response_mime_type': "application/json"}},
+    "chat-ollama": {'format': "json"},
+}
+
+
+def json_output_kwargs(llm: BaseChatModel) -> Dict[str, Any]:
+    """
+    Call keyword arguments that make a chat model answer in JSON.
+
+    Returns an empty dict for model types without a JSON mode; the prompt
+    still asks for JSON.
+    """
+    return dict(_JSON_OUTPUT.get(getattr(llm, "_llm_type", ""), {}))
+
+
+def merge_call_kwargs(*parts: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine call keyword arguments, merging dict values such as Gemini's generation_config."""
+    merged: Dict[str, Any] = {}
+    for part in parts:
+        for name, value in part.items():
+            if isinstance(value, dict) and isinstance(merged.get(name), dict):
+                value = {**merged[name], **value}
+            merged[name] = value
+    return merged
+
+
+def llm_identity(llm: BaseChatModel) -> str:
+    """The model type and model name, e.g. "chat-ollama:llama3.1", for telling cached outputs apart."""
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or ""
+    return f"{getattr(llm, '_llm_type', type(llm).__name__)}:{model}"
+
+
+def backend_from_env(default: str = "gemini") -> Tuple[str, Dict[str, Any]]:
+    """Read the backend name and its options from MENU_LLM_BACKEND and MENU_LLM_OPTIONS."""
+    backend = os.environ.get("MENU_LLM_BACKEND", default)
+    options = json.loads(os.environ.get("MENU_LLM_OPTIONS") or "{}")
+    if not isinstance(options, dict):
+        raise ValueError("MENU_LLM_OPTIONS must be a JSON object")
+    return backend, options
+
+
+@register_backend("gemini")
+def _gemini(key: Optional[str], model: str = "gemini-pro", **options: Any) -> BaseChatModel:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=model, google_api_key=key, **options)
+
+
+@register_backend("ollama")
+def _ollama(key: Optional[str], model: str = "llama3.1", **options: Any) -> BaseChatModel:
+    # Ollama runs locally and needs no key; base_url defaults to localhost:11434
+    from langchain_ollama import ChatOllama
+    return ChatOllama(model=model, **options)
+
+
+@register_backend("fake")
+def _fake(key: Optional[str], **options: Any) -> BaseChatModel:
+    return FakeMenuLLM(**options)
+
+
+# Vocabulary the fake model builds dishes from
+_STYLES = ["Roasted", "Smoked", "Charred", "Braised", "Crispy", "Spiced", "Grilled", "Glazed",
+           "Stuffed", "Slow-Cooked", "Herbed", "Citrus"]
+_PLANTS = ["Eggplant", "Cauliflower", "Chickpea", "Lentil", "Mushroom", "Squash", "Sweet Potato",
+           "Spinach", "Okra", "Black Bean", "Beetroot", "Jackfruit", "Tofu", "Corn"]
+_MEATS = ["Chicken", "Lamb", "Beef", "Prawn", "Duck", "Pork"]
+_DISHES = {
+    'Appetizers': ["Bites", "Fritters", "Skewers", "Salad", "Dumplings", "Tostadas", "Soup"],
+    'Main Courses': ["Curry", "Stew", "Tacos", "Risotto", "Bowl", "Tagine", "Stir-Fry"],
+    'Desserts': ["Tart", "Pudding", "Sorbet", "Cake", "Compote", "Parfait", "Fritters"],
+}
+_SWEETS = ["Mango", "Coconut", "Saffron", "Cardamom", "Chocolate", "Lemon", "Date", "Rose"]
+_FLAVOURS = ["lime", "garlic", "ginger", "cumin", "smoked paprika", "fresh herbs", "chili",
+             "tamarind", "toasted sesame", "roasted tomato", "charred onion", "citrus",
+             "cilantro", "black pepper", "sumac", "fennel"]
+_NAME_WORDS = (["The Golden", "Casa", "Maison", "The Velvet", "Little", "House of", "The Copper"],
+               ["Spoon", "Table", "Lantern", "Garden", "Kitchen", "Hearth", "Olive", "Pepper"])
+
+_PROMPT_DIETS = re.compile(r"strictly (.+?) options|food for this (.+?)\.")
+_PROMPT_ITEMS = re.compile(r"^(\d+) items", re.MULTILINE)
+_PROMPT_SECTION = re.compile(r"write only the (.+?) section", re.IGNORECASE)
+_PROMPT_WORDS = re.compile(r"at most (\d+) words")
+_JSON_PROMPT = "Respond with JSON only"
+
+
+class FakeMenuLLM(SimpleChatModel):
+    """
+    Offline chat model that writes plausible menus for the generator's prompts.
+
+    Output is a pure function of the prompt and seed, so runs are repeatable;
+    identical prompts get identical menus, different cuisines or diets get
+    different ones. Latency is simulated as a time to first token plus a per
+    character decode cost, optionally with seeded jitter. The output
+    distribution can be shaped for parser and load tests: menu size,
+    description length, and a share of deliberately messy responses.
+
+    Attributes:
+        first_token_latency: Seconds before the first token
+        seconds_per_char: Decode time per output character
+        latency_jitter: Relative spread of both delays, e.g. 0.2 for +/-20%
+        seed: Seed combined with each prompt to choose the output
+        items_per_section: Items per section, or None to follow the prompt
+        description_terms: Inclusive range of flavours listed per description
+        malformed_rate: Share of menus written with loose formatting
+        (no bold headers, descriptions on their own line, stray blank lines)
+        error_rate: Share of calls that fail with a retryable ConnectionError,
+        drawn from the latency seed so failure runs are repeatable too
+
+    Descriptions follow an "at most N words" limit in the prompt, and a
+    max_tokens call argument cuts the output off at about that many tokens.
+    Prompts that ask for JSON get a JSON menu; with malformed_rate, a share
+    of those are cut off halfway instead.
+    """
+    first_token_latency: float = 0.0
+    seconds_per_char: float = 0.0
+    latency_jitter: float = 0.0
+    seed: int = 0
+    items_per_section: Optional[int] = None
+    description_terms: Tuple[int, int] = (2, 5)
+    malformed_rate: float = 0.0
+    error_rate: float = 0.0
+
+    _latency_rng: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._latency_rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-menu"
+
+    # Output
+
+    def _answer(self, messages: List[BaseMessage], max_tokens: Optional[int] = None) -> str:
+        prompt = messages[-1].content
+        rng = random.Random(f"{self.seed}\0{prompt}")
+        if "Just the name" in prompt:
+            text = self._restaurant_name(rng)
+        elif _JSON_PROMPT in prompt:
+            text = self._menu_json(prompt, rng)
+        else:
+            text = self._menu(prompt, rng)
+            if "Restaurant Name:" in prompt:
+                text = f"Restaurant Name: {self._restaurant_name(rng)}\n\n{text}"
+        # Roughly four characters per token, like the estimate in menu_metrics
+        return text[:max_tokens * 4] if max_tokens else text
+
+    @staticmethod
+    def _restaurant_name(rng: random.Random) -> str:
+        return f"{rng.choice(_NAME_WORDS[0])} {rng.choice(_NAME_WORDS[1])}"
+
+    def _dishes(self,
+                prompt: str,
+                rng: random.Random) -> Tuple[List[str], bool, List[Tuple[str, List[Tuple[str, str]]]]]:
+        """Diets asked for, whether to answer messily, and (section, [(name, description)])."""
+        match = _PROMPT_DIETS.search(prompt)
+        diet_text = next((group for group in match.groups() if group), "") if match else ""
+        diets = [diet.strip() for diet in diet_text.split(",") if diet.strip()]
+        items_match = _PROMPT_ITEMS.search(prompt)
+        no_of_items = self.items_per_section or (int(items_match.group(1)) if items_match else 3)
+        meat_allowed = any(diet.casefold() == "non-vegetarian" for diet in diets)
+        messy = rng.random() < self.malformed_rate
+        # Per-section prompts (the "parallel" strategy) get just that section
+        section_match = _PROMPT_SECTION.search(prompt)
+        wanted = section_match.group(1) if section_match else None
+        words_match = _PROMPT_WORDS.search(prompt)
+
+        sections = []
+        for section, dishes in _DISHES.items():
+            if wanted is not None and section != wanted:
+                continue
+            items = []
+            names = []
+            for _ in range(no_of_items):
+                # A few retries keep names distinct without looping forever on large menus
+                for _ in range(10):
+                    if section == 'Desserts':
+                        name = f"{rng.choice(_SWEETS)} {rng.choice(dishes)}"
+                    else:
+                        base = rng.choice(_MEATS if meat_allowed and rng.random() < 0.5 else _PLANTS)
+                        name = f"{rng.choice(_STYLES)} {base} {rng.choice(dishes)}"
+                    if name not in names:
+                        break
+                names.append(name)
+                low, high = self.description_terms
+                terms = rng.sample(_FLAVOURS, min(len(_FLAVOURS), rng.randint(low, high)))
+                description = f"Made with {', '.join(terms)}."
+                if words_match:
+                    description = " ".join(description.split()[:int(words_match.group(1))]).rstrip(",.") + "."
+                items.append((name, description))
+            sections.append((section, items))
+        return diets, messy, sections
+
+    def _menu(self, prompt: str, rng: random.Random) -> str:
+        diets, messy, sections = self._dishes(prompt, rng)
+        tags = f" ({', '.join(diets)})" if diets else ""
+        blocks = []
+        for section, items in sections:
+            lines = [section if messy else f"**{section}**"]
+            for name, description in items:
+                if messy:
+                    lines.append(f"* {name}{tags}:\n  {description}\n")
+                else:
+                    lines.append(f"* {name}{tags}: {description}")
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+    def _menu_json(self, prompt: str, rng: random.Random) -> str:
+        diets, _, sections = self._dishes(prompt, rng)
+        document: Dict[str, Any] = {}
+        if '"restaurant_name"' in prompt:
+            document['restaurant_name'] = self._restaurant_name(rng)
+        document['sections'] = [
+            {'name': section,
+             'items': [{'name': name, 'description': description, 'dietary': diets}
+                       for name, description in items]}
+            for section, items in sections
+        ]
+        text = json.dumps(document, ensure_ascii=False)
+        # A messy JSON answer is cut off halfway. It is drawn from the latency
+        # seed rather than the prompt, so asking again can come out clean.
+        if self.malformed_rate and self._latency_rng.random() < self.malformed_rate:
+            return text[:len(text) // 2]
+        return text
+
+    # Latency
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and self._latency_rng.random() < self.error_rate:
+            raise ConnectionError("Simulated LLM backend failure")
+
+    def _delay(self, seconds: float) -> float:
+        if self.latency_jitter and seconds:
+            seconds *= 1 + self._latency_rng.uniform(-self.latency_jitter, self.latency_jitter)
+        return max(seconds, 0.0)
+
+    def _call(self,
+              messages: List[BaseMessage],
+              stop: Optional[List[str]] = None,
+              run_manager: Optional[Any] = None,
+              **kwargs: Any) -> str:
+        self._maybe_fail()
+        text = self._answer(messages, kwargs.get('max_tokens'))
+        delay = self._delay(self.first_token_latency + self.seconds_per_char * len(text))
+        if delay:
+            time.sleep(delay)
+        return text
+
+    async def _agenerate(self,
+                         messages: List[BaseMessage],
+                         stop: Optional[List[str]] = None,
+                         run_manager: Optional[Any] = None,
+                         **kwargs: Any) -> ChatResult:
+        # Sleep on the event loop instead of in a worker thread, so thousands of
+        # concurrent async requests are not capped by the executor's size
+        self._maybe_fail()
+        text = self._answer(messages, kwargs.get('max_tokens'))
+        delay = self._delay(self.first_token_latency + self.seconds_per_char * len(text))
+        if delay:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self,
+                messages: List[BaseMessage],
+                stop: Optional[List[str]] = None,
+                run_manager: Optional[Any] = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        delay = self._delay(self.first_token_latency)
+        if delay:
+            time.sleep(delay)
+        for line in self._answer(messages, kwargs.get('max_tokens')).splitlines(keepends=True):
+            delay = self._delay(self.seconds_per_char * len(line))
+            if delay:
+                time.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=line))
+
+    async def _astream(self,
+                       messages: List[BaseMessage],
+                       stop: Optional[List[str]] = None,
+                       run_manager: Optional[Any] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        delay = self._delay(self.first_token_latency)
+        if delay:
+            await asyncio.sleep(delay)
+        for line in self._answer(messages, kwargs.get('max_tokens')).splitlines(keepends=True):
+            delay = self._delay(self.seconds_per_char * len(line))
+            if delay:
+                await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=line))
@@ -0,0 +1,278 @@
+# menu_batch.py
+"""
+Batch menu generation for pre-rendering the cuisine x diet matrix.
+
+Results are appended to a JSONL file as each job finishes, one line per job,
+and the same file doubles as the checkpoint: rerunning the command skips
+every job that already has a successful line made with the same generator
+settings (strategy, prompt variant, output limit and model).
+
+Examples:
+    python menu_batch.py --all --output menus.jsonl --workers 4 --rate 2
+    python menu_batch.py --spec jobs.jsonl --output menus.jsonl
+    python menu_batch.py --all --store menu_store.db
+    python menu_batch.py --all --backend fake --rate 0 --output load.jsonl
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import combinations, islice
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+from menu_cache import make_cache_key
+from menu_generator import RestaurantMenuGenerator, CUISINES, DIET_OPTIONS, PROMPT_VARIANTS
+from menu_store import MenuStore
+from secret_key import API_KEY as api_key
+from llm_backends import available_backends, backend_from_env
+
+logger = logging.getLogger(__name__)
+
+
+def job_key(job: Dict[str, Any], namespace: str = "") -> str:
+    """
+    Identify a job by the same normalized key the response cache uses.
+
+    Pass the generator's cache_namespace so a job finished with other
+    settings is not mistaken for this one when resuming.
+    """
+    return make_cache_key(job['cuisine'], job['diets'], job['no_of_items'], namespace=namespace)
+
+
+def build_jobs(cuisines: Iterable[str] = CUISINES,
+               diet_options: Iterable[str] = DIET_OPTIONS,
+               max_diets: int = 2,
+               min_items: int = 1,
+               max_items: int = 10) -> List[Dict[str, Any]]:
+    """
+    Build the cross product of cuisines, diet combinations and item counts.
+
+    Args:
+        cuisines (Iterable[str], optional): Cuisines to include
+        diet_options (Iterable[str], optional): Diets to combine
+        max_diets (int, optional): Largest diet combination size. Defaults to 2
+        min_items (int, optional): Smallest items-per-section value. Defaults to 1
+        max_items (int, optional): Largest items-per-section value. Defaults to 10
+
+    Returns:
+        List[Dict[str, Any]]: Jobs as generate_menu keyword arguments
+    """
+    if max_diets < 1:
+        raise ValueError("max_diets must be positive")
+    if not 1 <= min_items <= max_items:
+        raise ValueError("Item range must satisfy 1 <= min_items <= max_items")
+
+    diet_options = list(diet_options)
+    diet_sets = [
+        list(combo)
+        for size in range(1, min(max_diets, len(diet_options)) + 1)
+        for combo in combinations(diet_options, size)
+    ]
+    return [
+        {'cuisine': cuisine, 'diets': diets, 'no_of_items': no_of_items}
+        for cuisine in cuisines
+        for diets in diet_sets
+        for no_of_items in range(min_items, max_items + 1)
+    ]
+
+
+def load_jobs(path: str) -> List[Dict[str, Any]]:
+    """Load a job spec: a JSON list or JSONL lines of generate_menu kwargs."""
+    with open(path, encoding="utf-8") as spec_file:
+        text = spec_file.read().strip()
+    if text.startswith('['):
+        jobs = json.loads(text)
+    else:
+        jobs = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for job in jobs:
+        if not {'cuisine', 'diets', 'no_of_items'} <= job.keys():
+            raise ValueError(f"Job is missing cuisine, diets or no_of_items: {job}")
+    return jobs
+
+
+def load_completed(output_path: str) -> Set[str]:
+    """Return keys of jobs that already succeeded in a previous run."""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as output_file:
+        for line in output_file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated final line; that job reruns
+                continue
+            if record.get('status') == 'ok':
+                completed.add(record['key'])
+    return completed
+
+
+def _terminate_partial_line(output_path: str) -> None:
+    """Make sure appended records start on a fresh line after a crash mid-write."""
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return
+    with open(output_path, "rb+") as output_file:
+        output_file.seek(-1, os.SEEK_END)
+        if output_file.read(1) != b"\n":
+            output_file.write(b"\n")
+
+
+class RateLimiter:
+    """Spaces out job starts to at most `rate` per second across all workers."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def run_batch(generator: RestaurantMenuGenerator,
+              jobs: List[Dict[str, Any]],
+              output_path: str,
+              workers: int = 4,
+              rate: Optional[float] = None,
+              resume: bool = True) -> Dict[str, int]:
+    """
+    Run jobs through a worker pool, appending one JSONL record per finished job.
+
+    Args:
+        generator (RestaurantMenuGenerator): Generator used for every job
+        jobs (List[Dict[str, Any]]): Jobs as generate_menu keyword arguments
+        output_path (str): JSONL file that receives results and acts as checkpoint
+        workers (int, optional): Worker threads. Defaults to 4
+        rate (Optional[float], optional): Max job starts per second. Defaults to unlimited
+        resume (bool, optional): Skip jobs already completed in output_path. Defaults to True
+
+    Only about two jobs per worker are queued at a time. If the run is
+    interrupted or fails, queued jobs are cancelled rather than left to call
+    the LLM for results that would never be written.
+
+    Returns:
+        Dict[str, int]: Counts of 'ok', 'error' and 'skipped' jobs
+    """
+    if workers < 1:
+        raise ValueError("workers must be positive")
+
+    completed = load_completed(output_path) if resume else set()
+    pending = []
+    seen = set(completed)
+    for job in jobs:
+        key = job_key(job, generator.cache_namespace)
+        if key not in seen:
+            seen.add(key)
+            pending.append((key, job))
+    counts = {'ok': 0, 'error': 0, 'skipped': len(jobs) - len(pending)}
+    logger.info(f"{len(pending)} jobs to run, {counts['skipped']} skipped")
+
+    limiter = RateLimiter(rate)
+
+    def run_job(key: str, job: Dict[str, Any]) -> Dict[str, Any]:
+        limiter.wait()
+        start = time.perf_counter()
+        try:
+            response = generator.generate_menu(**job)
+            record = {'key': key, 'job': job, 'status': 'ok', 'response': response.to_dict()}
+        except Exception as e:
+            record = {'key': key, 'job': job, 'status': 'error', 'error': str(e)}
+        record['elapsed'] = round(time.perf_counter() - start, 3)
+        return record
+
+    if resume:
+        _terminate_partial_line(output_path)
+
+    remaining = iter(pending)
+    window = 2 * workers
+    in_flight = set()
+    done = 0
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        with open(output_path, "a" if resume else "w", encoding="utf-8") as output_file:
+            while True:
+                for key, job in islice(remaining, window - len(in_flight)):
+                    in_flight.add(executor.submit(run_job, key, job))
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output_file.flush()
+                    counts[record['status']] += 1
+                    if record['status'] == 'error':
+                        logger.error(f"Job {record['key']} failed: {record['error']}")
+                    done += 1
+                    if done % 50 == 0 or done == len(pending):
+                        logger.info(f"{done}/{len(pending)} jobs finished")
+    except BaseException:
+        # Jobs already running finish on their own; nothing new is started
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pre-generate menus in bulk.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--spec", help="JSON or JSONL file of jobs")
+    source.add_argument("--all", action="store_true",
+                        help="Run the full cuisine x diet x items cross product")
+    parser.add_argument("--output", default="menus.jsonl", help="JSONL results file")
+    parser.add_argument("--cuisines", nargs="+", default=CUISINES)
+    parser.add_argument("--max-diets", type=int, default=2,
+                        help="Largest diet combination size for --all")
+    parser.add_argument("--min-items", type=int, default=1)
+    parser.add_argument("--max-items", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Max job starts per second (0 for unlimited)")
+    parser.add_argument("--strategy", choices=RestaurantMenuGenerator.STRATEGIES,
+                        default="sequential")
+    parser.add_argument("--prompt-variant", choices=sorted(PROMPT_VARIANTS), default="full")
+    parser.add_argument("--description-words", type=int,
+                        help="Description length cap of the compact prompts")
+    parser.add_argument("--limit-output", action="store_true",
+                        help="Cap each completion at a token budget derived from the items per section")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Overwrite the output instead of resuming from it")
+    parser.add_argument("--store", help="Also save generated menus to this menu store database")
+    env_backend, backend_options = backend_from_env()
+    parser.add_argument("--backend", choices=available_backends(), default=env_backend,
+                        help="LLM backend; options come from MENU_LLM_OPTIONS")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.spec:
+        jobs = load_jobs(args.spec)
+    else:
+        jobs = build_jobs(args.cuisines, DIET_OPTIONS, args.max_diets,
+                          args.min_items, args.max_items)
+
+    store = MenuStore(args.store) if args.store else None
+    generator = RestaurantMenuGenerator(key=api_key, strategy=args.strategy, store=store,
+                                        backend=args.backend, backend_options=backend_options,
+                                        prompt_variant=args.prompt_variant,
+                                        description_words=args.description_words,
+                                        limit_output_tokens=args.limit_output)
+    counts = run_batch(generator, jobs, args.output, workers=args.workers,
+                       rate=args.rate or None, resume=not args.no_resume)
+    logger.info(f"Done: {counts['ok']} ok, {counts['error']} failed, {counts['skipped']} skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# menu_cache.py
+from typing import Iterable, List, Optional, Tuple, Union
+from collections import OrderedDict
+from dataclasses import dataclass
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from menu_generator import MenuResponse
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_diets(diets: Union[str, Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Canonicalize dietary restrictions so equivalent selections share a key.
+
+    Accepts either a list of restrictions or a comma separated string, so
+    ["Vegan", "Gluten-Free"] and "gluten-free, vegan" both normalize to
+    ('gluten-free', 'vegan').
+    """
+    if isinstance(diets, str):
+        diets = diets.split(',')
+    return tuple(sorted({diet.strip().casefold() for diet in diets if diet and diet.strip()}))
+
+
+def make_cache_key(cuisine: str,
+                   diets: Union[str, List[str]],
+                   no_of_items: int,
+                   namespace: str = "") -> str:
+    """Build the canonical cache key for a generate_menu call."""
+    return "|".join([
+        namespace,
+        cuisine.strip().casefold(),
+        ",".join(normalize_diets(diets)),
+        str(int(no_of_items)),
+    ])
+
+
+class CacheBackend:
+    """Interface for cache storage backends. Values are serialized strings."""
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = 3600):
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive or None")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl is not None else None
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class LRUCacheBackend(CacheBackend):
+    """In-process LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = 3600):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self._entries: "OrderedDict[str, Tuple[Optional[float], str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (self._expires_at(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """On-disk cache shared across processes, evicting least recently used entries."""
+
+    def __init__(self,
+                 path: str = "menu_cache.db",
+                 max_entries: int = 10000,
+                 ttl: Optional[float] = 24 * 3600):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS menu_cache ("
+            "key TEXT PRIMARY KEY, "
+            "value TEXT NOT NULL, "
+            "expires_at REAL, "
+            "accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_menu_cache_accessed ON menu_cache (accessed_at)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM menu_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM menu_cache WHERE key = ?", (key,))
+                self.evictions += 1
+                return None
+            self._conn.execute(
+                "UPDATE menu_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO menu_cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, self._expires_at(), now)
+            )
+            expired = self._conn.execute(
+                "DELETE FROM menu_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            ).rowcount
+            overflow = self._conn.execute(
+                "DELETE FROM menu_cache WHERE key IN ("
+                "SELECT key FROM menu_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self.evictions += max(expired, 0) + max(overflow, 0)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM menu_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM menu_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM menu_cache").fetchone()[0]
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a MenuCache."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class MenuCache:
+    """
+    Caches MenuResponse objects by normalized (cuisine, diets, no_of_items).
+
+    Keys start with the cache's own namespace, then the namespace passed to
+    get and set. RestaurantMenuGenerator passes its cache_namespace, so
+    generators with different settings can share one backend.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, namespace: str = ""):
+        self.backend = backend if backend is not None else LRUCacheBackend()
+        self.namespace = namespace
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def key(self,
+            cuisine: str,
+            diets: Union[str, List[str]],
+            no_of_items: int,
+            namespace: str = "") -> str:
+        namespace = "/".join(part for part in (self.namespace, namespace) if part)
+        return make_cache_key(cuisine, diets, no_of_items, namespace=namespace)
+
+    def get(self,
+            cuisine: str,
+            diets: Union[str, List[str]],
+            no_of_items: int,
+            namespace: str = "") -> Optional[MenuResponse]:
+        """
+        Return the cached menu for these inputs, or None on a miss.
+
+        Entries that no longer decode, such as ones written in an older
+        compact layout version or legacy JSON missing fields, count as
+        misses and are deleted.
+        """
+        key = self.key(cuisine, diets, no_of_items, namespace)
+        payload = self.backend.get(key)
+        response = None
+        if payload is not None:
+            try:
+                if payload.startswith('{'):
+                    # Written by to_dict before the cache switched to the compact layout
+                    response = MenuResponse.from_dict(json.loads(payload))
+                else:
+                    response = MenuResponse.from_bytes(payload.encode("utf-8"))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Dropping unreadable cache entry {key!r}: {e}")
+                self.backend.delete(key)
+        with self._lock:
+            if response is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return response
+
+    def set(self,
+            cuisine: str,
+            diets: Union[str, List[str]],
+            no_of_items: int,
+            response: MenuResponse,
+            namespace: str = "") -> None:
+        """Store a generated menu under the normalized key, in MenuResponse's compact layout."""
+        self.backend.set(self.key(cuisine, diets, no_of_items, namespace),
+                         response.to_bytes().decode("utf-8"))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses,
+                              evictions=self.backend.evictions)
@@ -0,0 +1,321 @@
+# menu_dedup.py
+"""
+Near-duplicate detection for generated menu items.
+
+Items are fingerprinted locally, without a model download: the words and
+character trigrams of the name and description are feature-hashed into a
+fixed-size unit vector, so dishes that share most of their words and
+spellings have a high cosine similarity. Texture and form words (FORM_WORDS)
+count for less than the words naming the dish, so "Falafel Bites" and
+"Crispy Falafel Balls" match while "Chicken Tikka" and "Chicken Curry" do
+not. DuplicateIndex keeps the vectors of canonical items in one NumPy
+matrix, blocked by name words so each item is only scored against the
+handful of dishes it could plausibly duplicate.
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import logging
+import re
+import zlib
+
+import numpy as np
+
+from menu_utils import MenuParser, format_menu_text
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# Function words and menu boilerplate that say nothing about the dish itself.
+# Texture and form words are not dropped here but weighted down, see FORM_WORDS.
+STOPWORDS = frozenset("""
+a an and or the with of in on to for from by over under served topped tossed
+drizzled finished our house style fresh
+""".split())
+
+
+def _feature_slot(feature: str, dim: int) -> Tuple[int, float]:
+    # crc32 is stable across processes, unlike hash(), so stored vectors stay valid
+    digest = zlib.crc32(feature.encode("utf-8"))
+    return digest % dim, 1.0 if digest & 0x80000000 else -1.0
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("es"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+# How a dish is shaped or cooked rather than what it is; the model swaps these
+# freely between generations. Stemmed like every other word.
+FORM_WORDS = frozenset(_stem(word) for word in """
+crispy crunchy golden fried mini bites bite balls ball nuggets poppers
+""".split())
+
+
+class DuplicateMatch(NamedTuple):
+    """An item found to be a near-duplicate of an earlier one."""
+    item: Any
+    duplicate_of: Any
+    score: float
+
+
+class ItemFingerprinter:
+    """
+    Turns item names and descriptions into unit vectors for cosine search.
+
+    Each word contributes itself and its character trigrams, hashed into
+    dim slots. Name features are weighted above description features, since
+    two dishes with the same name are duplicates even when described
+    differently, and FORM_WORDS are scaled by form_weight.
+    """
+
+    def __init__(self,
+                 dim: int = 256,
+                 name_weight: float = 1.0,
+                 description_weight: float = 0.5,
+                 form_weight: float = 0.3):
+        if dim < 16:
+            raise ValueError("dim must be at least 16")
+        self.dim = dim
+        self.name_weight = name_weight
+        self.description_weight = description_weight
+        self.form_weight = form_weight
+        self._slot_cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def words(self, text: str) -> List[str]:
+        """Return the stemmed, stopword-free words of a text."""
+        return [_stem(word) for word in _WORD.findall(text.casefold()) if word not in STOPWORDS]
+
+    def _word_slots(self, word: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Hashed slots and signs of a word's features, computed once per word."""
+        cached = self._slot_cache.get(word)
+        if cached is None:
+            padded = f"^{word}$"
+            features = [f"w:{word}"] + [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+            slots, signs = zip(*(_feature_slot(feature, self.dim) for feature in features))
+            cached = np.array(slots, dtype=np.int64), np.array(signs, dtype=np.float32)
+            if len(self._slot_cache) < 1 << 18:
+                self._slot_cache[word] = cached
+        return cached
+
+    def embed(self, name: str, description: str = "") -> np.ndarray:
+        """Return the unit fingerprint vector for one item."""
+        return self.embed_many([(name, description)])[0]
+
+    def embed_many(self, items: Iterable[Tuple[str, str]]) -> np.ndarray:
+        """Return an (n, dim) float32 matrix of fingerprints for (name, description) pairs."""
+        flat_slots, weights = [], []
+        count = 0
+        for row, (name, description) in enumerate(items):
+            count += 1
+            for text, weight in ((name, self.name_weight), (description, self.description_weight)):
+                for word in self.words(text or ""):
+                    slots, signs = self._word_slots(word)
+                    flat_slots.append(slots + row * self.dim)
+                    weights.append(signs * (weight * self.form_weight if word in FORM_WORDS else weight))
+        if flat_slots:
+            matrix = np.bincount(np.concatenate(flat_slots), weights=np.concatenate(weights),
+                                 minlength=count * self.dim).astype(np.float32)
+        else:
+            matrix = np.zeros(count * self.dim, dtype=np.float32)
+        matrix = matrix.reshape(count, self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def blocking_keys(self, name: str) -> List[str]:
+        """
+        Words of the name; only items sharing one of them are compared.
+
+        FORM_WORDS are left out unless the name has nothing else, so a rare
+        "poppers" cannot crowd out the dish word two variants share.
+        """
+        words = set(self.words(name))
+        return sorted(words - FORM_WORDS or words) or [name.strip().casefold()]
+
+
+class DuplicateIndex:
+    """
+    Vectors of canonical items with an inverted index over their name words.
+
+    A query is scored only against items that share one of its rarest name
+    words, so matching stays close to linear in the corpus size instead of
+    comparing every pair. Candidate scores are a single vectorized product.
+    Vectors are stored as float16 in a matrix that grows in chunks, which
+    keeps a few hundred thousand items within tens of megabytes.
+    """
+
+    def __init__(self, dim: int = 256, keys_per_query: int = 2):
+        self.dim = dim
+        self.keys_per_query = keys_per_query
+        self._vectors = np.zeros((0, dim), dtype=np.float16)
+        self._ids: List[Any] = []
+        self._postings: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids: Sequence[Any], vectors: np.ndarray, keys: Sequence[Sequence[str]]) -> None:
+        """Append vectors for the given item ids, filed under their blocking keys."""
+        if not len(ids) == len(vectors) == len(keys):
+            raise ValueError("ids, vectors and keys must have the same length")
+        start = len(self._ids)
+        needed = start + len(ids)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors), 1024)
+            grown = np.zeros((capacity, self.dim), dtype=np.float16)
+            grown[:start] = self._vectors[:start]
+            self._vectors = grown
+        self._vectors[start:needed] = vectors
+        self._ids.extend(ids)
+        for row, item_keys in enumerate(keys, start=start):
+            for key in item_keys:
+                self._postings.setdefault(key, []).append(row)
+
+    def best_match(self, vector: np.ndarray, keys: Sequence[str]) -> Tuple[int, float]:
+        """
+        Find the most similar indexed item sharing one of the given keys.
+
+        Returns:
+            Tuple[int, float]: Row of the best match (-1 if there are no
+            candidates) and its cosine similarity
+        """
+        postings = sorted((self._postings[key] for key in keys if key in self._postings), key=len)
+        if not postings:
+            return -1, 0.0
+        candidates = np.unique(np.concatenate(postings[:self.keys_per_query]))
+        scores = self._vectors[candidates].astype(np.float32) @ vector
+        best = int(scores.argmax())
+        return int(candidates[best]), float(scores[best])
+
+    def id_at(self, row: int) -> Any:
+        return self._ids[row]
+
+    def extend(self, other: "DuplicateIndex") -> None:
+        """Append every item of another index, keeping their blocking keys."""
+        keys: List[List[str]] = [[] for _ in range(len(other))]
+        for key, rows in other._postings.items():
+            for row in rows:
+                keys[row].append(key)
+        self.add(other._ids, other._vectors[:len(other)], keys)
+
+
+class MenuDeduplicator:
+    """
+    Flags near-duplicate items within a menu and across a corpus.
+
+    Args:
+        threshold (float, optional): Cosine similarity at or above which two
+            items are duplicates. Defaults to 0.8
+        fingerprinter (Optional[ItemFingerprinter], optional): Defaults to a
+            256-dimension ItemFingerprinter
+    """
+
+    def __init__(self, threshold: float = 0.8, fingerprinter: Optional[ItemFingerprinter] = None):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.fingerprinter = fingerprinter or ItemFingerprinter()
+
+    def new_index(self) -> DuplicateIndex:
+        return DuplicateIndex(self.fingerprinter.dim)
+
+    def match_batch(self,
+                    ids: Sequence[Any],
+                    items: Sequence[Tuple[str, str]],
+                    index: DuplicateIndex,
+                    vectors: Optional[np.ndarray] = None,
+                    pending: Optional[DuplicateIndex] = None) -> List[Optional[DuplicateMatch]]:
+        """
+        Match a batch of (name, description) items against an index.
+
+        Items are fingerprinted together, then matched in order; items that
+        are not duplicates join the index as canonical items straight away,
+        so later items of the same batch are matched against them too.
+        Duplicates never join, so every match points at a canonical item.
+
+        With pending, canonical items join pending instead and items are
+        matched against both indexes, leaving index itself unchanged; this
+        lets MenuStore add a transaction's items only once it commits.
+
+        Returns:
+            List[Optional[DuplicateMatch]]: One entry per item, None for canonical items
+        """
+        if vectors is None:
+            vectors = self.fingerprinter.embed_many(items)
+        target = index if pending is None else pending
+        matches: List[Optional[DuplicateMatch]] = []
+        for item_id, (name, _), vector in zip(ids, items, vectors):
+            keys = self.fingerprinter.blocking_keys(name)
+            row, score = index.best_match(vector, keys)
+            owner = index
+            if pending is not None:
+                pending_row, pending_score = pending.best_match(vector, keys)
+                if pending_row >= 0 and (row < 0 or pending_score > score):
+                    row, score, owner = pending_row, pending_score, pending
+            if row >= 0 and score >= self.threshold:
+                matches.append(DuplicateMatch(item_id, owner.id_at(row), score))
+            else:
+                target.add([item_id], vector[None, :], [keys])
+                matches.append(None)
+        return matches
+
+    def find_in_menu(self, sections: Dict[str, List[Dict[str, Any]]]) -> List[DuplicateMatch]:
+        """
+        Find items repeated within one menu.
+
+        Returns:
+            List[DuplicateMatch]: Matches whose item and duplicate_of are
+            (section, position) pairs, the earlier item being kept
+        """
+        ids = [(section, position) for section, items in sections.items() for position in range(len(items))]
+        items = [(sections[section][position]['name'], sections[section][position]['description'])
+                 for section, position in ids]
+        matches = self.match_batch(ids, items, self.new_index())
+        return [match for match in matches if match is not None]
+
+    def dedupe_sections(self,
+                        sections: Dict[str, List[Dict[str, Any]]]
+                        ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[DuplicateMatch]]:
+        """Return the sections without repeated items, and the matches that were dropped."""
+        matches = self.find_in_menu(sections)
+        dropped = {match.item for match in matches}
+        deduped = {
+            section: [item for position, item in enumerate(items) if (section, position) not in dropped]
+            for section, items in sections.items()
+        }
+        return deduped, matches
+
+    def dedupe_menu(self, response: Any) -> Any:
+        """
+        Merge repeated items of a MenuResponse, keeping the first occurrence.
+
+        The menu text is rewritten from the remaining items, so the text and
+        the parsed views stay consistent. A menu without duplicates is
+        returned unchanged.
+        """
+        sections, matches = self.dedupe_sections(response.sections)
+        if not matches:
+            return response
+        for match in matches:
+            logger.info(f"Dropped duplicate item {match.item} of {match.duplicate_of} ({match.score:.2f})")
+        menu = format_menu_text(sections)
+        parsed = MenuParser.parse(menu)
+        return type(response).from_sections(
+            cuisine=response.cuisine,
+            restaurant_name=response.restaurant_name,
+            menu=menu,
+            sections=parsed.sections,
+            usage=response.usage,
+            parsed_menu=parsed.parsed_menu
+        )
+
+    def to_bytes(self, vector: np.ndarray) -> bytes:
+        """Serialize a fingerprint for storage."""
+        return vector.astype(np.float16).tobytes()
+
+    def from_bytes(self, data: bytes) -> np.ndarray:
+        """Deserialize fingerprints written by to_bytes into an (n, dim) matrix."""
+        return np.frombuffer(data, dtype=np.float16).reshape(-1, self.fingerprinter.dim)
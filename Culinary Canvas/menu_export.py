@@ -0,0 +1,549 @@
+# menu_export.py
+"""
+Export menus as Markdown, HTML, JSON, CSV or PDF.
+
+Every format has a streaming writer: menus are written as they are passed
+in, so exporting thousands of menus from a batch run holds one menu at a
+time. Markdown and HTML use Jinja2 templates compiled once per process, and
+the PDF writer produces a plain PDF 1.4 file with the standard Helvetica
+fonts, so no extra dependency is needed. export_zip renders menus in worker
+processes, one file per menu and format, into a single zip archive.
+
+Examples:
+    python menu_export.py menus.jsonl --format html --output menus.html
+    python menu_export.py menus.jsonl --zip menus.zip --formats markdown pdf --workers 4
+    python menu_export.py --store menu_store.db --format csv --output items.csv
+"""
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import argparse
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import re
+import textwrap
+import unicodedata
+import zipfile
+import zlib
+
+import jinja2
+import orjson
+
+from menu_generator import MenuResponse
+from menu_store import MenuStore
+
+logger = logging.getLogger(__name__)
+
+# Templates are compiled once per process, not per menu
+_MARKDOWN_ENV = jinja2.Environment(autoescape=False, trim_blocks=True, lstrip_blocks=True,
+                                   keep_trailing_newline=True)
+_HTML_ENV = jinja2.Environment(autoescape=True, trim_blocks=True, lstrip_blocks=True,
+                               keep_trailing_newline=True)
+
+MARKDOWN_TEMPLATE = _MARKDOWN_ENV.from_string("""\
+# {{ menu.restaurant_name }}
+
+*{{ menu.cuisine }} cuisine*
+{% for section in menu.menu_sections if section.items %}
+
+## {{ section.name }}
+{% for item in section.items %}
+
+### {{ item.name }}{{ ' (%s)' % (item.dietary | join(', ')) if item.dietary else '' }}
+{% if item.description %}
+
+{{ item.description }}
+{% endif %}
+{% endfor %}
+{% endfor %}
+""")
+
+HTML_HEADER_TEMPLATE = _HTML_ENV.from_string("""\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{{ title }}</title>
+<style>
+body { font-family: Georgia, serif; max-width: 48rem; margin: 2rem auto; padding: 0 1rem; color: #222; }
+article { margin-bottom: 3rem; break-after: page; }
+h1 { margin-bottom: 0; }
+h2 { border-bottom: 1px solid #ccc; padding-bottom: .25rem; }
+h3 { margin-bottom: .25rem; font-size: 1.1rem; }
+.cuisine { margin-top: .25rem; color: #666; font-style: italic; }
+.dietary { font-weight: normal; font-size: .9rem; color: #2e7d32; }
+.dish p { margin-top: 0; }
+</style>
+</head>
+<body>
+""")
+
+HTML_MENU_TEMPLATE = _HTML_ENV.from_string("""\
+<article>
+<h1>{{ menu.restaurant_name }}</h1>
+<p class="cuisine">{{ menu.cuisine }} cuisine</p>
+{% for section in menu.menu_sections if section.items %}
+<section>
+<h2>{{ section.name }}</h2>
+{% for item in section.items %}
+<div class="dish">
+<h3>{{ item.name }}{% if item.dietary %} <span class="dietary">({{ item.dietary | join(', ') }})</span>{% endif %}</h3>
+{% if item.description %}
+<p>{{ item.description }}</p>
+{% endif %}
+</div>
+{% endfor %}
+</section>
+{% endfor %}
+</article>
+""")
+
+HTML_FOOTER = "</body>\n</html>\n"
+
+CSV_COLUMNS = ["restaurant_name", "cuisine", "section", "name", "description", "dietary"]
+
+
+class MenuWriter:
+    """
+    Streaming writer of one export file.
+
+    Call write once per menu and close once at the end; close finishes the
+    file but leaves the stream open. Writers are context managers.
+    """
+    extension = ""
+    media_type = "application/octet-stream"
+
+    def __init__(self, stream: BinaryIO, title: str = "Menus"):
+        self.stream = stream
+        self.title = title
+        self.count = 0
+        self._started = False
+
+    def __enter__(self) -> "MenuWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+
+    def write(self, response: MenuResponse) -> None:
+        """Write one menu."""
+        if not self._started:
+            self._started = True
+            self._begin()
+        self._write_menu(response)
+        self.count += 1
+
+    def close(self) -> None:
+        """Write whatever the format needs after the last menu."""
+        if not self._started:
+            self._started = True
+            self._begin()
+        self._end()
+
+    def _emit(self, text: str) -> None:
+        self.stream.write(text.encode("utf-8"))
+
+    def _begin(self) -> None:
+        pass
+
+    def _write_menu(self, response: MenuResponse) -> None:
+        raise NotImplementedError
+
+    def _end(self) -> None:
+        pass
+
+
+class MarkdownWriter(MenuWriter):
+    """Menus as Markdown documents separated by horizontal rules."""
+    extension = "md"
+    media_type = "text/markdown"
+
+    def _write_menu(self, response: MenuResponse) -> None:
+        if self.count:
+            self._emit("\n---\n\n")
+        self._emit(MARKDOWN_TEMPLATE.render(menu=response))
+
+
+class HtmlWriter(MenuWriter):
+    """One HTML page with an <article> per menu, each printed on its own page."""
+    extension = "html"
+    media_type = "text/html"
+
+    def _begin(self) -> None:
+        self._emit(HTML_HEADER_TEMPLATE.render(title=self.title))
+
+    def _write_menu(self, response: MenuResponse) -> None:
+        self._emit(HTML_MENU_TEMPLATE.render(menu=response))
+
+    def _end(self) -> None:
+        self._emit(HTML_FOOTER)
+
+
+class JsonWriter(MenuWriter):
+    """A JSON array of MenuResponse.to_dict objects, readable with MenuResponse.from_dict."""
+    extension = "json"
+    media_type = "application/json"
+
+    def _begin(self) -> None:
+        self.stream.write(b"[")
+
+    def _write_menu(self, response: MenuResponse) -> None:
+        self.stream.write(b",\n" if self.count else b"\n")
+        self.stream.write(orjson.dumps(response.to_dict()))
+
+    def _end(self) -> None:
+        self.stream.write(b"\n]\n" if self.count else b"]\n")
+
+
+class CsvWriter(MenuWriter):
+    """One row per menu item; dietary labels are joined with '; '."""
+    extension = "csv"
+    media_type = "text/csv"
+
+    def _begin(self) -> None:
+        self._write_rows([CSV_COLUMNS])
+
+    def _write_menu(self, response: MenuResponse) -> None:
+        self._write_rows(
+            [response.restaurant_name, response.cuisine, section.name, item.name, item.description,
+             "; ".join(item.dietary)]
+            for section in response.menu_sections
+            for item in section.items
+        )
+
+    def _write_rows(self, rows: Iterable[List[str]]) -> None:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        self._emit(buffer.getvalue())
+
+
+class PdfWriter(MenuWriter):
+    """
+    Printable menus as a PDF 1.4 file, each menu starting on a new page.
+
+    Objects are written as soon as each page is laid out and their offsets
+    counted, so the stream does not need to be seekable; only the object
+    offsets and page ids are kept until close writes the page tree and the
+    cross-reference table. Text uses the standard Helvetica fonts with
+    WinAnsiEncoding, so characters outside it (emoji) print as '?'.
+    """
+    extension = "pdf"
+    media_type = "application/pdf"
+
+    PAGE_WIDTH = 612  # US Letter, in points
+    PAGE_HEIGHT = 792
+    MARGIN = 54
+    # Average Helvetica glyph width as a fraction of the font size, used for wrapping
+    CHAR_WIDTH = 0.52
+    LEADING = 1.3
+
+    # Object ids fixed up front; pages and their contents follow
+    _CATALOG, _PAGES, _FONT, _BOLD_FONT = 1, 2, 3, 4
+
+    def __init__(self, stream: BinaryIO, title: str = "Menus"):
+        super().__init__(stream, title)
+        self._position = 0
+        # Byte offset of each object, indexed by id; ids 1-4 are reserved above
+        self._offsets = array("Q", [0] * 5)
+        self._page_ids = array("Q")
+
+    def _write_bytes(self, data: bytes) -> None:
+        self.stream.write(data)
+        self._position += len(data)
+
+    def _write_object(self, object_id: int, body: bytes) -> None:
+        self._offsets[object_id] = self._position
+        self._write_bytes(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+
+    def _allocate(self) -> int:
+        self._offsets.append(0)
+        return len(self._offsets) - 1
+
+    def _begin(self) -> None:
+        self._write_bytes(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write_menu(self, response: MenuResponse) -> None:
+        for page in self._paginate(self._layout(response)):
+            self._write_page(page)
+
+    def _end(self) -> None:
+        if not self._page_ids:
+            self._write_page([])  # a PDF needs at least one page
+        self._offsets[self._PAGES] = self._position
+        self._write_bytes(b"%d 0 obj\n<< /Type /Pages /Kids [" % self._PAGES)
+        for page_id in self._page_ids:
+            self._write_bytes(b"%d 0 R " % page_id)
+        self._write_bytes(b"] /Count %d >>\nendobj\n" % len(self._page_ids))
+        self._write_object(self._CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self._PAGES)
+        for object_id, font in ((self._FONT, b"Helvetica"), (self._BOLD_FONT, b"Helvetica-Bold")):
+            self._write_object(object_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /%s "
+                                          b"/Encoding /WinAnsiEncoding >>" % font)
+        # The trailer may only refer to the document information dictionary
+        info_id = self._allocate()
+        self._write_object(info_id, b"<< /Title %s >>" % _pdf_string(self.title))
+
+        xref = self._position
+        size = len(self._offsets)
+        self._write_bytes(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for offset in self._offsets[1:]:
+            self._write_bytes(b"%010d 00000 n \n" % offset)
+        self._write_bytes(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                          % (size, self._CATALOG, info_id, xref))
+
+    def _layout(self, response: MenuResponse) -> List[Tuple[bool, float, float, str]]:
+        """Lines of one menu as (bold, font size, space before, text)."""
+        lines = [(True, 20, 0, response.restaurant_name), (False, 11, 2, f"{response.cuisine} cuisine")]
+        for section in response.menu_sections:
+            if not section.items:
+                continue
+            lines.append((True, 14, 14, section.name))
+            for item in section.items:
+                dietary = f" ({', '.join(item.dietary)})" if item.dietary else ""
+                for number, text in enumerate(self._wrap(f"{item.name}{dietary}", 11)):
+                    lines.append((True, 11, 0 if number else 6, text))
+                for text in self._wrap(item.description, 10):
+                    lines.append((False, 10, 0, text))
+        return lines
+
+    def _wrap(self, text: str, size: float) -> List[str]:
+        width = int((self.PAGE_WIDTH - 2 * self.MARGIN) / (size * self.CHAR_WIDTH))
+        return textwrap.wrap(text, width=width) if text else []
+
+    def _paginate(self, lines: List[Tuple[bool, float, float, str]]
+                  ) -> Iterator[List[Tuple[bool, float, float, str]]]:
+        """Split lines into pages, each line with its baseline y instead of its spacing."""
+        page: List[Tuple[bool, float, float, str]] = []
+        y = self.PAGE_HEIGHT - self.MARGIN
+        for bold, size, space_before, text in lines:
+            y -= (space_before if page else 0) + size * self.LEADING
+            if y < self.MARGIN and page:
+                yield page
+                page = []
+                y = self.PAGE_HEIGHT - self.MARGIN - size * self.LEADING
+            page.append((bold, size, y, text))
+        yield page
+
+    def _write_page(self, lines: List[Tuple[bool, float, float, str]]) -> None:
+        operations = [b"BT"]
+        for bold, size, y, text in lines:
+            operations.append(b"/F%d %g Tf 1 0 0 1 %d %.2f Tm %s Tj"
+                              % (2 if bold else 1, size, self.MARGIN, y, _pdf_string(text)))
+        operations.append(b"ET")
+        content = zlib.compress(b"\n".join(operations))
+
+        content_id, page_id = self._allocate(), self._allocate()
+        self._write_object(content_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream"
+                           % (len(content), content))
+        self._write_object(page_id, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+                                    b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>"
+                           % (self._PAGES, self.PAGE_WIDTH, self.PAGE_HEIGHT, self._FONT, self._BOLD_FONT,
+                              content_id))
+        self._page_ids.append(page_id)
+
+
+def _pdf_string(text: str) -> bytes:
+    """A PDF literal string in WinAnsiEncoding."""
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+WRITERS: Dict[str, Callable[..., MenuWriter]] = {
+    'markdown': MarkdownWriter,
+    'html': HtmlWriter,
+    'json': JsonWriter,
+    'csv': CsvWriter,
+    'pdf': PdfWriter,
+}
+FORMATS = tuple(WRITERS)
+
+# Files that are already compressed are stored as they are in the zip
+_STORED_FORMATS = {'pdf'}
+
+
+def _check_formats(formats: Iterable[str]) -> None:
+    unknown = [fmt for fmt in formats if fmt not in WRITERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s) {unknown}, expected some of {FORMATS}")
+
+
+def export_menus(menus: Iterable[MenuResponse], stream: BinaryIO, fmt: str, title: str = "Menus") -> int:
+    """
+    Write menus to a binary stream in one format, one menu at a time.
+
+    Args:
+        menus (Iterable[MenuResponse]): Menus to write; consumed lazily
+        stream (BinaryIO): Destination, e.g. a file opened with "wb"
+        fmt (str): One of FORMATS
+        title (str, optional): Document title used by HTML and PDF
+
+    Returns:
+        int: Number of menus written
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    _check_formats([fmt])
+    with WRITERS[fmt](stream, title=title) as writer:
+        for response in menus:
+            writer.write(response)
+    return writer.count
+
+
+def export_file(menus: Iterable[MenuResponse], path: str, fmt: str, title: str = "Menus") -> int:
+    """Like export_menus, writing to the file at path."""
+    _check_formats([fmt])
+    with open(path, "wb") as output_file:
+        return export_menus(menus, output_file, fmt, title)
+
+
+def render_menu(response: MenuResponse, fmt: str) -> bytes:
+    """A single menu as a complete document in one format."""
+    buffer = io.BytesIO()
+    export_menus([response], buffer, fmt, title=response.restaurant_name)
+    return buffer.getvalue()
+
+
+def render_menu_files(response: MenuResponse, formats: Sequence[str]) -> Tuple[str, Dict[str, bytes]]:
+    """File stem and rendered document per format of one menu; run in export_zip's workers."""
+    return _slug(response.restaurant_name), {fmt: render_menu(response, fmt) for fmt in formats}
+
+
+def _slug(name: str) -> str:
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r'[^a-z0-9]+', '_', ascii_name.lower()).strip('_') or "menu"
+
+
+def _map_chunk(function: Callable[[Any], Any], chunk: List[Any]) -> List[Any]:
+    return [function(item) for item in chunk]
+
+
+def _map_bounded(function: Callable[[Any], Any],
+                 items: Iterable[Any],
+                 workers: int,
+                 chunk_size: int = 16) -> Iterator[Any]:
+    """
+    Map items through worker processes, yielding results in input order.
+
+    Items are sent in chunks, since one menu renders faster than a round trip
+    to a worker, and only a few chunks per worker are in flight, so a long
+    input is never held in memory at once. workers=1 maps in the calling
+    process.
+    """
+    if workers == 1:
+        yield from map(function, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        iterator = iter(items)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                break
+            pending.append(pool.submit(_map_chunk, function, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def export_zip(menus: Iterable[MenuResponse],
+               path: str,
+               formats: Sequence[str] = FORMATS,
+               workers: int = 4) -> int:
+    """
+    Render menus in parallel into a zip archive with one file per menu and format.
+
+    Files are named "<format>/<number>-<restaurant>.<extension>", numbered in
+    input order.
+
+    Args:
+        menus (Iterable[MenuResponse]): Menus to export; consumed lazily
+        path (str): Zip file to create
+        formats (Sequence[str], optional): Formats to render. Defaults to all
+        workers (int, optional): Worker processes. Defaults to 4
+
+    Returns:
+        int: Number of menus exported
+
+    Raises:
+        ValueError: If a format is unknown or workers is not positive
+    """
+    if workers < 1:
+        raise ValueError("workers must be positive")
+    _check_formats(formats)
+    if not formats:
+        raise ValueError("At least one export format is required")
+
+    count = 0
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for stem, documents in _map_bounded(partial(render_menu_files, formats=tuple(formats)), menus, workers):
+            count += 1
+            for fmt, data in documents.items():
+                compression = zipfile.ZIP_STORED if fmt in _STORED_FORMATS else zipfile.ZIP_DEFLATED
+                archive.writestr(f"{fmt}/{count:05d}-{stem}.{WRITERS[fmt].extension}", data,
+                                 compress_type=compression)
+            if count % 500 == 0:
+                logger.info(f"{count} menus exported")
+    return count
+
+
+def read_batch(path: str) -> Iterator[MenuResponse]:
+    """Yield the menus of the successful jobs in a menu_batch JSONL file, one line at a time."""
+    with open(path, encoding="utf-8") as batch_file:
+        for line in batch_file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated final line
+                continue
+            if record.get('status') == 'ok':
+                yield MenuResponse.from_dict(record['response'])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export generated menus to documents.")
+    parser.add_argument("inputs", nargs="*", help="JSONL results files written by menu_batch")
+    parser.add_argument("--store", help="Also export every menu in this menu store database")
+    parser.add_argument("--format", choices=FORMATS, default="markdown",
+                        help="Format of the single output file")
+    parser.add_argument("--output", help="Output file; defaults to menus.<extension>")
+    parser.add_argument("--zip", help="Write one file per menu and format into this zip archive instead")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS),
+                        help="Formats to put in the zip archive")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes rendering the zip archive")
+    parser.add_argument("--title", default="Menus", help="Title of the HTML and PDF documents")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.store:
+        parser.error("Give at least one JSONL file or --store")
+
+    logging.basicConfig(level=logging.INFO)
+
+    def menus() -> Iterator[MenuResponse]:
+        for path in args.inputs:
+            yield from read_batch(path)
+        if args.store:
+            store = MenuStore(args.store)
+            try:
+                yield from store.iter_menus()
+            finally:
+                store.close()
+
+    if args.zip:
+        count = export_zip(menus(), args.zip, args.formats, workers=args.workers)
+        logger.info(f"Exported {count} menus to {args.zip}")
+    else:
+        output = args.output or f"menus.{WRITERS[args.format].extension}"
+        count = export_file(menus(), output, args.format, title=args.title)
+        logger.info(f"Exported {count} menus to {output}")
+
+
+if __name__ == "__main__":
+    main()
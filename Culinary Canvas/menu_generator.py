@@ -1,37 +1,63 @@
-from typing import Union, List, Dict, Tuple
-from langchain_google_genai import ChatGoogleGenerativeAI
+from typing import Union, List, Dict, Tuple, Optional, Any, Iterable, Iterator
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain, SequentialChain
-from dataclasses import dataclass
+from langchain.chains.base import Chain
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+import asyncio
+import contextvars
+import hashlib
+import itertools
+import logging
+import math
 import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from llm_backends import create_llm, json_output_kwargs, llm_identity, merge_call_kwargs, output_limit_kwargs
+from menu_metrics import (METRICS_HANDLER, TokenUsage, iter_with_usage, observe_usage, record_cache,
+                          record_parse, record_regeneration, record_stage, span, step_tags, track_usage,
+                          usage_scope)
+from menu_model import (COMPACT_VERSION, MenuSection, decode_compact, encode_compact, sections_from_dicts,
+                        sections_to_dicts)
+from menu_resilience import ResiliencePolicy, ResilientCaller
+from menu_schema import decode_menu_json, structured_menu
+from menu_utils import MenuEvent, MenuParser, MenuStreamParser, ParsedMenu, format_menu_text
 from secret_key import API_KEY as api_key
 # from dashboard import api_key
 
-@dataclass
-class MenuResponse:
-    """Data class to hold the structured menu response."""
-    cuisine: str
-    restaurant_name: str
-    menu: str
-    parsed_menu: List[Tuple[str, List[str]]]
+logger = logging.getLogger(__name__)
 
-class RestaurantMenuGenerator:
-    """A class to generate restaurant names and menus using Google's Generative AI."""
-    def __init__(self, key: str):
-      self.llm = ChatGoogleGenerativeAI(model="gemini-pro", google_api_key=key)
+# Passed to every chain call so menu_metrics times each LLM step
+METRICS_CALLBACKS = [METRICS_HANDLER]
 
+# Matches the "Restaurant Name: ..." line of a single-call completion
+_RESTAURANT_NAME_LINE = re.compile(r'^\W*restaurant name\W*:\s*(.+)$', re.IGNORECASE | re.MULTILINE)
 
-    def _create_chains(self) -> Tuple[PromptTemplate, PromptTemplate]:
-        """Create the prompt templates for name and menu generation."""
-        name_template = PromptTemplate(
-            input_variables=['cuisine', 'diet'],
-            template="You are a world-class chef. I want to open a restaurant that serves {cuisine} "
-                    "food for this {diet}. Suggest only one fancy name for this. Just the name."
-        )
+# Worker threads for the per-section calls of the "parallel" strategy
+_SECTION_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="menu-section")
+
+# Options offered by the dashboard sidebar and the batch CLI
+CUISINES = ["Indian", "Italian", "Mexican", "Chinese", "Japanese",
+            "Thai", "American", "Mediterranean", "French", "Spanish"]
+DIET_OPTIONS = ["Vegetarian", "Non-Vegetarian", "Vegan", "Gluten-Free",
+                "Dairy-Free", "Nut-Free"]
 
-        menu_template = PromptTemplate(
-            input_variables=['restaurant_name', 'cuisine', 'diet', 'no_of_items'],
-            template="""
+# Prompt templates are built and validated once per process, not per request
+NAME_TEMPLATE = PromptTemplate(
+    input_variables=['cuisine', 'diet'],
+    template="You are a world-class chef. I want to open a restaurant that serves {cuisine} "
+            "food for this {diet}. Suggest only one fancy name for this. Just the name."
+)
+
+MENU_TEMPLATE = PromptTemplate(
+    input_variables=['restaurant_name', 'cuisine', 'diet', 'no_of_items'],
+    template="""
 Based on the restaurant name '{restaurant_name}' and serving {cuisine} cuisine, 
 create a menu with strictly {diet} options only.
 
@@ -56,29 +82,836 @@ Make the menu diverse and appealing to the specified cuisine and dietary restric
 Include clear dietary information (e.g., Nut-free, Gluten-Free) for each item.
 Follow the format strictly and consistently.
 """
+)
+
+SINGLE_TEMPLATE = PromptTemplate(
+    input_variables=['cuisine', 'diet', 'no_of_items'],
+    template="""
+You are a world-class chef. I want to open a restaurant that serves {cuisine} food
+with strictly {diet} options only. Suggest one fancy name for the restaurant and
+create its menu.
+
+Respond in exactly this format:
+
+Restaurant Name: <the name>
+
+**Appetizers**
+{no_of_items} items
+* Item Name: (dietary info)
+  Detailed description of the item
+
+**Main Courses**
+{no_of_items} items
+* Item Name: (dietary info)
+  Detailed description of the item
+
+**Desserts**
+{no_of_items} items
+* Item Name: (dietary info)
+  Detailed description of the item
+
+Make the menu diverse and appealing to the specified cuisine and dietary restrictions.
+Include clear dietary information (e.g., Nut-free, Gluten-Free) for each item.
+Follow the format strictly and consistently.
+"""
+)
+
+SECTION_TEMPLATE = PromptTemplate(
+    input_variables=['restaurant_name', 'cuisine', 'diet', 'no_of_items', 'section'],
+    template="""
+Based on the restaurant name '{restaurant_name}' and serving {cuisine} cuisine,
+write only the {section} section of its menu, with strictly {diet} options only.
+The other sections are written separately, so do not add any other headings or dishes.
+
+Format the section as follows:
+
+**{section}**
+{no_of_items} items
+* Item Name: (dietary info)
+  Detailed description of the item
+
+Make the dishes diverse and appealing to the specified cuisine and dietary restrictions.
+Include clear dietary information (e.g., Nut-free, Gluten-Free) for each item.
+Follow the format strictly and consistently.
+"""
+)
+
+# The compact variants state the item format once instead of per section, ask
+# for one line per item and cap the description length.
+COMPACT_MENU_TEMPLATE = PromptTemplate(
+    input_variables=['restaurant_name', 'cuisine', 'diet', 'no_of_items', 'description_words'],
+    template="""
+Menu for the {cuisine} restaurant '{restaurant_name}', strictly {diet} options only.
+Sections **Appetizers**, **Main Courses** and **Desserts**, each with
+{no_of_items} items, one line per item:
+* Item Name (dietary info): description of at most {description_words} words
+Output only the menu.
+"""
+)
+
+COMPACT_SINGLE_TEMPLATE = PromptTemplate(
+    input_variables=['cuisine', 'diet', 'no_of_items', 'description_words'],
+    template="""
+Name a fancy {cuisine} restaurant with strictly {diet} options only, and write its menu.
+First line: Restaurant Name: <the name>
+Then sections **Appetizers**, **Main Courses** and **Desserts**, each with
+{no_of_items} items, one line per item:
+* Item Name (dietary info): description of at most {description_words} words
+Output nothing else.
+"""
+)
+
+COMPACT_SECTION_TEMPLATE = PromptTemplate(
+    input_variables=['restaurant_name', 'cuisine', 'diet', 'no_of_items', 'section', 'description_words'],
+    template="""
+For the {cuisine} restaurant '{restaurant_name}', write only the {section} section of
+its menu, strictly {diet} options only. Start with **{section}**, then
+{no_of_items} items, one line per item:
+* Item Name (dietary info): description of at most {description_words} words
+Output only this section.
+"""
+)
+
+
+# The JSON variants ask for a menu_schema.MenuSchema document, which is decoded
+# instead of parsing markdown; braces are doubled for PromptTemplate.
+_JSON_ITEM = '{{"name": "Item Name", "description": "at most {description_words} words", "dietary": ["Vegan"]}}'
+
+JSON_MENU_TEMPLATE = PromptTemplate(
+    input_variables=['restaurant_name', 'cuisine', 'diet', 'no_of_items', 'description_words'],
+    template="""
+Based on the restaurant name '{restaurant_name}' and serving {cuisine} cuisine,
+create a menu with strictly {diet} options only, in the sections Appetizers,
+Main Courses and Desserts with
+{no_of_items} items each.
+Respond with JSON only, no markdown, in exactly this shape:
+{{"sections": [{{"name": "Appetizers", "items": [""" + _JSON_ITEM + """]}}]}}
+"""
+)
+
+JSON_SINGLE_TEMPLATE = PromptTemplate(
+    input_variables=['cuisine', 'diet', 'no_of_items', 'description_words'],
+    template="""
+You are a world-class chef. Suggest one fancy name for a restaurant that serves {cuisine}
+food with strictly {diet} options only, and create its menu in the sections
+Appetizers, Main Courses and Desserts with
+{no_of_items} items each.
+Respond with JSON only, no markdown, in exactly this shape:
+{{"restaurant_name": "the name", "sections": [{{"name": "Appetizers", "items": [""" + _JSON_ITEM + """]}}]}}
+"""
+)
+
+JSON_SECTION_TEMPLATE = PromptTemplate(
+    input_variables=['restaurant_name', 'cuisine', 'diet', 'no_of_items', 'section', 'description_words'],
+    template="""
+For the {cuisine} restaurant '{restaurant_name}', write only the {section} section of
+its menu, with strictly {diet} options only and
+{no_of_items} items.
+Respond with JSON only, no markdown, in exactly this shape:
+{{"sections": [{{"name": "{section}", "items": [""" + _JSON_ITEM + """]}}]}}
+"""
+)
+
+
+@dataclass(frozen=True)
+class PromptSet:
+    """The prompt templates of one prompt variant, one per generation step."""
+    name: PromptTemplate
+    menu: PromptTemplate
+    single: PromptTemplate
+    section: PromptTemplate
+    # Description length cap the templates ask for, or None if they set none
+    description_words: Optional[int] = None
+    # "text" for the markdown format, "json" for a menu_schema.MenuSchema document
+    output_format: str = "text"
+
+    def with_description_words(self, words: int) -> "PromptSet":
+        """Return the set with description_words filled in wherever a template asks for it."""
+        if words < 1:
+            raise ValueError("Description length must be positive")
+
+        def bind(template: PromptTemplate) -> PromptTemplate:
+            if 'description_words' not in template.input_variables:
+                return template
+            return template.partial(description_words=str(words))
+
+        return replace(self, name=bind(self.name), menu=bind(self.menu), single=bind(self.single),
+                       section=bind(self.section), description_words=words)
+
+
+# "full" is the original wording; "compact" trades it for fewer prompt and completion tokens;
+# "json" asks for structured output, falling back to the text parsers when it is not valid
+PROMPT_VARIANTS = {
+    "full": PromptSet(NAME_TEMPLATE, MENU_TEMPLATE, SINGLE_TEMPLATE, SECTION_TEMPLATE),
+    "compact": PromptSet(NAME_TEMPLATE, COMPACT_MENU_TEMPLATE, COMPACT_SINGLE_TEMPLATE,
+                         COMPACT_SECTION_TEMPLATE),
+    "json": PromptSet(NAME_TEMPLATE, JSON_MENU_TEMPLATE, JSON_SINGLE_TEMPLATE, JSON_SECTION_TEMPLATE,
+                      output_format="json"),
+}
+DEFAULT_DESCRIPTION_WORDS = 12
+
+# Output budget per menu line, used to derive max output tokens from no_of_items.
+# "Detailed description" completions run to about 40 words.
+FULL_DESCRIPTION_WORDS = 40
+TOKENS_PER_WORD = 1.4
+TOKENS_PER_ITEM_LINE = 20  # bullet, name, dietary tags and punctuation
+TOKENS_PER_SECTION = 10  # heading and an "N items" line
+TOKENS_FOR_NAME = 20
+TOKENS_PER_JSON_ITEM = 15  # keys, quotes and brackets of a JSON item
+OUTPUT_HEADROOM = 1.5
+
+
+def output_token_budget(no_of_items: int,
+                        sections: int = 3,
+                        description_words: Optional[int] = None,
+                        include_name: bool = False,
+                        structured: bool = False) -> int:
+    """
+    Upper bound on the completion tokens of a well-formed menu.
+
+    Args:
+        no_of_items (int): Items per section
+        sections (int, optional): Sections in the completion. Defaults to 3
+        description_words (Optional[int], optional): Description length cap
+            the prompt asks for, or None for the full variant's descriptions
+        include_name (bool, optional): Whether the completion starts with the
+            restaurant name, as with the "single" strategy
+        structured (bool, optional): Whether the completion is a JSON document
+
+    Returns:
+        int: The token limit, with OUTPUT_HEADROOM over the expected length
+    """
+    words = description_words or FULL_DESCRIPTION_WORDS
+    per_item = TOKENS_PER_ITEM_LINE + words * TOKENS_PER_WORD
+    if structured:
+        per_item += TOKENS_PER_JSON_ITEM
+    expected = sections * (TOKENS_PER_SECTION + no_of_items * per_item)
+    if include_name:
+        expected += TOKENS_FOR_NAME
+    return math.ceil(expected * OUTPUT_HEADROOM)
+
+
+def _freeze_blocks(blocks: Iterable[Tuple[str, Iterable[str]]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    return tuple((heading, tuple(items)) for heading, items in blocks)
+
+
+@dataclass(frozen=True, slots=True)
+class MenuResponse:
+    """
+    Immutable structured menu response.
+
+    Items are stored as MenuSection/MenuItem objects (see menu_model) rather
+    than dicts; `sections` and `parsed_menu` rebuild the familiar views on
+    access. Use from_sections to build one from MenuParser output.
+    """
+    cuisine: str
+    restaurant_name: str
+    menu: str
+    # Every known section with its items, in MenuParser.SECTIONS order
+    menu_sections: Tuple[MenuSection, ...] = ()
+    # Tokens spent generating this menu; None when it was served from the cache or the store
+    usage: Optional[TokenUsage] = field(default=None, compare=False)
+    # (heading, item texts) of each block of `menu`; when not given, parsed from it on first use
+    menu_blocks: Optional[Tuple[Tuple[str, Tuple[str, ...]], ...]] = field(default=None, compare=False,
+                                                                         repr=False)
+
+    def __post_init__(self):
+        if self.menu_blocks is not None:
+            object.__setattr__(self, 'menu_blocks', _freeze_blocks(self.menu_blocks))
+
+    @classmethod
+    def from_sections(cls,
+                      cuisine: str,
+                      restaurant_name: str,
+                      menu: str,
+                      sections: Dict[str, List[Dict[str, Any]]],
+                      usage: Optional[TokenUsage] = None,
+                      parsed_menu: Optional[List[Tuple[str, List[str]]]] = None) -> "MenuResponse":
+        """
+        Build a response from parsed items per section, as returned by MenuParser.parse_menu.
+
+        Pass the parser's parsed_menu for the same text to save parsing it again.
+        """
+        return cls(cuisine, restaurant_name, menu, sections_from_dicts(sections), usage, parsed_menu)
+
+    @property
+    def sections(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Parsed items per known section, as returned by MenuParser.parse_menu."""
+        return sections_to_dicts(self.menu_sections)
+
+    @property
+    def parsed_menu(self) -> List[Tuple[str, List[str]]]:
+        """(heading, item texts) of each block of the menu text."""
+        blocks = self.menu_blocks
+        if blocks is None:
+            # Responses decoded from the cache or the store are parsed once, here
+            blocks = _freeze_blocks(MenuParser.parse_blocks(self.menu))
+            object.__setattr__(self, 'menu_blocks', blocks)
+        return [(heading, list(items)) for heading, items in blocks]
+
+    def content_hash(self) -> str:
+        """Stable digest of the restaurant name and menu text."""
+        return hashlib.sha256(f"{self.restaurant_name}\0{self.menu}".encode("utf-8")).hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the response into a JSON-serializable dict."""
+        return {
+            'cuisine': self.cuisine,
+            'restaurant_name': self.restaurant_name,
+            'menu': self.menu,
+            'parsed_menu': [[heading, items] for heading, items in self.parsed_menu],
+            'sections': self.sections,
+            'usage': self.usage.to_dict() if self.usage is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MenuResponse":
+        """Rebuild a response from the output of to_dict."""
+        return cls.from_sections(
+            cuisine=data['cuisine'],
+            restaurant_name=data['restaurant_name'],
+            menu=data['menu'],
+            # Entries cached before sections existed are parsed once here
+            sections=data.get('sections') or MenuParser.parse_menu(data['menu']),
+            # usage is left out: serving a stored menu again costs no tokens
+            parsed_menu=data.get('parsed_menu')
         )
 
-        return name_template, menu_template
+    def to_bytes(self, codec: str = "orjson") -> bytes:
+        """
+        Serialize the response as compact nested arrays.
+
+        Args:
+            codec (str): "orjson", or "msgpack" if it is installed
 
-    def generate_menu(self, 
-                     cuisine: str, 
-                     diets: Union[str, List[str]], 
-                     no_of_items: int = 3) -> MenuResponse:
+        Like from_dict, usage is not kept.
         """
-        Generate a restaurant name and menu based on specified parameters.
+        return encode_compact((COMPACT_VERSION, self.cuisine, self.restaurant_name, self.menu,
+                               [section.pack() for section in self.menu_sections]), codec)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, codec: str = "orjson") -> "MenuResponse":
+        """
+        Rebuild a response from the output of to_bytes.
+
+        Raises:
+            ValueError: If the data was written in another layout version
+        """
+        version, *fields = decode_compact(data, codec)
+        if version != COMPACT_VERSION:
+            raise ValueError(f"Unsupported compact menu version {version}, expected {COMPACT_VERSION}")
+        cuisine, restaurant_name, menu, sections = fields
+        return cls(cuisine, restaurant_name, menu, tuple(MenuSection.unpack(section) for section in sections))
+
+
+class _OpenedStream:
+    """
+    Chunks of a model stream that has been read into, with the part already read first.
+
+    close() ends the underlying stream, releasing its connection, even when
+    iteration never started, as for an attempt that lost a hedge or overran
+    its deadline.
+    """
+
+    def __init__(self, head: str, chunks: Iterator[str]):
+        self._source = chunks
+        self._chunks = itertools.chain([head] if head else [], chunks)
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        return next(self._chunks)
+
+    def close(self) -> None:
+        close = getattr(self._source, "close", None)
+        if close is not None:
+            close()
+
+
+class _SectionStream:
+    """
+    The parallel strategy's stream: the first section as the model writes it,
+    then each background section once it is done.
+
+    close(), or a failure while iterating, stops the sections that are still
+    being generated and ends the first section's model stream.
+    """
+
+    def __init__(self,
+                 chunks: Iterator[str],
+                 head: Iterator[str],
+                 futures: List["Future[str]"],
+                 stop: threading.Event):
+        self._chunks = chunks
+        self._head = head
+        self._futures = futures
+        self._stop = stop
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        _abandon_sections(self._futures, self._stop)
+        _close_chunks(self._head)
+
+
+def _abandon_sections(futures: Iterable["Future[str]"], stop: threading.Event) -> None:
+    """Cancel queued section calls and stop running ones before their next attempt."""
+    stop.set()
+    for future in futures:
+        future.cancel()
+
+
+class MenuStream:
+    """
+    Menu text chunks streamed from the model, as returned by stream_menu.
+
+    The restaurant name is known up front. Iterate the stream to receive menu
+    chunks as they are produced; once it is exhausted, `response` holds the
+    complete MenuResponse. A stream that is abandoned part way should be
+    closed, which ends the model calls still running for it.
+    """
+
+    def __init__(self,
+                 generator: "RestaurantMenuGenerator",
+                 cuisine: str,
+                 diets: Union[str, List[str]],
+                 no_of_items: int,
+                 restaurant_name: str,
+                 chunks: Optional[Iterator[str]] = None,
+                 response: Optional[MenuResponse] = None,
+                 usage: Optional[TokenUsage] = None):
+        self.cuisine = cuisine
+        self.restaurant_name = restaurant_name.strip()
+        self._generator = generator
+        self._diets = diets
+        self._no_of_items = no_of_items
+        self._chunks = chunks
+        self._parts: List[str] = []
+        self._response = response
+        # Tokens of the calls made so far; the streamed call adds its own as it ends
+        self._usage = usage if usage is not None else TokenUsage()
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk, _ in self._consume():
+            if chunk:
+                yield chunk
+
+    def iter_events(self) -> Iterator[MenuEvent]:
+        """
+        Consume the stream, yielding 'section' and 'item' events as soon as
+        each section header and menu item is complete.
+        """
+        for _, events in self._consume():
+            for event in events:
+                if event.kind in ('section', 'item'):
+                    yield event
+
+    def _consume(self) -> Iterator[Tuple[str, List[MenuEvent]]]:
+        if self._chunks is None:
+            # Served from the cache or the store: the whole menu is one chunk
+            if self._response is not None:
+                events = []
+                for section in self._response.menu_sections:
+                    events.append(MenuEvent('section', section.name))
+                    events.extend(MenuEvent('item', section.name, item.to_dict()) for item in section.items)
+                yield self._response.menu, events
+            return
+        chunks, self._chunks = self._chunks, None
+        parser = MenuStreamParser(include_entries=True)
+        parsed = ParsedMenu.empty()
+        # Parsing is interleaved with the stream, so its time is summed over the chunks
+        parse_seconds = 0.0
+        try:
+            for chunk in iter_with_usage(self._usage, chunks):
+                self._parts.append(chunk)
+                start = time.perf_counter()
+                events = parser.feed(chunk)
+                for event in events:
+                    parsed.add(event)
+                parse_seconds += time.perf_counter() - start
+                yield chunk, events
+        finally:
+            _close_chunks(chunks)
+        start = time.perf_counter()
+        events = parser.close()
+        for event in events:
+            parsed.add(event)
+        parse_seconds += time.perf_counter() - start
+        record_stage("parse", parse_seconds, chunks=len(self._parts))
+        yield "", events
+
+        self._response = self._generator._build_response(
+            self.cuisine, self.restaurant_name, "".join(self._parts), parsed, self._usage
+        )
+        observe_usage(self._usage)
+        self._generator._remember(self.cuisine, self._diets, self._no_of_items, self._response)
+
+    @property
+    def response(self) -> MenuResponse:
+        """The complete menu; only available once the stream has been consumed."""
+        if self._response is None:
+            raise RuntimeError("The menu stream has not been fully consumed yet")
+        return self._response
+
+    def close(self) -> None:
+        """Stop a stream that will not be read to the end; a no-op once consumed."""
+        chunks, self._chunks = self._chunks, None
+        if chunks is not None:
+            _close_chunks(chunks)
+
+
+def _close_chunks(chunks: Iterator[str]) -> None:
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        close()
+
+
+class RestaurantMenuGenerator:
+    """A class to generate restaurant names and menus using a pluggable chat model backend (Gemini by default)."""
+
+    # "sequential" asks for the name and then the menu (two round-trips),
+    # "single" asks for both in one structured completion, and "parallel"
+    # asks for the name and then for every section at once, one call each.
+    STRATEGIES = ("sequential", "single", "parallel")
+
+    def __init__(self,
+                 key: str,
+                 cache: Optional[Any] = None,
+                 strategy: str = "sequential",
+                 llm: Optional[BaseChatModel] = None,
+                 store: Optional[Any] = None,
+                 retrieval_first: bool = False,
+                 deduplicator: Optional[Any] = None,
+                 backend: str = "gemini",
+                 backend_options: Optional[Dict[str, Any]] = None,
+                 resilience: Optional[ResiliencePolicy] = None,
+                 prompt_variant: str = "full",
+                 description_words: Optional[int] = None,
+                 limit_output_tokens: bool = False,
+                 max_regenerations: int = 1):
+      if strategy not in self.STRATEGIES:
+          raise ValueError(f"Unknown strategy '{strategy}', expected one of {self.STRATEGIES}")
+      if prompt_variant not in PROMPT_VARIANTS:
+          raise ValueError(f"Unknown prompt variant '{prompt_variant}', expected one of {tuple(PROMPT_VARIANTS)}")
+      # The chat model comes from the llm_backends registry unless one is passed in
+      self.llm = llm if llm is not None else create_llm(backend, key, **(backend_options or {}))
+      # Optional MenuCache (see menu_cache.py) consulted before calling the LLM
+      self.cache = cache
+      # Optional MenuStore (see menu_store.py) that keeps every generated menu
+      self.store = store
+      # Assemble menus from stored dishes when there are enough, before calling the LLM
+      self.retrieval_first = retrieval_first
+      # Optional MenuDeduplicator (see menu_dedup.py) that merges repeated items in a menu
+      self.deduplicator = deduplicator
+      if retrieval_first and store is None:
+          raise ValueError("retrieval_first requires a store")
+      self.strategy = strategy
+      # Deadlines, retries, circuit breaker and hedging around every LLM call (see menu_resilience.py)
+      self.resilience = ResilientCaller(resilience)
+      # Prompt wording; the compact variant caps descriptions at description_words
+      self.prompt_variant = prompt_variant
+      prompts = PROMPT_VARIANTS[prompt_variant]
+      if description_words is not None or prompt_variant != "full":
+          prompts = prompts.with_description_words(description_words or DEFAULT_DESCRIPTION_WORDS)
+      self.prompts = prompts
+      # Cap each completion at output_token_budget for the requested number of items
+      self.limit_output_tokens = limit_output_tokens
+      # Times a menu is generated again when no items can be parsed from it
+      if max_regenerations < 0:
+          raise ValueError("max_regenerations cannot be negative")
+      self.max_regenerations = max_regenerations
+      # Menu chains and streaming runnables by (step, output token limit)
+      self._chains: Dict[Tuple[str, Optional[int]], Chain] = {}
+      self._runnables: Dict[Tuple[str, Optional[int]], Runnable] = {}
+
+    def _create_chains(self) -> Tuple[PromptTemplate, PromptTemplate]:
+        """Return the prompt templates for name and menu generation."""
+        return self.prompts.name, self.prompts.menu
+
+    def _create_single_template(self) -> PromptTemplate:
+        """Return the prompt template that asks for the name and menu in one call."""
+        return self.prompts.single
+
+    @property
+    def structured_output(self) -> bool:
+        """Whether the prompts ask for JSON (prompt_variant="json") rather than markdown."""
+        return self.prompts.output_format == "json"
+
+    @property
+    def cache_namespace(self) -> str:
+        """
+        Cache key prefix for this generator's settings.
+
+        Strategy, prompt variant and output format, description length,
+        output limits and the model all change the menus produced, so
+        generators that differ in any of them never share cache entries.
+        """
+        return ":".join([
+            self.strategy,
+            self.prompt_variant,
+            str(self.prompts.description_words or ""),
+            "limited" if self.limit_output_tokens else "",
+            llm_identity(self.llm),
+        ])
+
+    def output_token_limit(self, step: str, no_of_items: int) -> Optional[int]:
+        """
+        The completion token limit for a generation step, if limit_output_tokens is set.
 
         Args:
-            cuisine (str): Type of cuisine (e.g., "Mexican", "Italian")
-            diets (Union[str, List[str]]): Dietary restrictions
-            no_of_items (int, optional): Number of items per section. Defaults to 3
+            step (str): "sequential" or "menu" (the menu call), "single" or "section"
+            no_of_items (int): Items per section
 
         Returns:
-            MenuResponse: Structured response containing restaurant details
+            Optional[int]: The limit, or None for unbounded output
+        """
+        if not self.limit_output_tokens:
+            return None
+        return output_token_budget(no_of_items,
+                                   sections=1 if step == "section" else len(MenuParser.SECTIONS),
+                                   description_words=self.prompts.description_words,
+                                   include_name=step == "single",
+                                   structured=self.structured_output)
+
+    def _call_kwargs(self, limit: Optional[int]) -> Dict[str, Any]:
+        """Model call arguments for the menu steps: the output limit and JSON mode."""
+        return merge_call_kwargs(output_limit_kwargs(self.llm, limit) if limit else {},
+                                 json_output_kwargs(self.llm) if self.structured_output else {})
+
+    # Chains are built on first use and then reused for every request, so the
+    # hot path does no prompt validation or chain construction. With output
+    # limits there is one menu chain per limit, i.e. per distinct no_of_items.
+    @cached_property
+    def _name_chain(self) -> LLMChain:
+        return LLMChain(llm=self.llm, prompt=self.prompts.name, output_key='restaurant_name',
+                        tags=step_tags("name"))
+
+    def _build_chain(self, step: str, llm_kwargs: Dict[str, Any]) -> Chain:
+        if step == "sequential":
+            menu_chain = LLMChain(llm=self.llm, prompt=self.prompts.menu, output_key='menu',
+                                  tags=step_tags("menu"), llm_kwargs=llm_kwargs)
+            return SequentialChain(
+                chains=[self._name_chain, menu_chain],
+                input_variables=['cuisine', 'diet', 'no_of_items'],
+                output_variables=['restaurant_name', 'menu']
+            )
+        if step == "single":
+            return LLMChain(llm=self.llm, prompt=self.prompts.single, output_key='response',
+                            tags=step_tags("single"), llm_kwargs=llm_kwargs)
+        return LLMChain(llm=self.llm, prompt=self.prompts.section, output_key='menu',
+                        tags=step_tags("section"), llm_kwargs=llm_kwargs)
+
+    def _chain(self, step: str, no_of_items: int) -> Chain:
+        """The "sequential", "single" or "section" chain for no_of_items."""
+        key = (step, self.output_token_limit(step, no_of_items))
+        chain = self._chains.get(key)
+        if chain is None:
+            chain = self._chains[key] = self._build_chain(step, self._call_kwargs(key[1]))
+        return chain
+
+    def _runnable(self, step: str, no_of_items: int) -> Runnable:
+        """The prompt | model runnable that streams the "menu", "single" or "section" step."""
+        key = (step, self.output_token_limit(step, no_of_items))
+        runnable = self._runnables.get(key)
+        if runnable is None:
+            prompt = {'menu': self.prompts.menu, 'single': self.prompts.single}.get(step, self.prompts.section)
+            llm_kwargs = self._call_kwargs(key[1])
+            llm = self.llm.bind(**llm_kwargs) if llm_kwargs else self.llm
+            runnable = self._runnables[key] = prompt | llm
+        return runnable
+
+    def _generate_sequential(self, cuisine: str, diets: str, no_of_items: int) -> Tuple[str, str]:
+        """Generate the name and then the menu with two chained LLM calls."""
+        response = self._chain("sequential", no_of_items)({
+            'cuisine': cuisine,
+            'diet': diets,
+            'no_of_items': no_of_items
+        }, callbacks=METRICS_CALLBACKS)
+        return response['restaurant_name'], response['menu']
+
+    def _generate_single(self, cuisine: str, diets: str, no_of_items: int) -> Tuple[str, str]:
+        """Generate the name and menu with one LLM call."""
+        response = self._chain("single", no_of_items)({
+            'cuisine': cuisine,
+            'diet': diets,
+            'no_of_items': no_of_items
+        }, callbacks=METRICS_CALLBACKS)
+        return self._split_single(response['response'])
+
+    async def _agenerate_sequential(self, cuisine: str, diets: str, no_of_items: int) -> Tuple[str, str]:
+        """Async counterpart of _generate_sequential."""
+        response = await self._chain("sequential", no_of_items).acall({
+            'cuisine': cuisine,
+            'diet': diets,
+            'no_of_items': no_of_items
+        }, callbacks=METRICS_CALLBACKS)
+        return response['restaurant_name'], response['menu']
+
+    async def _agenerate_single(self, cuisine: str, diets: str, no_of_items: int) -> Tuple[str, str]:
+        """Async counterpart of _generate_single."""
+        response = await self._chain("single", no_of_items).acall({
+            'cuisine': cuisine,
+            'diet': diets,
+            'no_of_items': no_of_items
+        }, callbacks=METRICS_CALLBACKS)
+        return self._split_single(response['response'])
+
+    def _split_single(self, text: str) -> Tuple[str, str]:
+        # A JSON completion carries the name inside it; _interpret reads it from there
+        if self.structured_output:
+            return "", text
+        return self.split_single_response(text)
+
+    # The parallel strategy retries each call on its own, so one slow or failed
+    # section does not cost the name or the other sections.
+    def _generate_name(self, inputs: Dict[str, Any]) -> str:
+        return self.resilience.call(
+            lambda: self._name_chain(inputs, callbacks=METRICS_CALLBACKS)['restaurant_name'], "name"
+        ).strip()
+
+    def _generate_section(self,
+                          inputs: Dict[str, Any],
+                          section: str,
+                          stop: Optional[threading.Event] = None) -> str:
+        """
+        Generate one section and return it as a block of the merged menu.
+
+        Once stop is set, e.g. because a sibling section failed, no further
+        attempt is made and CancelledError is raised instead.
+        """
+        chain = self._chain("section", inputs['no_of_items'])
+
+        def attempt() -> str:
+            if stop is not None and stop.is_set():
+                raise CancelledError(f"Section '{section}' is no longer needed")
+            return chain(dict(inputs, section=section), callbacks=METRICS_CALLBACKS)['menu']
+
+        return self._section_text(section, self.resilience.call(attempt, "section"))
+
+    def _submit_section(self, inputs: Dict[str, Any], section: str, stop: threading.Event) -> "Future[str]":
+        # Copy the context so spans and trace ids follow the call into the pool
+        return _SECTION_POOL.submit(contextvars.copy_context().run, self._generate_section, inputs, section, stop)
+
+    def _generate_parallel(self, cuisine: str, diets: str, no_of_items: int) -> Tuple[str, str]:
+        """Generate the name, then every section concurrently, and merge the sections."""
+        inputs = {'cuisine': cuisine, 'diet': diets, 'no_of_items': no_of_items}
+        inputs['restaurant_name'] = self._generate_name(inputs)
+        stop = threading.Event()
+        futures = [self._submit_section(inputs, section, stop) for section in MenuParser.SECTIONS]
+        try:
+            # In completion order, so the first failure is raised without waiting on earlier sections
+            for future in as_completed(futures):
+                future.result()
+            blocks = [future.result() for future in futures]
+        finally:
+            # After a failure the other sections are not needed; after success this does nothing
+            _abandon_sections(futures, stop)
+        return inputs['restaurant_name'], "\n\n".join(blocks)
+
+    async def _agenerate_section(self, inputs: Dict[str, Any], section: str) -> str:
+        """Async counterpart of _generate_section."""
+        chain = self._chain("section", inputs['no_of_items'])
+        response = await self.resilience.acall(
+            lambda: chain.acall(dict(inputs, section=section), callbacks=METRICS_CALLBACKS), "section")
+        return self._section_text(section, response['menu'])
+
+    async def _agenerate_parallel(self, cuisine: str, diets: str, no_of_items: int) -> Tuple[str, str]:
+        """Async counterpart of _generate_parallel."""
+        inputs = {'cuisine': cuisine, 'diet': diets, 'no_of_items': no_of_items}
+        response = await self.resilience.acall(
+            lambda: self._name_chain.acall(inputs, callbacks=METRICS_CALLBACKS), "name")
+        inputs['restaurant_name'] = response['restaurant_name'].strip()
+        tasks = [asyncio.ensure_future(self._agenerate_section(inputs, section))
+                 for section in MenuParser.SECTIONS]
+        try:
+            blocks = await asyncio.gather(*tasks)
+        finally:
+            # gather leaves the other sections running when one fails
+            for task in tasks:
+                task.cancel()
+        return inputs['restaurant_name'], "\n\n".join(blocks)
+
+    def _section_text(self, section: str, text: str) -> str:
+        """A section completion as a block of the merged menu, decoding it first if it is JSON."""
+        if self.structured_output:
+            document = decode_menu_json(text)
+            if document is not None:
+                record_parse("json", "ok")
+                menu, _ = structured_menu(document)
+                if menu:
+                    return menu
+            else:
+                record_parse("json", "fallback")
+        return self.section_block(section, text)
+
+    @staticmethod
+    def _strip_section_heading(section: str, text: str) -> str:
+        """Drop the section's own heading from the start of a per-section completion."""
+        text = text.lstrip()
+        first, _, rest = text.partition('\n')
+        if first.strip(' *#:').casefold() == section.casefold():
+            return rest.lstrip('\n')
+        return text
+
+    @classmethod
+    def section_block(cls, section: str, text: str) -> str:
+        """
+        Normalise a per-section completion to a block of the usual menu format.
+
+        Args:
+            section (str): The section that was asked for, e.g. "Desserts"
+            text (str): The completion, with or without its heading
+
+        Returns:
+            str: "**<section>**" followed by the section's lines
+        """
+        body = cls._strip_section_heading(section, text).rstrip()
+        if not body:
+            logger.warning(f"The model returned an empty {section} section")
+        return f"**{section}**\n{body}".rstrip()
+
+    @staticmethod
+    def split_single_response(text: str) -> Tuple[str, str]:
+        """
+        Split a single-call completion into the restaurant name and the menu.
+
+        Args:
+            text (str): Raw completion starting with a "Restaurant Name:" line
+
+        Returns:
+            Tuple[str, str]: (restaurant_name, menu)
 
         Raises:
-            ValueError: If input parameters are invalid
-            Exception: For other errors during generation
+            ValueError: If the completion is empty
         """
+        if not text or not text.strip():
+            raise ValueError("Menu string cannot be empty")
+
+        match = _RESTAURANT_NAME_LINE.search(text)
+        if match:
+            name = match.group(1)
+            menu = text[:match.start()] + text[match.end():]
+        else:
+            # The model skipped the label; treat the first line as the name
+            name, _, menu = text.strip().partition('\n')
+        return name.strip().strip('*"\' '), menu.strip()
+
+    def _prepare_inputs(self,
+                        cuisine: str,
+                        diets: Union[str, List[str]],
+                        no_of_items: int) -> str:
+        """Validate generate_menu inputs and return the diets as a prompt string."""
         # Input validation
         if not cuisine or not isinstance(cuisine, str):
             raise ValueError("Cuisine must be a non-empty string")
@@ -90,40 +923,421 @@ Follow the format strictly and consistently.
         # Convert diets list to string if necessary
         if isinstance(diets, list):
             diets = ", ".join(diets)
+        return diets
+
+    def _build_response(self,
+                        cuisine: str,
+                        restaurant_name: str,
+                        menu: str,
+                        parsed: Optional[ParsedMenu] = None,
+                        usage: Optional[TokenUsage] = None) -> MenuResponse:
+        """
+        Parse the generated menu once and wrap everything in a MenuResponse,
+        merging repeated items first when a deduplicator is configured.
+        """
+        if not menu:
+            raise ValueError("Menu string cannot be empty")
+        # Parse the menu
+        if parsed is None:
+            with span("parse", chars=len(menu)):
+                parsed = MenuParser.parse(menu)
+
+        menu_response = MenuResponse.from_sections(
+            cuisine=cuisine,
+            restaurant_name=restaurant_name.strip(),
+            menu=menu.strip(),
+            sections=parsed.sections,
+            usage=usage,
+            parsed_menu=parsed.parsed_menu
+        )
+        if self.deduplicator is not None:
+            with span("dedup"):
+                menu_response = self.deduplicator.dedupe_menu(menu_response)
+        return menu_response
 
+    def _remember(self,
+                  cuisine: str,
+                  diets: Union[str, List[str]],
+                  no_of_items: int,
+                  menu_response: MenuResponse) -> None:
+        """Record a freshly generated menu in the cache and the corpus store."""
+        if self.cache is not None:
+            self.cache.set(cuisine, diets, no_of_items, menu_response, namespace=self.cache_namespace)
+        if self.store is not None:
+            try:
+                with span("store"):
+                    self.store.save(menu_response, diets)
+            except Exception as e:
+                # The menu is still usable; losing it from the corpus is not fatal
+                logger.warning(f"Failed to store generated menu: {e}")
+
+    def assemble_menu(self,
+                      cuisine: str,
+                      diets: Union[str, List[str]],
+                      no_of_items: int = 3,
+                      rng: Optional[random.Random] = None) -> Optional[MenuResponse]:
+        """
+        Build a menu from previously generated dishes in the store.
+
+        Samples no_of_items distinct dishes per section from stored items of
+        the cuisine that carry every requested dietary tag. The restaurant
+        name is taken from the menu the first main course came from.
+
+        Args:
+            cuisine (str): Type of cuisine (e.g., "Mexican", "Italian")
+            diets (Union[str, List[str]]): Dietary restrictions
+            no_of_items (int, optional): Number of items per section. Defaults to 3
+            rng (Optional[random.Random], optional): Random source for sampling
+
+        Returns:
+            Optional[MenuResponse]: The assembled menu, or None if the store has
+            too few matching dishes for any section
+
+        Raises:
+            ValueError: If input parameters are invalid or no store is configured
+        """
+        self._prepare_inputs(cuisine, diets, no_of_items)
+        if self.store is None:
+            raise ValueError("assemble_menu requires a store")
+
+        sections = {}
+        for section in MenuParser.SECTIONS:
+            items = self.store.sample_items(section, no_of_items, cuisine=cuisine, diets=diets, rng=rng)
+            if len(items) < no_of_items:
+                logger.info(f"Only {len(items)} stored {section} match {cuisine} / {diets}")
+                return None
+            sections[section] = items
+
+        restaurant_name = sections['Main Courses'][0].restaurant_name
+        menu = format_menu_text({
+            section: [item.to_menu_item() for item in items] for section, items in sections.items()
+        })
+        return self._build_response(cuisine, restaurant_name, menu)
+
+    def _cached(self,
+                cuisine: str,
+                diets: Union[str, List[str]],
+                no_of_items: int) -> Optional[MenuResponse]:
+        """Look the request up in the cache, if one is configured."""
+        if self.cache is None:
+            return None
+        with span("cache_lookup") as fields:
+            cached = self.cache.get(cuisine, diets, no_of_items, namespace=self.cache_namespace)
+            fields['hit'] = cached is not None
+        record_cache(cached is not None)
+        return cached
+
+    def _retrieve(self,
+                  cuisine: str,
+                  diets: Union[str, List[str]],
+                  no_of_items: int) -> Optional[MenuResponse]:
+        """Return a stored-dish menu in retrieval-first mode, or None to call the LLM."""
+        if not self.retrieval_first:
+            return None
         try:
-            name_template, menu_template = self._create_chains()
-            
-            # Create chains
-            name_chain = LLMChain(llm=self.llm, prompt=name_template, output_key='restaurant_name')
-            menu_chain = LLMChain(llm=self.llm, prompt=menu_template, output_key='menu')
-
-            # Combine chains
-            chain = SequentialChain(
-                chains=[name_chain, menu_chain],
-                input_variables=['cuisine', 'diet', 'no_of_items'],
-                output_variables=['restaurant_name', 'menu']
-            )
+            with span("assemble") as fields:
+                assembled = self.assemble_menu(cuisine, diets, no_of_items)
+                fields['found'] = assembled is not None
+            return assembled
+        except sqlite3.Error as e:
+            logger.warning(f"Menu store lookup failed, generating instead: {e}")
+            return None
 
-            # Generate response
-            response = chain({
-                'cuisine': cuisine,
-                'diet': diets,
-                'no_of_items': no_of_items
-            })
-
-            # Parse the menu
-            parsed_menu = self.parse_menu(response['menu'])
-
-            return MenuResponse(
-                cuisine=cuisine,
-                restaurant_name=response['restaurant_name'].strip(),
-                menu=response['menu'].strip(),
-                parsed_menu=parsed_menu
-            )
+    def _run_strategy(self, cuisine: str, diets: str, no_of_items: int) -> Tuple[str, str]:
+        """Call the LLM the configured strategy's way; returns (restaurant_name, completion)."""
+        if self.strategy == "single":
+            return self.resilience.call(lambda: self._generate_single(cuisine, diets, no_of_items), "single")
+        if self.strategy == "parallel":
+            return self._generate_parallel(cuisine, diets, no_of_items)
+        return self.resilience.call(lambda: self._generate_sequential(cuisine, diets, no_of_items), "sequential")
 
-        except Exception as e:
-            raise
+    async def _arun_strategy(self, cuisine: str, diets: str, no_of_items: int) -> Tuple[str, str]:
+        """Async counterpart of _run_strategy."""
+        if self.strategy == "single":
+            return await self.resilience.acall(lambda: self._agenerate_single(cuisine, diets, no_of_items), "single")
+        if self.strategy == "parallel":
+            return await self._agenerate_parallel(cuisine, diets, no_of_items)
+        return await self.resilience.acall(
+            lambda: self._agenerate_sequential(cuisine, diets, no_of_items), "sequential")
+
+    def _interpret(self, restaurant_name: str, completion: str) -> Tuple[str, str, ParsedMenu]:
+        """
+        Parse a strategy's completion into (restaurant_name, menu text, parsed menu).
+
+        JSON completions are decoded against menu_schema.MenuSchema; anything
+        that does not decode goes through the text parser like a markdown menu.
+        The parallel strategy has already merged its sections into text.
+        """
+        output_format = "json" if self.structured_output else "text"
+        if self.structured_output and self.strategy != "parallel":
+            document = decode_menu_json(completion)
+            if document is not None:
+                record_parse(output_format, "ok")
+                menu, parsed = structured_menu(document)
+                return restaurant_name or (document.restaurant_name or "").strip(), menu, parsed
+            record_parse(output_format, "fallback")
+            logger.info("JSON menu did not decode, parsing it as text")
+            if self.strategy == "single":
+                restaurant_name, completion = self.split_single_response(completion)
+
+        with span("parse", chars=len(completion)):
+            parsed = MenuParser.parse(completion)
+        if not self.structured_output:
+            record_parse(output_format, "ok" if any(parsed.sections.values()) else "empty")
+        elif not any(parsed.sections.values()):
+            record_parse(output_format, "empty")
+        return restaurant_name, completion, parsed
+
+    def _should_regenerate(self, parsed: ParsedMenu, attempt: int) -> bool:
+        """Whether a menu with no parsed items is to be generated again."""
+        if any(parsed.sections.values()) or attempt >= self.max_regenerations:
+            return False
+        logger.warning(f"No menu items could be parsed from the {self.strategy} completion, generating it again")
+        return True
+
+    def generate_menu(self, 
+                     cuisine: str, 
+                     diets: Union[str, List[str]], 
+                     no_of_items: int = 3) -> MenuResponse:
+        """
+        Generate a restaurant name and menu based on specified parameters.
+
+        Args:
+            cuisine (str): Type of cuisine (e.g., "Mexican", "Italian")
+            diets (Union[str, List[str]]): Dietary restrictions
+            no_of_items (int, optional): Number of items per section. Defaults to 3
+
+        Returns:
+            MenuResponse: Structured response containing restaurant details
+
+        Raises:
+            ValueError: If input parameters are invalid
+            Exception: For other errors during generation
+        """
+        diet_prompt = self._prepare_inputs(cuisine, diets, no_of_items)
+
+        with span("generate_menu", cuisine=cuisine, items=no_of_items, strategy=self.strategy):
+            # Serve repeated requests from the cache when one is configured
+            cached = self._cached(cuisine, diets, no_of_items)
+            if cached is not None:
+                return cached
+
+            # Assembled menus are neither cached nor stored again, so each request samples afresh
+            assembled = self._retrieve(cuisine, diets, no_of_items)
+            if assembled is not None:
+                return assembled
+
+            with track_usage() as usage:
+                for attempt in range(self.max_regenerations + 1):
+                    if attempt:
+                        record_regeneration(self.strategy)
+                    restaurant_name, completion = self._run_strategy(cuisine, diet_prompt, no_of_items)
+                    restaurant_name, menu, parsed = self._interpret(restaurant_name, completion)
+                    if not self._should_regenerate(parsed, attempt):
+                        break
+
+            menu_response = self._build_response(cuisine, restaurant_name, menu, parsed, usage)
+            self._remember(cuisine, diets, no_of_items, menu_response)
+
+            return menu_response
+
+    async def agenerate_menu(self,
+                             cuisine: str,
+                             diets: Union[str, List[str]],
+                             no_of_items: int = 3) -> MenuResponse:
+        """
+        Asynchronously generate a restaurant name and menu.
+
+        Same arguments, return value and errors as generate_menu, but the LLM
+        calls use LangChain's async APIs so the event loop is free while
+        waiting on the model. Cache, store and deduplication work is blocking
+        SQLite and numpy code, so it runs in worker threads.
+        """
+        diet_prompt = self._prepare_inputs(cuisine, diets, no_of_items)
+
+        with span("generate_menu", cuisine=cuisine, items=no_of_items, strategy=self.strategy):
+            cached = await asyncio.to_thread(self._cached, cuisine, diets, no_of_items)
+            if cached is not None:
+                return cached
+
+            assembled = await asyncio.to_thread(self._retrieve, cuisine, diets, no_of_items)
+            if assembled is not None:
+                return assembled
+
+            with track_usage() as usage:
+                for attempt in range(self.max_regenerations + 1):
+                    if attempt:
+                        record_regeneration(self.strategy)
+                    restaurant_name, completion = await self._arun_strategy(cuisine, diet_prompt, no_of_items)
+                    restaurant_name, menu, parsed = self._interpret(restaurant_name, completion)
+                    if not self._should_regenerate(parsed, attempt):
+                        break
+
+            menu_response = await asyncio.to_thread(
+                self._build_response, cuisine, restaurant_name, menu, parsed, usage)
+            await asyncio.to_thread(self._remember, cuisine, diets, no_of_items, menu_response)
+
+            return menu_response
+
+    async def agenerate_many(self,
+                             requests: Iterable[Union[Tuple, Dict[str, Any]]],
+                             concurrency: int = 4,
+                             timeout: Optional[float] = None,
+                             return_exceptions: bool = False) -> List[Union[MenuResponse, BaseException]]:
+        """
+        Generate several menus concurrently.
+
+        Args:
+            requests: Jobs given as (cuisine, diets, no_of_items) tuples or as
+                dicts with the generate_menu keyword arguments
+            concurrency (int, optional): Maximum jobs in flight. Defaults to 4
+            timeout (Optional[float], optional): Per-job timeout in seconds
+            return_exceptions (bool, optional): Return failures in place of
+                results instead of raising the first one. Defaults to False
+
+        Returns:
+            List[Union[MenuResponse, BaseException]]: Results in request order
+
+        Raises:
+            ValueError: If concurrency is not positive
+            asyncio.TimeoutError: If a job exceeds the timeout and
+                return_exceptions is False
+        """
+        if concurrency < 1:
+            raise ValueError("Concurrency must be positive")
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(job: Union[Tuple, Dict[str, Any]]) -> MenuResponse:
+            kwargs = job if isinstance(job, dict) else dict(zip(('cuisine', 'diets', 'no_of_items'), job))
+            async with semaphore:
+                return await asyncio.wait_for(self.agenerate_menu(**kwargs), timeout)
+
+        return await asyncio.gather(*(run(job) for job in requests),
+                                    return_exceptions=return_exceptions)
+
+    def stream_menu(self,
+                    cuisine: str,
+                    diets: Union[str, List[str]],
+                    no_of_items: int = 3) -> MenuStream:
+        """
+        Generate a menu, streaming the menu text as the model produces it.
+
+        With the "sequential" strategy the name is generated first and the menu
+        call is streamed; with "single" the combined completion is streamed and
+        the name is split off its first line. With "parallel" the first section
+        is streamed while the others are generated in the background, and each
+        of those follows as one chunk once the one before it is done.
+
+        Args:
+            cuisine (str): Type of cuisine (e.g., "Mexican", "Italian")
+            diets (Union[str, List[str]]): Dietary restrictions
+            no_of_items (int, optional): Number of items per section. Defaults to 3
+
+        Returns:
+            MenuStream: Iterable of menu text chunks carrying the restaurant name
+
+        Raises:
+            ValueError: If input parameters are invalid
+        """
+        diet_prompt = self._prepare_inputs(cuisine, diets, no_of_items)
+
+        if self.structured_output:
+            # A JSON document cannot be shown item by item while it is written
+            response = self.generate_menu(cuisine, diets, no_of_items)
+            return MenuStream(self, cuisine, diets, no_of_items, response.restaurant_name, response=response)
+
+        cached = self._cached(cuisine, diets, no_of_items)
+        if cached is not None:
+            return MenuStream(self, cuisine, diets, no_of_items,
+                              cached.restaurant_name, response=cached)
+
+        assembled = self._retrieve(cuisine, diets, no_of_items)
+        if assembled is not None:
+            return MenuStream(self, cuisine, diets, no_of_items,
+                              assembled.restaurant_name, response=assembled)
+
+        # Retries and deadlines cover each call up to its first chunk; once text
+        # has been handed out the stream can no longer be restarted transparently
+        inputs = {'cuisine': cuisine, 'diet': diet_prompt, 'no_of_items': no_of_items}
+        usage = TokenUsage()
+        with usage_scope(usage):
+            if self.strategy == "single":
+                runnable = self._runnable("single", no_of_items)
+                restaurant_name, chunks = self.resilience.call(
+                    lambda: self._split_streamed_name(self._stream_text(runnable, inputs, "single")), "single")
+            elif self.strategy == "parallel":
+                restaurant_name = self._generate_name(inputs)
+                section_inputs = dict(inputs, restaurant_name=restaurant_name)
+                first, rest = MenuParser.SECTIONS[0], MenuParser.SECTIONS[1:]
+                stop = threading.Event()
+                futures = [self._submit_section(section_inputs, section, stop) for section in rest]
+                runnable = self._runnable("section", no_of_items)
+                try:
+                    head = self.resilience.call(
+                        lambda: self._open_stream(self._stream_text(
+                            runnable, dict(section_inputs, section=first), "section")),
+                        "section")
+                except BaseException:
+                    _abandon_sections(futures, stop)
+                    raise
+                chunks = _SectionStream(self._stream_parallel(first, head, list(zip(rest, futures))),
+                                        head, futures, stop)
+            else:
+                restaurant_name = self._generate_name(inputs)
+                menu_inputs = dict(inputs, restaurant_name=restaurant_name)
+                runnable = self._runnable("menu", no_of_items)
+                chunks = self.resilience.call(
+                    lambda: self._open_stream(self._stream_text(runnable, menu_inputs, "menu")), "menu")
+
+        return MenuStream(self, cuisine, diets, no_of_items, restaurant_name, chunks=chunks, usage=usage)
+
+    def _stream_text(self, runnable: Runnable, inputs: Dict[str, Any], step: str) -> Iterator[str]:
+        """Stream the model's completion for a prompt as plain text chunks."""
+        config = {'callbacks': METRICS_CALLBACKS, 'tags': step_tags(step)}
+        for chunk in runnable.stream(inputs, config):
+            if chunk.content:
+                yield chunk.content
+
+    def _stream_parallel(self,
+                         first: str,
+                         head: Iterator[str],
+                         pending: List[Tuple[str, "Future[str]"]]) -> Iterator[str]:
+        """Stream the first section under its heading, then the finished background sections."""
+        buffered = ""
+        for chunk in head:
+            buffered += chunk
+            if '\n' in buffered.lstrip():
+                break
+        yield f"**{first}**\n" + self._strip_section_heading(first, buffered)
+        yield from head
+        for _, future in pending:
+            yield "\n\n" + future.result()
+
+    @staticmethod
+    def _open_stream(chunks: Iterator[str]) -> Iterator[str]:
+        """Wait for the first chunk, so failing to connect surfaces here rather than mid-stream."""
+        first = next(chunks, None)
+        if first is None:
+            return iter(())
+        return _OpenedStream(first, chunks)
+
+    def _split_streamed_name(self, chunks: Iterator[str]) -> Tuple[str, Iterator[str]]:
+        """Read a single-call stream up to the end of the name line."""
+        buffered = ""
+        for chunk in chunks:
+            buffered += chunk
+            head, newline, _ = buffered.lstrip().partition('\n')
+            if newline and head.strip():
+                break
+        if not buffered.strip():
+            raise ValueError("Menu string cannot be empty")
+
+        match = _RESTAURANT_NAME_LINE.search(buffered)
+        if match:
+            restaurant_name, rest = match.group(1), buffered[match.end():]
+        else:
+            restaurant_name, _, rest = buffered.lstrip().partition('\n')
+        return restaurant_name.strip().strip('*"\' '), _OpenedStream(rest.lstrip(), chunks)
 
     @staticmethod
     def parse_menu(menu_string: str) -> List[Tuple[str, List[str]]]:
@@ -142,41 +1356,7 @@ Follow the format strictly and consistently.
         if not menu_string:
             raise ValueError("Menu string cannot be empty")
 
-        sections = menu_string.strip().split('\n\n')
-        parsed_menu = []
-
-        for section in sections:
-            lines = section.strip().split('\n')
-            
-            # Extract heading
-            if not lines or not lines[0].strip():
-                continue
-                
-            heading = lines[0].strip("* ")
-            if heading.startswith("**") and heading.endswith("**"):
-                heading = heading[2:-2].strip()
-            
-            # Process items
-            items = []
-            current_item = []
-            
-            for line in lines[1:]:
-                line = line.strip()
-                if line.startswith("*"):
-                    if current_item:
-                        items.append("\n".join(current_item))
-                        current_item = []
-                    current_item.append(line.lstrip("* "))
-                elif line:
-                    current_item.append(line)
-            
-            if current_item:
-                items.append("\n".join(current_item))
-            
-            if heading and items:
-                parsed_menu.append((heading, items))
-
-        return parsed_menu
+        return MenuParser.parse(menu_string).parsed_menu
 
 
 if __name__ == "__main__":
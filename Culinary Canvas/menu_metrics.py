@@ -0,0 +1,540 @@
+# menu_metrics.py
+"""
+Latency and usage metrics for the menu pipeline.
+
+Each stage of a request (cache lookup, every LLM call, parsing, deduplication,
+storing, rendering) runs inside a span. A span records its duration in the
+menu_stage_seconds histogram and writes one JSON log line to the
+"menu_metrics" logger, tagged with the request's trace id, so a slow menu
+can be broken down after the fact. LLM calls are timed by
+MetricsCallbackHandler, which also counts tokens, errors and retries for
+each chain step ("name", "menu", "single" or "section").
+
+Token usage is also totalled per generated menu: generate_menu collects the
+usage of its LLM calls with track_usage() and attaches it to the response,
+and the totals are observed in the menu_tokens_per_menu histogram. Every
+parsed completion is counted by output format and result, and menus that had
+to be generated again because nothing could be parsed are counted per
+strategy; regenerations over the generate_menu span count is the
+regeneration rate.
+
+Metrics are kept per process and rendered in the Prometheus text format by
+render_prometheus(); menu_service.py serves them at GET /metrics and
+start_metrics_server() serves them from any other process, such as the
+Streamlit dashboard.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uuid import UUID, uuid4
+import json
+import logging
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+logger = logging.getLogger("menu_metrics")
+
+# Upper bounds in seconds, from a cache hit to a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Rough characters per token, used when a backend does not report usage
+CHARS_PER_TOKEN = 4
+
+# Bucket upper bounds for tokens per menu
+TOKEN_BUCKETS = (100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000)
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("menu_trace_id", default=None)
+
+
+class _Metric:
+    """A named family of samples keyed by label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+                   for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {value:g}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets per label set."""
+
+    kind = "histogram"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (the last one is +Inf), sum of observations
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total:g}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metric families of a process, rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self,
+                  name: str,
+                  documentation: str,
+                  labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "menu_stage_seconds", "Time spent in each stage of menu generation and display", ["stage"])
+STAGE_ERRORS = REGISTRY.counter(
+    "menu_stage_errors_total", "Stages that ended with an exception", ["stage"])
+LLM_TOKENS = REGISTRY.counter(
+    "menu_llm_tokens_total", "Tokens sent to and received from the LLM per chain step", ["step", "kind"])
+LLM_RETRIES = REGISTRY.counter(
+    "menu_llm_retries_total", "LLM calls retried after a failure, per chain step", ["step"])
+CACHE_REQUESTS = REGISTRY.counter(
+    "menu_cache_requests_total", "Menu cache lookups by result", ["result"])
+PARSE_RESULTS = REGISTRY.counter(
+    "menu_parse_results_total",
+    "Parsed LLM completions by requested output format and result (ok, fallback or empty)",
+    ["format", "result"])
+REGENERATIONS = REGISTRY.counter(
+    "menu_regenerations_total", "Menus generated again because no items could be parsed", ["strategy"])
+MENU_TOKENS = REGISTRY.histogram(
+    "menu_tokens_per_menu", "Prompt and completion tokens spent on each generated menu", ["kind"],
+    buckets=TOKEN_BUCKETS)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, for backends that do not report usage."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass
+class TokenUsage:
+    """Tokens spent by the LLM calls of one menu generation."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    calls: int = 0
+    # True if any call's counts were estimated from text length
+    estimated: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, prompt_tokens: int, completion_tokens: int, estimated: bool = False) -> None:
+        # The parallel strategy's sections finish on different threads
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.calls += 1
+            self.estimated = self.estimated or estimated
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'prompt_tokens': self.prompt_tokens, 'completion_tokens': self.completion_tokens,
+                'total_tokens': self.total_tokens, 'calls': self.calls, 'estimated': self.estimated}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Responses holding a usage are pickled by Streamlit; the lock is not picklable
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state, _lock=threading.Lock())
+
+
+_usage: ContextVar[Optional[TokenUsage]] = ContextVar("menu_token_usage", default=None)
+_END = object()
+
+
+def render_prometheus() -> str:
+    """Return the process's metrics in the Prometheus text exposition format."""
+    return REGISTRY.render()
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def log_event(event: str, **fields: Any) -> None:
+    """Write one structured log line, tagged with the current trace id."""
+    if logger.isEnabledFor(logging.INFO):
+        record = {'event': event, 'trace_id': _trace_id.get(), **fields}
+        logger.info(json.dumps(record, default=str, ensure_ascii=False))
+
+
+def record_stage(stage: str, seconds: float, status: str = "ok", **fields: Any) -> None:
+    """Record a stage timed by the caller, e.g. work spread over a stream's chunks."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    log_event("span", stage=stage, seconds=round(seconds, 6), status=status, **fields)
+
+
+@contextmanager
+def track_usage() -> Iterator[TokenUsage]:
+    """
+    Total the tokens of every LLM call made inside the block.
+
+    Calls made on other threads or tasks count too, as long as they run in a
+    copy of this context. The totals are observed in menu_tokens_per_menu
+    when the block ends, if any call was made.
+
+    Yields:
+        TokenUsage: The running totals
+    """
+    usage = TokenUsage()
+    try:
+        with usage_scope(usage):
+            yield usage
+    finally:
+        observe_usage(usage)
+
+
+@contextmanager
+def usage_scope(usage: TokenUsage) -> Iterator[TokenUsage]:
+    """Count LLM calls made inside the block towards an existing TokenUsage."""
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def observe_usage(usage: TokenUsage) -> None:
+    """Record a finished generation's totals in menu_tokens_per_menu."""
+    if usage.calls:
+        MENU_TOKENS.observe(usage.prompt_tokens, kind="prompt")
+        MENU_TOKENS.observe(usage.completion_tokens, kind="completion")
+
+
+def iter_with_usage(usage: TokenUsage, iterator: Iterator[Any]) -> Iterator[Any]:
+    """
+    Iterate a lazy LLM stream so the tokens it reports count towards usage.
+
+    A stream's LLM call ends while it is being consumed, usually outside the
+    track_usage block of the call that opened it; the usage is made current
+    for each step of the iterator instead.
+    """
+    while True:
+        with usage_scope(usage):
+            item = next(iterator, _END)
+        if item is _END:
+            return
+        yield item
+
+
+@contextmanager
+def span(stage: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a stage, recording it in menu_stage_seconds and the structured log.
+
+    The outermost span of a request starts a new trace id; nested spans and
+    LLM calls made inside it share that id. The yielded dict can be used to
+    add fields to the log line, such as an item count known only at the end.
+
+    Args:
+        stage (str): Stage name, used as the histogram label
+        **fields: Extra fields for the log line
+
+    Yields:
+        Dict[str, Any]: The log fields, which the caller may extend
+    """
+    token = _trace_id.set(uuid4().hex[:16]) if _trace_id.get() is None else None
+    status = "ok"
+    start = time.perf_counter()
+    try:
+        yield fields
+    except BaseException:
+        status = "error"
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - start, status, **fields)
+        if token is not None:
+            _trace_id.reset(token)
+
+
+def record_cache(hit: bool) -> None:
+    CACHE_REQUESTS.inc(result="hit" if hit else "miss")
+
+
+def record_retry(step: str) -> None:
+    LLM_RETRIES.inc(step=step)
+    log_event("retry", step=step)
+
+
+def record_parse(output_format: str, result: str) -> None:
+    PARSE_RESULTS.inc(format=output_format, result=result)
+
+
+def record_regeneration(strategy: str) -> None:
+    REGENERATIONS.inc(strategy=strategy)
+    log_event("regenerate", strategy=strategy)
+
+
+def step_tags(step: str) -> List[str]:
+    """Tags that mark the LLM calls of one chain step for MetricsCallbackHandler."""
+    return [f"step:{step}"]
+
+
+def _step_from_tags(tags: Optional[List[str]]) -> Optional[str]:
+    for tag in tags or ():
+        if tag.startswith("step:"):
+            return tag[5:]
+    return None
+
+
+def _token_usage(response: LLMResult) -> Optional[Tuple[int, int]]:
+    """(prompt, completion) tokens as reported by the backend, if it does."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return int(usage.get("prompt_tokens", 0)), int(usage.get("completion_tokens", 0))
+    prompt = completion = 0
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                found = True
+                prompt += metadata.get("input_tokens", 0)
+                completion += metadata.get("output_tokens", 0)
+    return (prompt, completion) if found else None
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback that times every LLM call and counts its tokens.
+
+    Calls are attributed to the chain step named by their "step:<name>" tag
+    (see step_tags), or by the tag of the chain they run in, since tags given
+    to a chain's constructor are not passed on to its LLM calls. Each call is
+    recorded under the stage "llm_<step>", and streamed calls also record
+    their time to first token as "llm_<step>_first_token". Token counts come
+    from the backend's usage metadata, or are estimated from the text length
+    when it reports none.
+    """
+
+    # Recording is cheap, so async runs need not hop to an executor thread
+    run_inline = True
+
+    def __init__(self):
+        # In-flight LLM calls: step, start time, prompt characters, first token seen
+        self._runs: Dict[UUID, Tuple[str, float, int, bool]] = {}
+        # Step of each in-flight chain that carries a step tag
+        self._chain_steps: Dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], *,
+                       run_id: UUID, tags: Optional[List[str]] = None, **kwargs: Any) -> None:
+        step = _step_from_tags(tags)
+        if step is not None:
+            with self._lock:
+                self._chain_steps[run_id] = step
+
+    def on_chain_end(self, outputs: Dict[str, Any], *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._chain_steps.pop(run_id, None)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._chain_steps.pop(run_id, None)
+
+    def _start(self,
+               run_id: UUID,
+               parent_run_id: Optional[UUID],
+               tags: Optional[List[str]],
+               prompt_chars: int) -> None:
+        with self._lock:
+            step = _step_from_tags(tags) or self._chain_steps.get(parent_run_id) or "other"
+            self._runs[run_id] = (step, time.perf_counter(), prompt_chars, False)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *,
+                     run_id: UUID, parent_run_id: Optional[UUID] = None,
+                     tags: Optional[List[str]] = None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, tags, sum(len(prompt) for prompt in prompts))
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *,
+                            run_id: UUID, parent_run_id: Optional[UUID] = None,
+                            tags: Optional[List[str]] = None, **kwargs: Any) -> None:
+        chars = sum(len(str(message.content)) for batch in messages for message in batch)
+        self._start(run_id, parent_run_id, tags, chars)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or run[3]:
+                return
+            self._runs[run_id] = run[:3] + (True,)
+        STAGE_SECONDS.observe(time.perf_counter() - run[1], stage=f"llm_{run[0]}_first_token")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        step, start, prompt_chars, _ = run
+        seconds = time.perf_counter() - start
+        usage = _token_usage(response)
+        estimated = usage is None
+        if estimated:
+            text_chars = sum(len(generation.text) for generations in response.generations
+                             for generation in generations)
+            usage = (-(-prompt_chars // CHARS_PER_TOKEN), -(-text_chars // CHARS_PER_TOKEN))
+        STAGE_SECONDS.observe(seconds, stage=f"llm_{step}")
+        LLM_TOKENS.inc(usage[0], step=step, kind="prompt")
+        LLM_TOKENS.inc(usage[1], step=step, kind="completion")
+        generation_usage = _usage.get()
+        if generation_usage is not None:
+            generation_usage.add(usage[0], usage[1], estimated)
+        log_event("llm", step=step, seconds=round(seconds, 6), prompt_tokens=usage[0],
+                  completion_tokens=usage[1], estimated_tokens=estimated)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        step = run[0] if run else "other"
+        STAGE_ERRORS.inc(stage=f"llm_{step}")
+        log_event("llm_error", step=step, error=type(error).__name__)
+
+    def on_retry(self, retry_state: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.get(run_id)
+        record_retry(run[0] if run else "other")
+
+
+METRICS_HANDLER = MetricsCallbackHandler()
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Scrapes every few seconds would drown out the application's own logs
+        pass
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics from a daemon thread, for processes without their own
+    HTTP API such as the Streamlit dashboard.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="menu-metrics", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+    return server
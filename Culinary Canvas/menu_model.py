@@ -0,0 +1,188 @@
+# menu_model.py
+"""
+Compact, immutable menu items and sections.
+
+A generated menu lives on in st.session_state for the rest of the session,
+so its items are kept as frozen slotted objects instead of one dict and one
+label list per item. Dietary labels the dashboard offers are bits of a
+DietaryTag flag; any other label the model invents is kept as an interned
+string. MenuResponse in menu_generator is built on these types and still
+offers the dict views and to_dict output the rest of the code expects.
+
+encode_compact and decode_compact write menus as nested arrays with orjson,
+or with msgpack when it is installed.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+import enum
+import functools
+import sys
+
+import orjson
+
+from menu_utils import normalize_restriction
+
+try:
+    import msgpack
+except ImportError:  # optional; only the "msgpack" codec needs it
+    msgpack = None
+
+CODECS = ("orjson", "msgpack")
+
+# Bumped whenever the layout written by MenuResponse.to_bytes changes
+COMPACT_VERSION = 1
+
+
+class DietaryTag(enum.Flag):
+    """The dietary labels offered by the dashboard, one bit each, in display order."""
+    VEGETARIAN = enum.auto()
+    NON_VEGETARIAN = enum.auto()
+    VEGAN = enum.auto()
+    GLUTEN_FREE = enum.auto()
+    DAIRY_FREE = enum.auto()
+    NUT_FREE = enum.auto()
+
+    @property
+    def labels(self) -> List[str]:
+        """Display labels of the set bits, e.g. ['Vegan', 'Gluten-Free']."""
+        return list(_labels(self))
+
+    @classmethod
+    def from_labels(cls, labels: Iterable[str]) -> Tuple["DietaryTag", Tuple[str, ...]]:
+        """
+        Split dietary labels into known tags and everything else.
+
+        Labels are matched after normalize_restriction, so 'gluten free' sets
+        GLUTEN_FREE. Unknown labels are interned and keep their order.
+
+        Returns:
+            Tuple[DietaryTag, Tuple[str, ...]]: (known tags, other labels)
+        """
+        return _split_labels(tuple(labels))
+
+
+_LABELS = {tag: tag.name.title().replace('_', '-') for tag in DietaryTag}
+_BY_KEY = {normalize_restriction(label): tag.value for tag, label in _LABELS.items()}
+
+
+# Flag arithmetic and construction are slow in Python, and menus only ever use a
+# handful of labels and combinations, so the conversions are memoized
+@functools.lru_cache(maxsize=4096)
+def _split_labels(labels: Tuple[str, ...]) -> Tuple[DietaryTag, Tuple[str, ...]]:
+    bits = 0
+    others = []
+    for label in labels:
+        bit = _BY_KEY.get(normalize_restriction(label), 0)
+        if bit:
+            bits |= bit
+        else:
+            others.append(sys.intern(label))
+    return _tag(bits), tuple(others)
+
+
+@functools.lru_cache(maxsize=None)
+def _tag(bits: int) -> DietaryTag:
+    return DietaryTag(bits)
+
+
+@functools.lru_cache(maxsize=None)
+def _labels(tags: DietaryTag) -> Tuple[str, ...]:
+    return tuple(_LABELS[tag] for tag in tags)
+
+
+@dataclass(frozen=True, slots=True)
+class MenuItem:
+    """One dish of a menu section."""
+    name: str
+    description: str = ""
+    tags: DietaryTag = DietaryTag(0)
+    # Dietary labels that are not DietaryTags, in the order the model gave them
+    other_tags: Tuple[str, ...] = ()
+
+    @property
+    def dietary(self) -> List[str]:
+        """All dietary labels: known tags in display order, then the others."""
+        return list(_labels(self.tags) + self.other_tags)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The item dict MenuParser.parse_menu produces."""
+        return {'name': self.name, 'description': self.description, 'dietary': self.dietary}
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "MenuItem":
+        tags, other_tags = _split_labels(tuple(item.get('dietary') or ()))
+        return cls(item['name'], item.get('description', ""), tags, other_tags)
+
+    def pack(self) -> Tuple[str, str, int, Tuple[str, ...]]:
+        return self.name, self.description, self.tags.value, self.other_tags
+
+    @classmethod
+    def unpack(cls, data: Sequence[Any]) -> "MenuItem":
+        name, description, tags, other_tags = data
+        return cls(name, description, _tag(tags), tuple(sys.intern(label) for label in other_tags))
+
+    def __reduce__(self):
+        # Pickled as the packed tuple: smaller and faster than the slot state with a pickled Flag
+        return _unpickle_item, self.pack()
+
+
+def _unpickle_item(name: str, description: str, tags: int, other_tags: Tuple[str, ...]) -> MenuItem:
+    return MenuItem(name, description, _tag(tags), other_tags)
+
+
+@dataclass(frozen=True, slots=True)
+class MenuSection:
+    """A known menu section and its items."""
+    name: str
+    items: Tuple[MenuItem, ...] = ()
+
+    def pack(self) -> Tuple[str, List[Tuple[str, str, int, Tuple[str, ...]]]]:
+        return self.name, [item.pack() for item in self.items]
+
+    @classmethod
+    def unpack(cls, data: Sequence[Any]) -> "MenuSection":
+        name, items = data
+        return cls(sys.intern(name), tuple(MenuItem.unpack(item) for item in items))
+
+
+def sections_from_dicts(sections: Dict[str, List[Dict[str, Any]]]) -> Tuple[MenuSection, ...]:
+    """Convert MenuParser.parse_menu output, keeping empty sections and their order."""
+    return tuple(
+        MenuSection(sys.intern(section), tuple(MenuItem.from_dict(item) for item in items))
+        for section, items in sections.items()
+    )
+
+
+def sections_to_dicts(sections: Iterable[MenuSection]) -> Dict[str, List[Dict[str, Any]]]:
+    """Inverse of sections_from_dicts."""
+    return {section.name: [item.to_dict() for item in section.items] for section in sections}
+
+
+def encode_compact(value: Any, codec: str = "orjson") -> bytes:
+    """
+    Serialize nested tuples/lists of strings and ints.
+
+    Raises:
+        ValueError: If the codec is unknown, or is "msgpack" and msgpack is
+        not installed
+    """
+    if codec == "orjson":
+        return orjson.dumps(value)
+    if codec == "msgpack":
+        return _msgpack().packb(value)
+    raise ValueError(f"Unknown codec '{codec}', expected one of {CODECS}")
+
+
+def decode_compact(data: bytes, codec: str = "orjson") -> Any:
+    """Inverse of encode_compact; arrays come back as lists."""
+    if codec == "orjson":
+        return orjson.loads(data)
+    if codec == "msgpack":
+        return _msgpack().unpackb(data)
+    raise ValueError(f"Unknown codec '{codec}', expected one of {CODECS}")
+
+
+def _msgpack():
+    if msgpack is None:
+        raise ValueError("The msgpack codec requires the msgpack package")
+    return msgpack
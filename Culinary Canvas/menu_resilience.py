@@ -0,0 +1,414 @@
+# menu_resilience.py
+"""
+Retry, deadline, circuit-breaker and hedging policy for LLM calls.
+
+ResilientCaller wraps one chain invocation at a time:
+
+    deadline   each attempt must finish within ResiliencePolicy.timeout seconds
+    retries    retryable failures (rate limits, 5xx, timeouts, dropped
+               connections) are retried with jittered exponential backoff
+    breaker    after repeated failures the CircuitBreaker opens and calls fail
+               fast with CircuitOpenError until a trial call succeeds
+    hedging    optionally, a second identical call is started when the first
+               has not answered within hedge_after seconds; the first answer wins
+
+Synchronous calls run on a shared pool of worker threads so a deadline can be
+enforced without cancelling the caller; a call that overruns keeps its worker
+until the backend answers, but the caller is released on time. Attempts that
+are no longer wanted are cancelled if they have not started, and whatever a
+late or losing attempt returns, such as an opened stream, is closed.
+"""
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+import asyncio
+import contextvars
+import threading
+import time
+
+from tenacity import (AsyncRetrying, RetryCallState, Retrying, retry_if_exception, stop_after_attempt,
+                      stop_after_delay, wait_random_exponential)
+
+from menu_metrics import REGISTRY, log_event, record_retry
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, rate limits and server errors
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Exception class names of the SDKs behind the backends, matched by name so
+# none of them has to be importable
+RETRYABLE_NAMES = frozenset({
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "BadGateway", "Aborted",
+    "RateLimitError", "APITimeoutError", "APIConnectionError",
+    "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError",
+})
+
+CIRCUIT_REJECTIONS = REGISTRY.counter(
+    "menu_llm_circuit_rejections_total", "LLM calls refused because the circuit breaker was open")
+LLM_TIMEOUTS = REGISTRY.counter(
+    "menu_llm_timeouts_total", "LLM call attempts that overran their deadline", ["step"])
+HEDGED_CALLS = REGISTRY.counter(
+    "menu_llm_hedged_total", "Hedged LLM calls by which attempt answered first", ["winner"])
+
+
+class LLMTimeoutError(TimeoutError):
+    """An LLM call did not finish within its deadline."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The circuit breaker is open; the backend is treated as unavailable."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM backend unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code", "http_status"):
+        value = getattr(exc, attr, None)
+        if callable(value):
+            continue
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed LLM call is worth retrying rather than reporting."""
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if type(exc).__name__ in RETRYABLE_NAMES:
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Wrapped errors, e.g. a chain re-raising its model's failure
+    cause = exc.__cause__ or exc.__context__
+    return cause is not None and cause is not exc and is_retryable(cause)
+
+
+def is_rate_limit(exc: BaseException) -> bool:
+    return type(exc).__name__ in ("ResourceExhausted", "TooManyRequests", "RateLimitError") \
+        or _status_code(exc) == 429
+
+
+def describe_error(exc: BaseException) -> str:
+    """A message for end users explaining why a menu could not be generated."""
+    if isinstance(exc, ValueError):
+        return f"Invalid request: {exc}"
+    if isinstance(exc, CircuitOpenError):
+        return (f"The menu model is unavailable right now. "
+                f"Please try again in about {max(exc.retry_after, 1):.0f} seconds.")
+    if isinstance(exc, (LLMTimeoutError, asyncio.TimeoutError)):
+        return "The menu model took too long to respond. Please try again."
+    if is_rate_limit(exc):
+        return "The menu model is receiving too many requests. Please wait a minute and try again."
+    if is_retryable(exc):
+        return "The menu model is having trouble right now. Please try again shortly."
+    status = _status_code(exc)
+    if status in (401, 403) or type(exc).__name__ in ("PermissionDenied", "Unauthenticated"):
+        return "The menu model rejected the request. Please check your API key."
+    return "Failed to generate the menu. Please try again."
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the backend looks unhealthy.
+
+    The breaker opens after failure_threshold consecutive failures and
+    refuses calls for reset_timeout seconds. It then lets a single trial
+    call through (half-open): success closes it, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be positive")
+        if reset_timeout <= 0:
+            raise ValueError("reset_timeout must be positive")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self) -> None:
+        """
+        Reserve a call, or refuse it while the circuit is open.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with its
+                trial call already in flight
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_timeout or self._trial_in_flight:
+                CIRCUIT_REJECTIONS.inc()
+                raise CircuitOpenError(max(self.reset_timeout - waited, 0.0))
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                log_event("circuit", state=self.CLOSED)
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    log_event("circuit", state=self.OPEN, failures=self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a reserved call that failed for reasons unrelated to backend health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+@dataclass
+class ResiliencePolicy:
+    """
+    How LLM calls are bounded and retried.
+
+    Attributes:
+        timeout: Deadline for each attempt in seconds, or None for no deadline
+        max_attempts: Attempts per call, including the first
+        backoff_initial: Scale of the randomized exponential backoff in seconds
+        backoff_max: Longest wait between attempts
+        total_timeout: Give up retrying once this many seconds have passed
+        hedge_after: Start a duplicate attempt if the first has not answered
+            after this many seconds; None disables hedging
+        failure_threshold: Consecutive failures that open the circuit breaker
+        reset_timeout: Seconds the breaker stays open before a trial call
+    """
+    timeout: Optional[float] = 60.0
+    max_attempts: int = 3
+    backoff_initial: float = 1.0
+    backoff_max: float = 10.0
+    total_timeout: Optional[float] = 120.0
+    hedge_after: Optional[float] = None
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+    def __post_init__(self):
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be positive")
+        if self.timeout is not None and self.timeout <= 0:
+            raise ValueError("timeout must be positive or None")
+        if self.hedge_after is not None and self.hedge_after <= 0:
+            raise ValueError("hedge_after must be positive or None")
+
+
+# Shared by every synchronous caller; sized so a burst of stuck upstream calls
+# cannot starve new requests of a worker
+_EXECUTOR = ThreadPoolExecutor(max_workers=64, thread_name_prefix="menu-llm")
+
+
+def _discard(future: "Future[Any]") -> None:
+    """Cancel an unwanted attempt, or close its result once it finishes if it already started."""
+    if not future.cancel():
+        future.add_done_callback(_close_result)
+
+
+def _close_result(future: "Future[Any]") -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    # Streaming steps return an opened stream, alone or with the name read from it
+    for value in result if isinstance(result, tuple) else (result,):
+        close = getattr(value, "close", None)
+        if callable(close):
+            close()
+
+
+class ResilientCaller:
+    """
+    Applies a ResiliencePolicy to LLM calls.
+
+    Args:
+        policy (Optional[ResiliencePolicy], optional): Defaults to ResiliencePolicy()
+        breaker (Optional[CircuitBreaker], optional): Breaker to share with
+            other callers; defaults to one built from the policy
+    """
+
+    def __init__(self, policy: Optional[ResiliencePolicy] = None, breaker: Optional[CircuitBreaker] = None):
+        self.policy = policy or ResiliencePolicy()
+        self.breaker = breaker or CircuitBreaker(self.policy.failure_threshold, self.policy.reset_timeout)
+
+    def _retry_kwargs(self, step: str) -> dict:
+        policy = self.policy
+        stop = stop_after_attempt(policy.max_attempts)
+        if policy.total_timeout is not None:
+            stop = stop | stop_after_delay(policy.total_timeout)
+
+        def before_sleep(state: RetryCallState) -> None:
+            record_retry(step)
+
+        return dict(
+            stop=stop,
+            wait=wait_random_exponential(multiplier=policy.backoff_initial, max=policy.backoff_max),
+            retry=retry_if_exception(is_retryable),
+            before_sleep=before_sleep,
+            reraise=True,
+        )
+
+    def _record(self, exc: Optional[BaseException]) -> None:
+        if exc is None:
+            self.breaker.record_success()
+        elif is_retryable(exc):
+            self.breaker.record_failure()
+        else:
+            # A bad prompt or parse error says nothing about the backend's health
+            self.breaker.release()
+
+    # Synchronous calls
+
+    def call(self, func: Callable[[], T], step: str = "other") -> T:
+        """
+        Run func under the policy.
+
+        Args:
+            func (Callable[[], T]): The LLM call; it may run more than once
+            step (str, optional): Chain step name for metrics and logs
+
+        Returns:
+            T: The first successful result
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            LLMTimeoutError: If the last attempt overran its deadline
+            Exception: The last attempt's error once retries are exhausted
+        """
+        for attempt in Retrying(**self._retry_kwargs(step)):
+            with attempt:
+                return self._attempt(func, step)
+
+    def _attempt(self, func: Callable[[], T], step: str) -> T:
+        self.breaker.before_call()
+        try:
+            result = self._run_with_deadline(func, step)
+        except BaseException as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    def _submit(self, func: Callable[[], T]):
+        # Carry the trace id and other context variables into the worker thread
+        return _EXECUTOR.submit(contextvars.copy_context().run, func)
+
+    def _run_with_deadline(self, func: Callable[[], T], step: str) -> T:
+        timeout, hedge_after = self.policy.timeout, self.policy.hedge_after
+        if timeout is None and hedge_after is None:
+            return func()
+        start = time.monotonic()
+        first = self._submit(func)
+        futures = [first]
+        winner = None
+        try:
+            if hedge_after is not None and (timeout is None or hedge_after < timeout):
+                done, _ = wait(futures, timeout=hedge_after)
+                if not done:
+                    log_event("hedge", step=step, after=hedge_after)
+                    futures.append(self._submit(func))
+            errors = []
+            pending = set(futures)
+            while pending:
+                remaining = None if timeout is None else timeout - (time.monotonic() - start)
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if len(futures) > 1:
+                            HEDGED_CALLS.inc(winner="first" if future is first else "hedge")
+                        winner = future
+                        return future.result()
+                    errors.append(future.exception())
+            if errors and not pending:
+                raise errors[0]
+            LLM_TIMEOUTS.inc(step=step)
+            raise LLMTimeoutError(f"LLM call for step '{step}' exceeded {timeout:g}s")
+        finally:
+            # Threads cannot be interrupted, but queued attempts can be cancelled
+            # and late answers closed rather than left to the garbage collector
+            for future in futures:
+                if future is not winner:
+                    _discard(future)
+
+    # Asynchronous calls
+
+    async def acall(self, func: Callable[[], Awaitable[T]], step: str = "other") -> T:
+        """Async counterpart of call; func must return a new awaitable each time."""
+        async for attempt in AsyncRetrying(**self._retry_kwargs(step)):
+            with attempt:
+                return await self._aattempt(func, step)
+
+    async def _aattempt(self, func: Callable[[], Awaitable[T]], step: str) -> T:
+        self.breaker.before_call()
+        try:
+            result = await self._arun_with_deadline(func, step)
+        except BaseException as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    async def _arun_with_deadline(self, func: Callable[[], Awaitable[T]], step: str) -> T:
+        timeout, hedge_after = self.policy.timeout, self.policy.hedge_after
+        start = time.monotonic()
+        first = asyncio.ensure_future(func())
+        tasks = [first]
+        try:
+            if hedge_after is not None and (timeout is None or hedge_after < timeout):
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    log_event("hedge", step=step, after=hedge_after)
+                    tasks.append(asyncio.ensure_future(func()))
+            errors = []
+            pending = set(tasks)
+            while pending:
+                remaining = None if timeout is None else timeout - (time.monotonic() - start)
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            HEDGED_CALLS.inc(winner="first" if task is first else "hedge")
+                        return task.result()
+                    errors.append(task.exception())
+            if errors and not pending:
+                raise errors[0]
+            LLM_TIMEOUTS.inc(step=step)
+            raise LLMTimeoutError(f"LLM call for step '{step}' exceeded {timeout:g}s")
+        finally:
+            # Unlike threads, losing and overrunning tasks can be cancelled
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
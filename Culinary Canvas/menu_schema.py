@@ -0,0 +1,100 @@
+# menu_schema.py
+"""
+Structured (JSON) form of a generated menu.
+
+The "json" prompt variant asks the model for a MenuSchema document instead of
+markdown. decode_menu_json reads it with orjson and validates it with
+pydantic, returning None for anything that is not a valid menu document so
+callers can fall back to the text parsers in menu_utils. structured_menu
+turns a document into the menu text and ParsedMenu the rest of the pipeline
+uses, without running the text parser over it.
+"""
+from typing import Dict, List, Optional, Tuple
+import logging
+import re
+
+import orjson
+from pydantic import BaseModel, Field, ValidationError
+
+from menu_utils import MenuParser, ParsedMenu, format_menu_text
+
+logger = logging.getLogger(__name__)
+
+# Models often wrap JSON in a markdown code fence despite being told not to
+_CODE_FENCE = re.compile(r'^\s*```[a-zA-Z]*\s*\n?|\n?\s*```\s*$')
+
+
+class MenuItemSchema(BaseModel):
+    name: str = Field(..., min_length=1)
+    description: str = ""
+    dietary: List[str] = Field(default_factory=list)
+
+
+class MenuSectionSchema(BaseModel):
+    name: str
+    items: List[MenuItemSchema] = Field(default_factory=list)
+
+
+class MenuSchema(BaseModel):
+    """A menu as the JSON prompts ask for it; restaurant_name only with the "single" strategy."""
+    restaurant_name: Optional[str] = None
+    sections: List[MenuSectionSchema]
+
+
+def decode_menu_json(text: str) -> Optional[MenuSchema]:
+    """
+    Decode and validate a JSON menu completion.
+
+    Args:
+        text (str): The completion, optionally inside a markdown code fence
+
+    Returns:
+        Optional[MenuSchema]: The menu, or None if the text is not valid JSON
+        or does not match the schema
+    """
+    try:
+        return MenuSchema.model_validate(orjson.loads(_CODE_FENCE.sub('', text)))
+    except (orjson.JSONDecodeError, ValidationError) as e:
+        logger.debug(f"Completion is not a valid JSON menu: {e}")
+        return None
+
+
+def _known_section(name: str) -> Optional[str]:
+    match = MenuParser.SECTION_PATTERN.search(name.title())
+    return match.group(1) if match else None
+
+
+def structured_menu(document: MenuSchema) -> Tuple[str, ParsedMenu]:
+    """
+    Convert a decoded menu to its text form and parsed views.
+
+    Sections are matched to MenuParser.SECTIONS by name; others are dropped,
+    as the text parser would. Dietary tags are checked against each item's
+    name and description the same way the text parser checks them.
+
+    Returns:
+        Tuple[str, ParsedMenu]: The menu in the usual text format, and the
+        same ParsedMenu MenuParser.parse would return for that text
+    """
+    written: Dict[str, List[Dict[str, object]]] = {}
+    parsed = ParsedMenu.empty()
+    for section in document.sections:
+        known = _known_section(section.name)
+        if known is None:
+            logger.debug(f"Dropping unknown menu section '{section.name}'")
+            continue
+        entries = []
+        for item in section.items:
+            name, description = item.name.strip(), item.description.strip()
+            dietary = [tag.strip() for tag in item.dietary if tag.strip()]
+            written.setdefault(known, []).append({'name': name, 'description': description, 'dietary': dietary})
+            parsed.sections[known].append({
+                'name': name,
+                'description': description,
+                'dietary': MenuParser.validate_dietary_restrictions(name, description, dietary)
+            })
+            tags = f" ({', '.join(dietary)})" if dietary else ""
+            entries.append(f"{name}{tags}: {description}".rstrip())
+        if entries:
+            parsed.parsed_menu.append((known, entries))
+    return format_menu_text(written), parsed
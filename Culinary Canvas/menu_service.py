@@ -0,0 +1,262 @@
+# menu_service.py
+"""
+Headless HTTP API for menu generation.
+
+Endpoints:
+    POST /menus          Generate a menu and return it as JSON
+    POST /menus/stream   Stream the menu as NDJSON events while it is generated
+    GET  /stats          Coalescing and cache counters
+    GET  /metrics        Stage latencies, token and cache counters in Prometheus format
+    GET  /healthz        Liveness check
+
+Identical requests that arrive while one is already being generated wait for
+that generation instead of starting their own, so a burst of the same request
+costs one LLM call. Coalescing is per worker process; the SQLite response
+cache is shared by all workers.
+
+Examples:
+    python menu_service.py --port 8000 --workers 4
+    MENU_LLM_BACKEND=fake python menu_service.py   # offline, for load tests
+    curl -X POST localhost:8000/menus -H 'Content-Type: application/json' \\
+         -d '{"cuisine": "Thai", "diets": ["Vegan"], "no_of_items": 3}'
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from contextlib import asynccontextmanager
+import argparse
+import asyncio
+import json
+import logging
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+
+from menu_cache import MenuCache, SQLiteCacheBackend, make_cache_key
+from menu_dedup import MenuDeduplicator
+from llm_backends import backend_from_env
+from menu_generator import MenuResponse, MenuStream, RestaurantMenuGenerator
+from menu_metrics import render_prometheus
+from menu_resilience import CircuitOpenError, LLMTimeoutError, describe_error
+from menu_store import MenuStore
+
+logger = logging.getLogger(__name__)
+
+
+class MenuRequest(BaseModel):
+    """Body of the generation endpoints, mirroring generate_menu's arguments."""
+    cuisine: str = Field(..., min_length=1, examples=["Thai"])
+    diets: Union[List[str], str] = Field(..., examples=[["Vegan", "Gluten-Free"]])
+    no_of_items: int = Field(3, ge=1, le=10)
+
+    @field_validator("diets")
+    @classmethod
+    def diets_not_empty(cls, diets: Union[List[str], str]) -> Union[List[str], str]:
+        if not any(diet.strip() for diet in ([diets] if isinstance(diets, str) else diets)):
+            raise ValueError("Diets must be specified")
+        return diets
+
+
+class MenuItemModel(BaseModel):
+    name: str
+    description: str
+    dietary: List[str]
+
+
+class TokenUsageModel(BaseModel):
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    calls: int
+    estimated: bool
+
+
+class MenuResponseModel(BaseModel):
+    """JSON form of MenuResponse.to_dict."""
+    cuisine: str
+    restaurant_name: str
+    menu: str
+    parsed_menu: List[Tuple[str, List[str]]]
+    sections: Dict[str, List[MenuItemModel]]
+    # Absent when the menu came from the cache
+    usage: Optional[TokenUsageModel] = None
+
+
+class RequestCoalescer:
+    """
+    Shares one in-flight computation between concurrent callers with the same key.
+
+    The first caller for a key starts the work; callers arriving before it
+    finishes await the same task. A caller that disconnects does not cancel
+    the work for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+def build_default_generator() -> RestaurantMenuGenerator:
+    """
+    The generator the service uses when none is injected: SQLite cache and
+    store, and the LLM backend named by MENU_LLM_BACKEND (Gemini by default).
+    """
+    from secret_key import API_KEY as api_key
+
+    backend, backend_options = backend_from_env()
+    deduplicator = MenuDeduplicator()
+    return RestaurantMenuGenerator(
+        key=api_key,
+        backend=backend,
+        backend_options=backend_options,
+        cache=MenuCache(SQLiteCacheBackend("menu_cache.db", max_entries=10000, ttl=24 * 3600)),
+        store=MenuStore("menu_store.db", deduplicator=deduplicator),
+        deduplicator=deduplicator
+    )
+
+
+def _generation_error(e: Exception) -> HTTPException:
+    """
+    Map a generation failure to the HTTP error the client should see.
+
+    Bad requests are rejected by MenuRequest with a 422 before generation
+    starts, so every failure here, including a ValueError over empty or
+    unparseable model output, is the upstream model's fault.
+    """
+    logger.error(f"Error generating menu: {type(e).__name__}: {str(e)}")
+    if isinstance(e, ValueError):
+        return HTTPException(status_code=502,
+                             detail="The menu model returned a menu that could not be used. Please try again.")
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(status_code=503, detail=describe_error(e),
+                             headers={'Retry-After': str(max(int(e.retry_after), 1))})
+    if isinstance(e, LLMTimeoutError):
+        return HTTPException(status_code=504, detail=describe_error(e))
+    return HTTPException(status_code=502, detail=describe_error(e))
+
+
+def _stream_events(menu_stream: MenuStream) -> Iterator[str]:
+    """Render a MenuStream as NDJSON lines: name, sections, items, then the full menu."""
+    yield json.dumps({'event': 'name', 'restaurant_name': menu_stream.restaurant_name}) + "\n"
+    try:
+        for kind, section, item in menu_stream.iter_events():
+            payload = {'event': kind, 'section': section}
+            if item is not None:
+                payload['item'] = item
+            yield json.dumps(payload, ensure_ascii=False) + "\n"
+        payload = {'event': 'done', 'menu': menu_stream.response.to_dict()}
+    except Exception as e:
+        # Headers are already sent, so the failure is reported in the stream itself
+        logger.error(f"Menu stream failed: {str(e)}")
+        payload = {'event': 'error', 'detail': "Menu generation failed"}
+    finally:
+        # A client that disconnects early closes this generator; end the model calls with it
+        menu_stream.close()
+    yield json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+def create_app(generator: Optional[RestaurantMenuGenerator] = None) -> FastAPI:
+    """
+    Build the service.
+
+    Args:
+        generator (Optional[RestaurantMenuGenerator], optional): Generator to
+            serve. Defaults to build_default_generator(), created at startup
+
+    Returns:
+        FastAPI: The application
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.generator = generator if generator is not None else build_default_generator()
+        app.state.coalescer = RequestCoalescer()
+        yield
+
+    app = FastAPI(title="Culinary Canvas", lifespan=lifespan)
+
+    @app.post("/menus", response_model=MenuResponseModel)
+    async def create_menu(body: MenuRequest, request: Request) -> Dict[str, Any]:
+        menu_generator: RestaurantMenuGenerator = request.app.state.generator
+        key = make_cache_key(body.cuisine, body.diets, body.no_of_items)
+        try:
+            menu_response: MenuResponse = await request.app.state.coalescer.run(
+                key,
+                lambda: menu_generator.agenerate_menu(body.cuisine, body.diets, body.no_of_items)
+            )
+        except Exception as e:
+            raise _generation_error(e)
+        return menu_response.to_dict()
+
+    @app.post("/menus/stream")
+    async def stream_menu(body: MenuRequest, request: Request) -> StreamingResponse:
+        menu_generator: RestaurantMenuGenerator = request.app.state.generator
+        try:
+            # stream_menu names the restaurant before returning, so keep it off the event loop
+            menu_stream = await run_in_threadpool(
+                menu_generator.stream_menu, body.cuisine, body.diets, body.no_of_items
+            )
+        except Exception as e:
+            raise _generation_error(e)
+        return StreamingResponse(_stream_events(menu_stream), media_type="application/x-ndjson")
+
+    @app.get("/stats")
+    async def stats(request: Request) -> Dict[str, Any]:
+        coalescer: RequestCoalescer = request.app.state.coalescer
+        menu_generator: RestaurantMenuGenerator = request.app.state.generator
+        result: Dict[str, Any] = {
+            'coalescer': {'in_flight': len(coalescer), 'started': coalescer.started,
+                          'coalesced': coalescer.coalesced}
+        }
+        if menu_generator.cache is not None:
+            cache_stats = menu_generator.cache.stats()
+            result['cache'] = {'hits': cache_stats.hits, 'misses': cache_stats.misses,
+                               'evictions': cache_stats.evictions, 'hit_rate': cache_stats.hit_rate}
+        return result
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        # Per worker process, like the coalescer counters
+        return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/healthz")
+    async def healthz() -> Dict[str, str]:
+        return {'status': 'ok'}
+
+    return app
+
+
+app = create_app()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve menu generation over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; each has its own generator and coalescer")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run("menu_service:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,528 @@
+# menu_store.py
+"""
+Persistent corpus of every generated menu and its parsed items.
+
+Menus live in an embedded SQLite database next to the app. Items are indexed
+by cuisine, section, dietary tag and name, and their names and descriptions
+are indexed with FTS5 for free-text search, so queries such as "Gluten-Free
+desserts across Thai menus" are answered from indexes rather than scans.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import json
+import random
+import sqlite3
+import threading
+import time
+
+from menu_generator import MenuResponse
+from menu_cache import normalize_diets
+from menu_dedup import DuplicateIndex, MenuDeduplicator
+from menu_utils import normalize_restriction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS menus (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    cuisine TEXT NOT NULL,
+    cuisine_key TEXT NOT NULL,
+    restaurant_name TEXT NOT NULL,
+    diets TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    menu_id INTEGER NOT NULL REFERENCES menus (id),
+    cuisine_key TEXT NOT NULL,
+    section TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    description TEXT NOT NULL,
+    dietary TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS item_diets (
+    diet TEXT NOT NULL,
+    cuisine_key TEXT NOT NULL,
+    section TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    PRIMARY KEY (diet, cuisine_key, section, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_menus_cuisine ON menus (cuisine_key);
+CREATE INDEX IF NOT EXISTS idx_items_cuisine_section ON items (cuisine_key, section);
+CREATE INDEX IF NOT EXISTS idx_items_cuisine ON items (cuisine_key);
+CREATE INDEX IF NOT EXISTS idx_items_section ON items (section);
+CREATE INDEX IF NOT EXISTS idx_items_name ON items (name_key);
+CREATE INDEX IF NOT EXISTS idx_items_menu ON items (menu_id);
+CREATE INDEX IF NOT EXISTS idx_item_diets_cuisine ON item_diets (diet, cuisine_key, item_id);
+CREATE INDEX IF NOT EXISTS idx_item_diets_section ON item_diets (diet, section, item_id);
+CREATE INDEX IF NOT EXISTS idx_item_diets_item ON item_diets (item_id, diet);
+CREATE TABLE IF NOT EXISTS item_vectors (
+    item_id INTEGER PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS item_duplicates (
+    item_id INTEGER PRIMARY KEY,
+    duplicate_of INTEGER NOT NULL,
+    score REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_item_duplicates_of ON item_duplicates (duplicate_of);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5 (
+    name, description, content='items', content_rowid='id'
+);
+"""
+
+
+# Tags implied by another tag, so a Vegetarian search also finds Vegan dishes
+IMPLIED_DIETS = {
+    'vegan': ('vegetarian', 'dairy-free'),
+}
+
+
+@dataclass
+class StoredItem:
+    """A menu item as returned by MenuStore queries."""
+    id: int
+    menu_id: int
+    cuisine: str
+    restaurant_name: str
+    section: str
+    name: str
+    description: str
+    dietary: List[str] = field(default_factory=list)
+
+    def to_menu_item(self) -> Dict[str, Any]:
+        """Return the item in the dict shape produced by MenuParser.parse_menu."""
+        return {'name': self.name, 'description': self.description, 'dietary': list(self.dietary)}
+
+
+def _fts_query(text: str) -> str:
+    """Quote each word so user input is matched literally rather than as FTS syntax."""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+
+class MenuStore:
+    """
+    SQLite store of generated menus with indexed item search.
+
+    Safe to share between threads; writes for one menu happen in a single
+    transaction, so a menu and its items are always stored together.
+
+    With a MenuDeduplicator (see menu_dedup.py), every new item is checked
+    against the canonical items already stored, and near-duplicates are
+    recorded in item_duplicates so searches can skip them.
+    """
+
+    def __init__(self, path: str = "menu_store.db", deduplicator: Optional[MenuDeduplicator] = None):
+        self.path = path
+        self.deduplicator = deduplicator
+        self._duplicate_index: Optional[DuplicateIndex] = None
+        # Canonical items of the open transaction, added to _duplicate_index once it commits
+        self._pending_index: Optional[DuplicateIndex] = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            index = self._duplicate_index
+            self._pending_index = None
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._pending_index = None
+                if self._duplicate_index is not index:
+                    # Reloaded or reset mid-transaction; rebuild it from the committed tables
+                    self._duplicate_index = None
+                raise
+            self._conn.execute("COMMIT")
+            if self._pending_index is not None:
+                self._duplicate_index.extend(self._pending_index)
+                self._pending_index = None
+
+    def save(self,
+             response: MenuResponse,
+             diets: Union[str, List[str], None] = None) -> int:
+        """
+        Store a generated menu and its parsed items.
+
+        Args:
+            response (MenuResponse): Menu to store
+            diets (Union[str, List[str], None], optional): Diets the menu was requested for
+
+        Returns:
+            int: Id of the stored menu. Saving the same menu twice returns the original id
+        """
+        with self._transaction():
+            menu_id, _ = self._insert(response, diets)
+        return menu_id
+
+    def save_many(self, responses: Iterable[MenuResponse]) -> int:
+        """Store many menus in one transaction; return how many were new."""
+        with self._transaction():
+            return sum(self._insert(response, None)[1] for response in responses)
+
+    def import_jsonl(self, path: str) -> int:
+        """Store every successful record of a menu_batch.py output file; return how many were new."""
+        added = 0
+        with open(path, encoding="utf-8") as batch_file, self._transaction():
+            for line in batch_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('status') == 'ok':
+                    _, created = self._insert(MenuResponse.from_dict(record['response']),
+                                              record['job'].get('diets'))
+                    added += created
+        return added
+
+    def _insert(self,
+                response: MenuResponse,
+                diets: Union[str, List[str], None]) -> Tuple[int, bool]:
+        """Insert a menu inside the current transaction; return (menu_id, created)."""
+        content_hash = response.content_hash()
+        existing = self._conn.execute(
+            "SELECT id FROM menus WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        if existing is not None:
+            return existing[0], False
+
+        cuisine_key = response.cuisine.strip().casefold()
+        item_rows = []
+        menu_id = self._conn.execute(
+            "INSERT INTO menus (content_hash, cuisine, cuisine_key, restaurant_name, diets, "
+            "response, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (content_hash, response.cuisine, cuisine_key, response.restaurant_name,
+             ",".join(normalize_diets(diets or [])),
+             json.dumps(response.to_dict(), ensure_ascii=False), time.time())
+        ).lastrowid
+
+        for section, items in response.sections.items():
+            for item in items:
+                dietary = list(item.get('dietary') or [])
+                item_id = self._conn.execute(
+                    "INSERT INTO items (menu_id, cuisine_key, section, name, name_key, "
+                    "description, dietary) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (menu_id, cuisine_key, section, item['name'], item['name'].casefold(),
+                     item.get('description', ''), json.dumps(dietary, ensure_ascii=False))
+                ).lastrowid
+                self._conn.execute(
+                    "INSERT INTO items_fts (rowid, name, description) VALUES (?, ?, ?)",
+                    (item_id, item['name'], item.get('description', ''))
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO item_diets (diet, cuisine_key, section, item_id) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(diet, cuisine_key, section, item_id)
+                     for diet in self._index_diets(dietary)]
+                )
+                item_rows.append((item_id, item['name'], item.get('description', '')))
+
+        if self.deduplicator is not None and item_rows:
+            self._record_duplicates(item_rows)
+        return menu_id, True
+
+    def _load_duplicate_index(self) -> DuplicateIndex:
+        """Build the in-memory index of canonical item vectors on first use."""
+        if self._duplicate_index is None:
+            fingerprinter = self.deduplicator.fingerprinter
+            index = self.deduplicator.new_index()
+            rows = self._conn.execute(
+                "SELECT v.item_id, i.name, v.vector FROM item_vectors v "
+                "JOIN items i ON i.id = v.item_id ORDER BY v.item_id"
+            )
+            while True:
+                batch = rows.fetchmany(65536)
+                if not batch:
+                    break
+                index.add([row[0] for row in batch],
+                          self.deduplicator.from_bytes(b"".join(row[2] for row in batch)),
+                          [fingerprinter.blocking_keys(row[1]) for row in batch])
+            self._duplicate_index = index
+        return self._duplicate_index
+
+    def _record_duplicates(self, item_rows: List[Tuple[int, str, str]]) -> int:
+        """
+        Match items against the canonical corpus inside the current transaction.
+
+        New canonical items are held in _pending_index, which _transaction
+        adds to the in-memory index after COMMIT and drops on ROLLBACK.
+        """
+        ids = [row[0] for row in item_rows]
+        vectors = self.deduplicator.fingerprinter.embed_many((row[1], row[2]) for row in item_rows)
+        index = self._load_duplicate_index()
+        if self._pending_index is None:
+            self._pending_index = self.deduplicator.new_index()
+        matches = self.deduplicator.match_batch(ids, [(row[1], row[2]) for row in item_rows],
+                                                index, vectors, pending=self._pending_index)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO item_duplicates (item_id, duplicate_of, score) VALUES (?, ?, ?)",
+            [(match.item, match.duplicate_of, match.score) for match in matches if match is not None]
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO item_vectors (item_id, vector) VALUES (?, ?)",
+            [(item_id, self.deduplicator.to_bytes(vector))
+             for item_id, vector, match in zip(ids, vectors, matches) if match is None]
+        )
+        return sum(match is not None for match in matches)
+
+    def rebuild_duplicates(self, batch_size: int = 4096) -> int:
+        """
+        Recompute near-duplicates across every stored item, oldest first.
+
+        Use this after enabling deduplication on an existing store or changing
+        the threshold or the fingerprint weights. Items are fingerprinted and matched in batches.
+
+        Returns:
+            int: Number of items flagged as duplicates
+        """
+        if self.deduplicator is None:
+            raise ValueError("rebuild_duplicates requires a deduplicator")
+        flagged = 0
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM item_duplicates")
+            conn.execute("DELETE FROM item_vectors")
+            self._duplicate_index = None
+            self._load_duplicate_index()
+            rows = conn.execute("SELECT id, name, description FROM items ORDER BY id").fetchall()
+            for start in range(0, len(rows), batch_size):
+                flagged += self._record_duplicates(rows[start:start + batch_size])
+        return flagged
+
+    def duplicates(self, limit: Optional[int] = 50) -> List[Tuple[StoredItem, StoredItem, float]]:
+        """Return (duplicate, canonical item, similarity) triples, most similar first."""
+        sql = ("SELECT item_id, duplicate_of, score FROM item_duplicates ORDER BY score DESC"
+               + (" LIMIT ?" if limit is not None else ""))
+        with self._lock:
+            pairs = self._conn.execute(sql, [int(limit)] if limit is not None else []).fetchall()
+        items = {item.id: item for item in self._items_by_id({id for pair in pairs for id in pair[:2]})}
+        return [(items[item_id], items[duplicate_of], score)
+                for item_id, duplicate_of, score in pairs
+                if item_id in items and duplicate_of in items]
+
+    def _items_by_id(self, ids: Iterable[int]) -> List[StoredItem]:
+        ids = list(ids)
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT i.id, i.menu_id, m.cuisine, m.restaurant_name, i.section, i.name, "
+                "i.description, i.dietary FROM items i JOIN menus m ON m.id = i.menu_id "
+                f"WHERE i.id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    @staticmethod
+    def _index_diets(dietary: List[str]) -> Set[str]:
+        diets = {normalize_restriction(label) for label in dietary}
+        for diet in list(diets):
+            diets.update(IMPLIED_DIETS.get(diet, ()))
+        return diets
+
+    def search_items(self,
+                     cuisine: Optional[str] = None,
+                     diets: Union[str, List[str], None] = None,
+                     section: Optional[str] = None,
+                     text: Optional[str] = None,
+                     name: Optional[str] = None,
+                     limit: Optional[int] = 50,
+                     unique: bool = False) -> List[StoredItem]:
+        """
+        Find stored items matching every given filter, newest first.
+
+        Args:
+            cuisine (Optional[str], optional): Cuisine, case-insensitive
+            diets (Union[str, List[str], None], optional): Dietary tags every item must carry
+            section (Optional[str], optional): Section such as "Desserts"
+            text (Optional[str], optional): Words to find in the name or description
+            name (Optional[str], optional): Exact item name, case-insensitive
+            limit (Optional[int], optional): Maximum results, None for all. Defaults to 50
+            unique (bool, optional): Skip items flagged as near-duplicates. Defaults to False
+
+        Returns:
+            List[StoredItem]: Matching items
+        """
+        sql, params, order_column = self._search_sql(cuisine, diets, section, text, name, unique)
+        sql += f" ORDER BY {order_column} DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def sample_items(self,
+                     section: str,
+                     k: int,
+                     cuisine: Optional[str] = None,
+                     diets: Union[str, List[str], None] = None,
+                     rng: Optional[random.Random] = None) -> List[StoredItem]:
+        """
+        Pick up to k random items with distinct names from one section,
+        skipping items flagged as near-duplicates.
+
+        Rather than shuffling every match, a window of matches is read from a
+        random point in the id index, so sampling stays as cheap as a search
+        however many items match.
+
+        Args:
+            section (str): Section to sample from, such as "Desserts"
+            k (int): Number of items wanted
+            cuisine (Optional[str], optional): Cuisine, case-insensitive
+            diets (Union[str, List[str], None], optional): Dietary tags every item must carry
+            rng (Optional[random.Random], optional): Random source, for reproducible samples
+
+        Returns:
+            List[StoredItem]: At most k items; fewer when there are not enough matches
+        """
+        rng = rng or random.Random()
+        window = max(k * 10, 50)
+        sql, params, id_column = self._search_sql(cuisine, diets, section, None, None, unique=True)
+        sql += (" AND " if " WHERE " in sql else " WHERE ") + f"{id_column} <= ?"
+        sql += f" ORDER BY {id_column} DESC LIMIT ?"
+
+        with self._lock:
+            max_id = self._conn.execute("SELECT MAX(id) FROM items").fetchone()[0] or 0
+            pivot = rng.randint(1, max_id) if max_id else 0
+            rows = self._conn.execute(sql, params + [pivot, window]).fetchall()
+            if len(rows) < window:
+                # Wrap around to the newest items to fill the window
+                rows += self._conn.execute(sql, params + [max_id, window - len(rows)]).fetchall()
+
+        candidates = {}
+        for row in rows:
+            candidates.setdefault(row[5].casefold(), row)
+        picked = rng.sample(list(candidates.values()), min(k, len(candidates)))
+        return [self._row_to_item(row) for row in picked]
+
+    def _search_sql(self,
+                    cuisine: Optional[str],
+                    diets: Union[str, List[str], None],
+                    section: Optional[str],
+                    text: Optional[str],
+                    name: Optional[str],
+                    unique: bool = False) -> Tuple[str, List[Any], str]:
+        """
+        Build the filtered item query, returning (sql, params, id column).
+
+        The query is driven from whichever index narrows it most: the FTS
+        index for keywords, then the dietary tag index, then the item table.
+        Every driver yields rows in id order, so ORDER BY id with a LIMIT
+        stops after the first matches instead of sorting all of them.
+        """
+        diet_keys = sorted({normalize_restriction(diet) for diet in normalize_diets(diets or [])})
+        fts_query = _fts_query(text) if text else ""
+        where, params = [], []
+
+        if fts_query:
+            source, id_column = "items_fts f CROSS JOIN items i ON i.id = f.rowid", "f.rowid"
+            where.append("items_fts MATCH ?")
+            params.append(fts_query)
+            extra_diets = diet_keys
+        elif diet_keys:
+            source, id_column = "item_diets d CROSS JOIN items i ON i.id = d.item_id", "d.item_id"
+            where.append("d.diet = ?")
+            params.append(diet_keys[0])
+            extra_diets = diet_keys[1:]
+        else:
+            source, id_column = "items i", "i.id"
+            extra_diets = []
+
+        # Filter on the driving table's copy of cuisine and section so its index applies
+        prefix = "d" if id_column == "d.item_id" else "i"
+        if cuisine:
+            where.append(f"{prefix}.cuisine_key = ?")
+            params.append(cuisine.strip().casefold())
+        if section:
+            where.append(f"{prefix}.section = ?")
+            params.append(section)
+        if name:
+            where.append("i.name_key = ?")
+            params.append(name.strip().casefold())
+        for diet in extra_diets:
+            where.append("EXISTS (SELECT 1 FROM item_diets x WHERE x.item_id = i.id AND x.diet = ?)")
+            params.append(diet)
+        if unique:
+            where.append("NOT EXISTS (SELECT 1 FROM item_duplicates u WHERE u.item_id = i.id)")
+
+        sql = (
+            "SELECT i.id, i.menu_id, m.cuisine, m.restaurant_name, i.section, i.name, "
+            f"i.description, i.dietary FROM {source} JOIN menus m ON m.id = i.menu_id"
+            + (" WHERE " + " AND ".join(where) if where else "")
+        )
+        return sql, params, id_column
+
+    @staticmethod
+    def _row_to_item(row: Tuple) -> StoredItem:
+        return StoredItem(id=row[0], menu_id=row[1], cuisine=row[2], restaurant_name=row[3],
+                          section=row[4], name=row[5], description=row[6], dietary=json.loads(row[7]))
+
+    def get_menu(self, menu_id: int) -> Optional[MenuResponse]:
+        """Return a stored menu by id, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM menus WHERE id = ?", (menu_id,)).fetchone()
+        return MenuResponse.from_dict(json.loads(row[0])) if row else None
+
+    def iter_menus(self, batch_size: int = 500) -> Iterator[MenuResponse]:
+        """Yield every stored menu in id order, reading batch_size rows at a time."""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, response FROM menus WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                ).fetchall()
+            for _, response in rows:
+                yield MenuResponse.from_dict(json.loads(response))
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def cuisines(self) -> List[str]:
+        """Return the cuisines that have stored menus."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT MIN(cuisine) FROM menus GROUP BY cuisine_key ORDER BY cuisine_key"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of stored menus and items."""
+        with self._lock:
+            menus = self._conn.execute("SELECT COUNT(*) FROM menus").fetchone()[0]
+            items = self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        return {'menus': menus, 'items': items}
+
+    def delete_menu(self, menu_id: int) -> None:
+        """Remove a menu and all of its items."""
+        with self._transaction() as conn:
+            items = conn.execute(
+                "SELECT id, name, description FROM items WHERE menu_id = ?", (menu_id,)
+            ).fetchall()
+            conn.executemany(
+                "INSERT INTO items_fts (items_fts, rowid, name, description) "
+                "VALUES ('delete', ?, ?, ?)", items
+            )
+            item_ids = [(row[0],) for row in items]
+            conn.executemany("DELETE FROM item_diets WHERE item_id = ?", item_ids)
+            conn.executemany("DELETE FROM item_vectors WHERE item_id = ?", item_ids)
+            # Duplicates of a deleted item are unflagged; rebuild_duplicates re-indexes them
+            conn.executemany("DELETE FROM item_duplicates WHERE item_id = ? OR duplicate_of = ?",
+                             [(item_id, item_id) for item_id, in item_ids])
+            self._duplicate_index = None
+            conn.execute("DELETE FROM items WHERE menu_id = ?", (menu_id,))
+            conn.execute("DELETE FROM menus WHERE id = ?", (menu_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        return self.counts()['items']
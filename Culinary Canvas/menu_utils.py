@@ -1,10 +1,173 @@
 # menu_utils.py
-from typing import List, Tuple, Dict
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from bisect import bisect_right
 import re
 
+# Ingredients that contradict a dietary claim, grouped by category
+INGREDIENT_LEXICON: Dict[str, List[str]] = {
+    'dairy': ['cheese', 'milk', 'cream', 'butter', 'buttermilk', 'yogurt', 'yoghurt', 'ghee',
+              'paneer', 'ricotta', 'mozzarella', 'parmesan', 'feta', 'cotija', 'crema', 'queso',
+              'custard', 'whey', 'mascarpone', 'burrata', 'kulfi'],
+    'egg': ['egg', 'mayonnaise', 'aioli', 'meringue'],
+    'honey': ['honey'],
+    'meat': ['chicken', 'beef', 'pork', 'lamb', 'mutton', 'bacon', 'ham', 'sausage', 'chorizo',
+             'prosciutto', 'pancetta', 'lardon', 'duck', 'turkey', 'veal', 'gelatin', 'steak'],
+    'seafood': ['fish', 'fish sauce', 'tuna', 'salmon', 'shrimp', 'prawn', 'crab', 'lobster',
+                'anchovy', 'anchovies', 'squid', 'octopus', 'clam', 'mussel', 'oyster', 'scallop'],
+    'gluten': ['pita', 'bread', 'breadcrumb', 'filo', 'phyllo', 'pasta', 'wheat', 'couscous',
+               'barley', 'rye', 'seitan', 'naan', 'udon', 'semolina', 'bulgur', 'crouton', 'croûton',
+               'pastry', 'flour tortilla'],
+    'nuts': ['almond', 'walnut', 'pecan', 'pine nut', 'pistachio', 'cashew', 'hazelnut', 'peanut',
+             'macadamia', 'nut'],
+}
+
+# Categories of ingredient that rule out each restriction (keys are normalized labels)
+RESTRICTION_CONFLICTS: Dict[str, Set[str]] = {
+    'vegan': {'dairy', 'egg', 'honey', 'meat', 'seafood'},
+    'vegetarian': {'meat', 'seafood'},
+    'dairy-free': {'dairy'},
+    'gluten-free': {'gluten'},
+    'nut-free': {'nuts'},
+}
+
+# Words that turn the following ingredient into a compliant substitute ("vegan cheese",
+# "almond milk", "cauliflower steak")
+SAFE_QUALIFIERS = ['vegan', 'plant-based', 'dairy-free', 'non-dairy', 'egg-free', 'gluten-free',
+                   'nut-free', 'coconut', 'oat', 'soy', 'rice', 'tofu', 'almond', 'cashew',
+                   'peanut', 'cocoa', 'flax', 'cauliflower', 'mushroom', 'jackfruit']
+
+# Words that, following an ingredient, mean it is not actually present ("nut-free",
+# "oyster mushrooms")
+SAFE_FOLLOWERS = ['free', 'mushroom']
+
+
+def normalize_restriction(label: str) -> str:
+    """Normalize a dietary label so 'Gluten Free' and 'gluten-free' compare equal."""
+    return re.sub(r'[\s_]+', '-', label.strip().casefold())
+
+
+class DietaryValidator:
+    """
+    Data-driven dietary restriction checks.
+
+    The whole lexicon is compiled into one regular expression, so each item
+    is scanned once however many restrictions are being checked. Terms match
+    on word boundaries (so 'creamy' is not 'cream'), allow plurals, and are
+    ignored when a safe qualifier precedes them or a safe follower such as
+    '-free' comes after them.
+    """
+
+    def __init__(self,
+                 lexicon: Optional[Dict[str, List[str]]] = None,
+                 conflicts: Optional[Dict[str, Set[str]]] = None,
+                 qualifiers: Optional[List[str]] = None,
+                 followers: Optional[List[str]] = None):
+        lexicon = INGREDIENT_LEXICON if lexicon is None else lexicon
+        self.conflicts = RESTRICTION_CONFLICTS if conflicts is None else conflicts
+        qualifiers = SAFE_QUALIFIERS if qualifiers is None else qualifiers
+        followers = SAFE_FOLLOWERS if followers is None else followers
+        self._term_categories = {
+            term.casefold(): category for category, terms in lexicon.items() for term in terms
+        }
+        terms = sorted(self._term_categories, key=len, reverse=True)
+        self._pattern = re.compile(
+            rf"\b(?:{self._alternation(terms)})(?:es|s)?\b"
+            rf"(?![-\s]+(?:{self._alternation(followers)})(?:es|s)?\b)",
+            re.IGNORECASE
+        )
+        # Checked against the few characters before a match; qualifiers may be
+        # lexicon terms themselves ("almond milk"), so they cannot be consumed
+        self._qualified = re.compile(rf"\b(?:{self._alternation(qualifiers)})[-\s]+$", re.IGNORECASE)
+        self._qualifier_window = max(map(len, qualifiers), default=0) + 8
+
+    @staticmethod
+    def _alternation(words: Iterable[str]) -> str:
+        # Longest first, so 'pine nut' wins over 'nut'
+        return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True)) or "(?!)"
+
+    def _categories(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (offset, category) for each unqualified ingredient in the text."""
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            if self._qualified.search(text, max(0, start - self._qualifier_window), start):
+                continue
+            term = match.group().casefold()
+            category = self._term_categories.get(term)
+            if category is None:
+                # Plural form matched; strip the suffix back to the lexicon term
+                category = self._term_categories.get(term[:-1]) or self._term_categories[term[:-2]]
+            yield start, category
+
+    def scan(self, text: str) -> Set[str]:
+        """Return the ingredient categories mentioned in the text."""
+        return {category for _, category in self._categories(text)}
+
+    def apply(self, restrictions: List[str], found: Set[str]) -> List[str]:
+        """Drop restrictions contradicted by the found categories, adding the implied fallback."""
+        validated = []
+        dropped = set()
+        for restriction in restrictions:
+            key = normalize_restriction(restriction)
+            if self.conflicts.get(key, set()) & found:
+                dropped.add(key)
+            else:
+                validated.append(restriction)
+        if not dropped:
+            return validated
+
+        present = {normalize_restriction(restriction) for restriction in validated}
+        if dropped & {'vegan', 'vegetarian'}:
+            if found & self.conflicts.get('vegetarian', set()):
+                fallback = ('non-vegetarian', 'Non-Vegetarian')
+            else:
+                fallback = ('vegetarian', 'Vegetarian')
+            if fallback[0] not in present:
+                validated.append(fallback[1])
+        return validated
+
+    def validate(self, name: str, description: str, restrictions: List[str]) -> List[str]:
+        """Validate the restrictions claimed for a single item."""
+        if not restrictions:
+            return []
+        return self.apply(restrictions, self.scan(f"{name}\n{description}"))
+
+    def validate_many(self, items: Iterable[Tuple[str, str, List[str]]]) -> List[List[str]]:
+        """
+        Validate many (name, description, restrictions) items at once.
+
+        All item texts are joined and scanned in a single regex pass, and each
+        match is mapped back to its item by offset, which keeps offline audits
+        of thousands of items fast.
+
+        Returns:
+            List[List[str]]: Validated restrictions, in the same order as items
+        """
+        items = list(items)
+        texts = [f"{name}\n{description}" for name, description, _ in items]
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1  # joined with a NUL separator
+
+        found: List[Set[str]] = [set() for _ in items]
+        for start, category in self._categories("\0".join(texts)):
+            found[bisect_right(starts, start) - 1].add(category)
+
+        return [self.apply(list(restrictions), categories)
+                for (_, _, restrictions), categories in zip(items, found)]
+
+
+DEFAULT_VALIDATOR = DietaryValidator()
+
+
 class MenuParser:
     """Handles parsing and cleaning of menu text."""
-    
+
+    SECTIONS = ('Appetizers', 'Main Courses', 'Desserts')
+    SECTION_PATTERN = re.compile(r'\*{0,2}(Appetizers|Main Courses|Desserts)\*{0,2}')
+    CLEAN_PATTERN = re.compile(r'\*{2}|🍽️|\* ')
+
     @staticmethod
     def clean_item(item: str) -> Tuple[str, str, List[str]]:
         """
@@ -14,7 +177,7 @@ class MenuParser:
             Tuple[str, str, List[str]]: (name, description, dietary_info)
         """
         # Remove extra asterisks and emojis
-        item = re.sub(r'\*{2}|🍽️|\* ', '', item).strip()
+        item = MenuParser.CLEAN_PATTERN.sub('', item).strip()
         
         # Split into name/description
         parts = item.split(':', 1)
@@ -37,28 +200,49 @@ class MenuParser:
 
     @staticmethod
     def validate_dietary_restrictions(name: str, description: str, restrictions: List[str]) -> List[str]:
-        """Validate and correct dietary restrictions based on item description."""
-        validated = restrictions.copy()
-        
-        # Common validation rules
-        if 'Vegan' in validated:
-            if any(ingredient in description.lower() for ingredient in 
-                  ['cheese', 'honey', 'milk', 'cream', 'yogurt']):
-                validated.remove('Vegan')
-                if 'Vegetarian' not in validated:
-                    validated.append('Vegetarian')
-                    
-        if 'Gluten-Free' in validated:
-            if any(ingredient in description.lower() for ingredient in 
-                  ['pita', 'bread', 'filo', 'phyllo', 'pasta']):
-                validated.remove('Gluten-Free')
-                
-        if 'Nut-Free' in validated:
-            if any(ingredient in description.lower() for ingredient in 
-                  ['almond', 'walnut', 'pecan', 'pine nut', 'pistachio']):
-                validated.remove('Nut-Free')
-                
-        return validated
+        """Validate and correct dietary restrictions based on item name and description."""
+        return DEFAULT_VALIDATOR.validate(name, description, restrictions)
+
+    @staticmethod
+    def iter_parse(chunks: Iterable[str]) -> Iterator["MenuEvent"]:
+        """
+        Parse menu text incrementally as chunks arrive.
+
+        Yields:
+            MenuEvent: ('section', section, None) when a section header is read
+            and ('item', section, item) for each completed menu item
+        """
+        parser = MenuStreamParser()
+        for chunk in chunks:
+            yield from parser.feed(chunk)
+        yield from parser.close()
+
+    @staticmethod
+    def parse(menu_text: str) -> "ParsedMenu":
+        """
+        Parse the menu text in a single pass into both structured views.
+
+        Returns:
+            ParsedMenu: The section/item dicts returned by parse_menu and the
+            (heading, item texts) list used by RestaurantMenuGenerator
+        """
+        parser = MenuStreamParser(include_entries=True)
+        parsed = ParsedMenu.empty()
+        for event in parser.feed(menu_text) + parser.close():
+            parsed.add(event)
+        return parsed
+
+    @staticmethod
+    def parse_blocks(menu_text: str) -> List[Tuple[str, List[str]]]:
+        """
+        Read only the (heading, item texts) view of parse, skipping the
+        item parsing and dietary validation it does for sections.
+        """
+        parser = MenuStreamParser(include_entries=True, include_items=False)
+        parsed = ParsedMenu.empty()
+        for event in parser.feed(menu_text) + parser.close():
+            parsed.add(event)
+        return parsed.parsed_menu
 
     @staticmethod
     def parse_menu(menu_text: str) -> Dict[str, List[Dict[str, str]]]:
@@ -68,45 +252,160 @@ class MenuParser:
         Returns:
             Dict[str, List[Dict[str, str]]]: Structured menu data
         """
-        menu_lines = menu_text.strip().split('\n')
-        current_section = None
-        sections = {
-            'Appetizers': [],
-            'Main Courses': [],
-            'Desserts': []
-        }
+        return MenuParser.parse(menu_text).sections
 
-        section_pattern = re.compile(r'\*{0,2}(Appetizers|Main Courses|Desserts)\*{0,2}')
-        
-        for line in menu_lines:
-            line = line.strip()
-            if not line:
-                continue
 
-            # Check for section headers
-            section_match = section_pattern.match(line)
-            if section_match:
-                current_section = section_match.group(1)
-                continue
+class ParsedMenu(NamedTuple):
+    """Both structured views of a menu, filled from one stream of MenuEvents."""
+    sections: Dict[str, List[Dict[str, Any]]]
+    parsed_menu: List[Tuple[str, List[str]]]
 
-            # Skip if we're not in a valid section
-            if not current_section or current_section not in sections:
-                continue
+    @classmethod
+    def empty(cls) -> "ParsedMenu":
+        return cls({section: [] for section in MenuParser.SECTIONS}, [])
+
+    def add(self, event: "MenuEvent") -> None:
+        """Apply one parser event to the collected views."""
+        if event.kind == 'item':
+            self.sections[event.section].append(event.item)
+        elif event.kind == 'heading':
+            self.parsed_menu.append((event.section, []))
+        elif event.kind == 'entry':
+            self.parsed_menu[-1][1].append(event.item)
+
+
+class MenuEvent(NamedTuple):
+    """
+    An event emitted by MenuStreamParser.
+
+    'section' and 'item' events describe the known menu sections and their
+    parsed item dicts. 'heading' and 'entry' events describe the blank-line
+    separated blocks of the raw text and their item texts.
+    """
+    kind: str
+    section: str
+    item: Any = None
+
+
+class MenuStreamParser:
+    """
+    Push parser that turns arbitrary text chunks into menu events.
+
+    Chunks may split lines anywhere. Only the current partial line and the
+    lines of the current item are kept, capped at max_line_length characters
+    per line, so memory use does not grow with the size of the input. Feeding
+    a whole menu and closing the parser produces the same items as
+    MenuParser.parse_menu. With include_entries the block events are
+    produced too, and include_items=False turns off the section events.
+    """
+
+    def __init__(self, include_entries: bool = False, max_line_length: int = 65536, include_items: bool = True):
+        self.include_entries = include_entries
+        self.include_items = include_items
+        self.max_line_length = max_line_length
+        self.current_section: Optional[str] = None
+        self._pending: List[str] = []
+        self._pending_length = 0
+        # Block state: heading of the current blank-line separated block,
+        # whether it has been announced, and the lines of its current item
+        self._heading: Optional[str] = None
+        self._heading_emitted = False
+        self._entry: List[str] = []
+
+    def feed(self, chunk: str) -> List[MenuEvent]:
+        """Consume a chunk of text and return the events it completed."""
+        events = []
+        *complete, partial = chunk.split('\n')
+        for piece in complete:
+            self._append(piece)
+            line = "".join(self._pending)
+            self._pending = []
+            self._pending_length = 0
+            self._parse_line(line, events)
+        self._append(partial)
+        return events
+
+    def close(self) -> List[MenuEvent]:
+        """Flush the final unterminated line and item and return their events."""
+        events = []
+        line = "".join(self._pending)
+        self._pending = []
+        self._pending_length = 0
+        self._parse_line(line, events)
+        if self.include_entries:
+            self._end_block(events)
+        return events
+
+    def _append(self, piece: str) -> None:
+        room = self.max_line_length - self._pending_length
+        if piece and room > 0:
+            piece = piece[:room]
+            self._pending.append(piece)
+            self._pending_length += len(piece)
+
+    def _parse_line(self, raw_line: str, events: List[MenuEvent]) -> None:
+        line = raw_line.strip()
+        if self.include_entries:
+            self._parse_block_line(raw_line, line, events)
+        if not line or not self.include_items:
+            return
+
+        # Check for section headers
+        section_match = MenuParser.SECTION_PATTERN.match(line)
+        if section_match:
+            self.current_section = section_match.group(1)
+            events.append(MenuEvent('section', self.current_section))
+            return
+
+        # Skip if we're not in a valid section
+        if not self.current_section:
+            return
+
+        # Process menu items
+        if ':' in line:  # Only process lines that look like menu items
+            name, description, dietary = MenuParser.clean_item(line)
+            if name:
+                validated_dietary = MenuParser.validate_dietary_restrictions(
+                    name, description, dietary
+                )
+                events.append(MenuEvent('item', self.current_section, {
+                    'name': name,
+                    'description': description,
+                    'dietary': validated_dietary
+                }))
+
+    def _parse_block_line(self, raw_line: str, line: str, events: List[MenuEvent]) -> None:
+        # Blocks are separated by truly empty lines; the first non-blank line
+        # of a block is its heading and '*' lines start new items
+        if raw_line == "":
+            self._end_block(events)
+        elif self._heading is None:
+            if line:
+                heading = raw_line.lstrip().strip("* ")
+                if heading.startswith("**") and heading.endswith("**"):
+                    heading = heading[2:-2].strip()
+                self._heading = heading
+        elif line.startswith("*"):
+            self._end_entry(events)
+            self._entry.append(line.lstrip("* "))
+        elif line:
+            self._entry.append(line)
+
+    def _end_entry(self, events: List[MenuEvent]) -> None:
+        if not self._entry:
+            return
+        if self._heading:
+            if not self._heading_emitted:
+                events.append(MenuEvent('heading', self._heading))
+                self._heading_emitted = True
+            events.append(MenuEvent('entry', self._heading, "\n".join(self._entry)))
+        self._entry = []
+
+    def _end_block(self, events: List[MenuEvent]) -> None:
+        self._end_entry(events)
+        self._heading = None
+        self._heading_emitted = False
 
-            # Process menu items
-            if ':' in line:  # Only process lines that look like menu items
-                name, description, dietary = MenuParser.clean_item(line)
-                if name:
-                    validated_dietary = MenuParser.validate_dietary_restrictions(
-                        name, description, dietary
-                    )
-                    sections[current_section].append({
-                        'name': name,
-                        'description': description,
-                        'dietary': validated_dietary
-                    })
-
-        return sections
 
 def format_menu_for_display(menu_data: Dict[str, List[Dict[str, str]]]) -> str:
     """Format menu data into a properly structured markdown string."""
@@ -126,6 +425,40 @@ def format_menu_for_display(menu_data: Dict[str, List[Dict[str, str]]]) -> str:
     
     return "\n".join(markdown_lines)
 
+def format_menu_text(menu_data: Dict[str, List[Dict[str, Any]]]) -> str:
+    """
+    Write menu data back out in the text format the model produces, so
+    MenuParser.parse reads it back into the same sections and items.
+    """
+    blocks = []
+    for section, items in menu_data.items():
+        if not items:
+            continue
+        lines = [f"**{section}**"]
+        for item in items:
+            dietary_info = f" ({', '.join(item['dietary'])})" if item['dietary'] else ""
+            lines.append(f"* {item['name']}{dietary_info}: {item['description']}".rstrip())
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+def format_item_markdown(item: Dict[str, Any]) -> str:
+    """Format a single item the way the dashboard shows it on screen."""
+    dietary_info = f" ({', '.join(item['dietary'])})" if item['dietary'] else ""
+    lines = [f"#### 🍽️ {item['name']}{dietary_info}"]
+    if item['description']:
+        lines.append(f"*{item['description']}*")
+    lines.append("---")
+    return "\n\n".join(lines)
+
+
+def format_menu_markdown(menu_data: Dict[str, List[Dict[str, Any]]]) -> str:
+    """Format the on-screen menu body as one markdown block."""
+    blocks = []
+    for section, items in menu_data.items():
+        blocks.append(f"### {section}")
+        blocks.extend(format_item_markdown(item) for item in items)
+    return "\n\n".join(blocks)
+
 # Example usage:
 if __name__ == "__main__":
     sample_menu = """
@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# The modules live flat in the app directory, next to this one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
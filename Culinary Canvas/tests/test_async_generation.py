@@ -0,0 +1,80 @@
+# test_async_generation.py
+"""agenerate_menu keeps the event loop free while the cache and store do blocking work."""
+import asyncio
+import time
+
+from llm_backends import FakeMenuLLM
+from menu_cache import LRUCacheBackend, MenuCache
+from menu_dedup import MenuDeduplicator
+from menu_generator import RestaurantMenuGenerator
+from menu_store import MenuStore
+
+BLOCKING_SECONDS = 0.3
+TICK_SECONDS = 0.01
+
+
+class SlowStore(MenuStore):
+    """A store whose saves hold the calling thread, like a busy SQLite writer."""
+
+    def save(self, response, diets=None):
+        time.sleep(BLOCKING_SECONDS)
+        return super().save(response, diets)
+
+
+class SlowBackend(LRUCacheBackend):
+    """A cache backend whose lookups hold the calling thread."""
+
+    def get(self, key):
+        time.sleep(BLOCKING_SECONDS)
+        return super().get(key)
+
+
+def longest_stall(coroutine) -> float:
+    """Run coroutine next to a ticker; return the longest the ticker waited past its interval."""
+
+    async def run() -> float:
+        stalls = [0.0]
+        task = asyncio.ensure_future(coroutine)
+        while not task.done():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            stalls.append(time.perf_counter() - start - TICK_SECONDS)
+        await task
+        return max(stalls)
+
+    return asyncio.run(run())
+
+
+def make_generator(**kwargs) -> RestaurantMenuGenerator:
+    return RestaurantMenuGenerator(key="unused", llm=FakeMenuLLM(first_token_latency=0, seconds_per_char=0),
+                                   **kwargs)
+
+
+def test_loop_stays_responsive_while_menu_is_saved(tmp_path):
+    deduplicator = MenuDeduplicator()
+    store = SlowStore(str(tmp_path / "menu_store.db"), deduplicator=deduplicator)
+    generator = make_generator(store=store, deduplicator=deduplicator)
+
+    stall = longest_stall(generator.agenerate_menu("Thai", ["Vegan"], 3))
+
+    assert stall < BLOCKING_SECONDS / 2
+    assert store.counts()['menus'] == 1
+
+
+def test_loop_stays_responsive_during_cache_lookup():
+    cache = MenuCache(SlowBackend())
+    generator = make_generator(cache=cache)
+
+    stall = longest_stall(generator.agenerate_menu("Thai", ["Vegan"], 3))
+
+    assert stall < BLOCKING_SECONDS / 2
+    assert cache.stats().misses == 1
+
+
+def test_async_cache_hit_returns_cached_menu():
+    generator = make_generator(cache=MenuCache(LRUCacheBackend()))
+    first = asyncio.run(generator.agenerate_menu("Thai", ["Vegan"], 3))
+    second = asyncio.run(generator.agenerate_menu("Thai", ["Vegan"], 3))
+
+    assert second == first
+    assert generator.cache.stats().hits == 1
@@ -0,0 +1,75 @@
+# test_menu_batch.py
+"""run_batch stops starting jobs once interrupted and resumes only matching work."""
+import json
+import threading
+import time
+
+import pytest
+
+from llm_backends import FakeMenuLLM
+from menu_batch import build_jobs, run_batch
+from menu_generator import RestaurantMenuGenerator
+
+
+class CountingGenerator(RestaurantMenuGenerator):
+    """Counts generate_menu calls; the call numbered interrupt_at raises KeyboardInterrupt."""
+
+    def __init__(self, interrupt_at=None, **kwargs):
+        super().__init__(key="unused", llm=FakeMenuLLM(), **kwargs)
+        self.interrupt_at = interrupt_at
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_menu(self, cuisine, diets, no_of_items=3):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(0.01)
+        if call == self.interrupt_at:
+            raise KeyboardInterrupt
+        return super().generate_menu(cuisine, diets, no_of_items)
+
+
+def records(path):
+    with open(path, encoding="utf-8") as output_file:
+        return [json.loads(line) for line in output_file]
+
+
+def jobs(count):
+    return build_jobs(cuisines=["Thai"], diet_options=["Vegan"], max_items=count)
+
+
+def test_interrupt_starts_no_further_jobs(tmp_path):
+    output = tmp_path / "menus.jsonl"
+    generator = CountingGenerator(interrupt_at=2)
+
+    with pytest.raises(KeyboardInterrupt):
+        run_batch(generator, jobs(10), str(output), workers=1)
+    # Give any job that was still queued the chance to (wrongly) start
+    time.sleep(0.2)
+
+    # The worker may have picked up the next job before the interrupt reached the main thread
+    assert generator.calls <= 3
+    assert len(records(output)) == 1
+
+
+def test_resume_skips_finished_jobs(tmp_path):
+    output = str(tmp_path / "menus.jsonl")
+    run_batch(CountingGenerator(), jobs(3), output, workers=2)
+
+    generator = CountingGenerator()
+    counts = run_batch(generator, jobs(4), output, workers=2)
+
+    assert counts == {'ok': 1, 'error': 0, 'skipped': 3}
+    assert generator.calls == 1
+
+
+def test_resume_reruns_jobs_finished_with_other_settings(tmp_path):
+    output = str(tmp_path / "menus.jsonl")
+    run_batch(CountingGenerator(strategy="sequential"), jobs(3), output, workers=2)
+
+    generator = CountingGenerator(strategy="single")
+    counts = run_batch(generator, jobs(3), output, workers=2)
+
+    assert counts == {'ok': 3, 'error': 0, 'skipped': 0}
+    assert generator.calls == 3
@@ -0,0 +1,81 @@
+# test_menu_cache.py
+"""Cache keys and entries of MenuCache as RestaurantMenuGenerator uses it."""
+import pytest
+
+from llm_backends import FakeMenuLLM
+from menu_cache import LRUCacheBackend, MenuCache, SQLiteCacheBackend, make_cache_key
+from menu_generator import MenuResponse, RestaurantMenuGenerator
+from menu_model import COMPACT_VERSION, encode_compact
+
+
+def make_generator(cache: MenuCache, **kwargs) -> RestaurantMenuGenerator:
+    return RestaurantMenuGenerator(key="unused", llm=FakeMenuLLM(first_token_latency=0, seconds_per_char=0),
+                                   cache=cache, **kwargs)
+
+
+def test_equivalent_requests_share_a_key():
+    assert make_cache_key(" Thai", ["Vegan", "Gluten-Free"], 3) == make_cache_key("thai", "gluten-free, vegan", 3)
+
+
+def test_same_settings_hit():
+    cache = MenuCache(LRUCacheBackend())
+    first = make_generator(cache).generate_menu("Thai", ["Vegan"], 3)
+    second = make_generator(cache).generate_menu("thai", "vegan", 3)
+
+    assert second == first
+    assert (cache.stats().hits, cache.stats().misses) == (1, 1)
+
+
+@pytest.mark.parametrize("settings", [
+    {'strategy': "single"},
+    {'strategy': "parallel"},
+    {'prompt_variant': "compact"},
+    {'prompt_variant': "json"},
+    {'description_words': 20},
+    {'limit_output_tokens': True},
+])
+def test_generators_with_other_settings_miss(settings):
+    cache = MenuCache(LRUCacheBackend())
+    make_generator(cache).generate_menu("Thai", ["Vegan"], 3)
+    other = make_generator(cache, **settings)
+    other.generate_menu("Thai", ["Vegan"], 3)
+
+    assert cache.stats().hits == 0
+    assert cache.stats().misses == 2
+    assert len(cache.backend) == 2
+
+
+def test_namespace_includes_the_model():
+    cache = MenuCache(LRUCacheBackend())
+    generator = make_generator(cache)
+
+    assert generator.cache_namespace.endswith("fake-menu:")
+    assert cache.key("Thai", ["Vegan"], 3, "a") != cache.key("Thai", ["Vegan"], 3, "b")
+    assert MenuCache(namespace="app").key("Thai", ["Vegan"], 3, "a").startswith("app/a|")
+
+
+@pytest.mark.parametrize("payload", [
+    encode_compact((COMPACT_VERSION + 1, "Thai", "The Copper Hearth", "**Appetizers**", [])).decode("utf-8"),
+    '{"cuisine": "Thai", "restaurant_name": ',
+    # A legacy JSON entry missing fields, and a payload that is not a menu at all
+    '{"cuisine": "Thai"}',
+    '42',
+])
+def test_unreadable_entries_miss_and_are_deleted(tmp_path, payload):
+    cache = MenuCache(SQLiteCacheBackend(str(tmp_path / "menu_cache.db")))
+    key = cache.key("Thai", ["Vegan"], 3)
+    cache.backend.set(key, payload)
+
+    assert cache.get("Thai", ["Vegan"], 3) is None
+    assert (cache.stats().hits, cache.stats().misses) == (0, 1)
+    assert cache.backend.get(key) is None
+
+
+def test_compact_entries_round_trip():
+    cache = MenuCache(LRUCacheBackend())
+    response = MenuResponse.from_sections("Thai", "The Copper Hearth", "**Appetizers**\n* Satay (Vegan): Grilled",
+                                          {'Appetizers': [{'name': "Satay", 'description': "Grilled",
+                                                           'dietary': ["Vegan"]}]})
+    cache.set("Thai", ["Vegan"], 3, response)
+
+    assert cache.get("Thai", ["Vegan"], 3) == response
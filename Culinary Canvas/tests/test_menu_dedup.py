@@ -0,0 +1,38 @@
+# test_menu_dedup.py
+"""Near-duplicate detection within a menu."""
+import pytest
+
+from menu_dedup import MenuDeduplicator
+
+
+def matches(first, second):
+    sections = {'Appetizers': [{'name': name, 'description': description, 'dietary': []}
+                               for name, description in (first, second)]}
+    return MenuDeduplicator().dedupe_sections(sections)[1]
+
+
+@pytest.mark.parametrize("first, second", [
+    (("House Paneer Tikka", "Paneer with mint chutney"), ("Paneer Tikka", "Paneer with fresh mint chutney")),
+    (("Mango Sorbet", "Served with toasted coconut"), ("Mango Sorbet", "Topped with toasted coconut")),
+])
+def test_boilerplate_words_do_not_hide_duplicates(first, second):
+    assert len(matches(first, second)) == 1
+
+
+@pytest.mark.parametrize("first, second", [
+    # The example this dedup stage was written for, on names alone
+    (("Falafel Bites", ""), ("Crispy Falafel Balls", "")),
+    (("Crispy Prawn", "Prawn with garlic"), ("Prawn Balls", "Prawn with garlic")),
+    (("Spring Rolls", ""), ("Crispy Spring Rolls", "")),
+])
+def test_form_word_variants_are_duplicates(first, second):
+    assert len(matches(first, second)) == 1
+
+
+@pytest.mark.parametrize("first, second", [
+    (("Chicken Tikka", "Grilled chicken with spices"), ("Chicken Curry", "Chicken in spiced gravy")),
+    (("Falafel Wrap", ""), ("Falafel Bowl", "")),
+    (("Mango Sorbet", ""), ("Mango Lassi", "")),
+])
+def test_different_dishes_stay_apart(first, second):
+    assert matches(first, second) == []
@@ -0,0 +1,44 @@
+# test_menu_export.py
+"""PdfWriter output has a consistent cross-reference table and an indirect /Info."""
+import io
+import re
+
+import pytest
+
+from llm_backends import FakeMenuLLM
+from menu_export import export_menus
+from menu_generator import RestaurantMenuGenerator
+
+
+def export_pdf(count: int) -> bytes:
+    generator = RestaurantMenuGenerator(key="unused", llm=FakeMenuLLM())
+    menus = [generator.generate_menu(cuisine, ["Vegan"], 3) for cuisine in ("Thai", "Italian")[:count]]
+    stream = io.BytesIO()
+    export_menus(menus, stream, "pdf", title="Spring (Menus)")
+    return stream.getvalue()
+
+
+def object_offsets(data: bytes) -> list:
+    startxref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    match = re.match(rb"xref\n0 (\d+)\n", data[startxref:])
+    table = data[startxref + match.end():]
+    return [int(table[index * 20:index * 20 + 10]) for index in range(int(match.group(1)))]
+
+
+@pytest.mark.parametrize("count", [0, 2])
+def test_xref_points_at_every_object(count):
+    data = export_pdf(count)
+    offsets = object_offsets(data)
+    for object_id, offset in enumerate(offsets[1:], start=1):
+        assert data[offset:].startswith(b"%d 0 obj\n" % object_id)
+
+
+def test_trailer_info_is_an_indirect_reference():
+    data = export_pdf(1)
+    trailer = re.search(rb"trailer\n<<(.*?)>>\nstartxref", data, re.DOTALL).group(1)
+    info_id = int(re.search(rb"/Info (\d+) 0 R", trailer).group(1))
+    assert b"<<" not in trailer
+
+    offset = object_offsets(data)[info_id]
+    info = data[offset:data.index(b"endobj", offset)]
+    assert info == b"%d 0 obj\n<< /Title (Spring \\(Menus\\)) >>\n" % info_id
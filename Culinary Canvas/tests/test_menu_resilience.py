@@ -0,0 +1,67 @@
+# test_menu_resilience.py
+"""Attempts that ResilientCaller gives up on are cancelled or closed, not left running."""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+import menu_resilience
+from menu_resilience import LLMTimeoutError, ResiliencePolicy, ResilientCaller
+
+
+class Stream:
+    """Stands in for an opened model stream."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+def caller(**policy) -> ResilientCaller:
+    return ResilientCaller(ResiliencePolicy(max_attempts=1, **policy))
+
+
+def test_overrunning_attempt_is_closed_when_it_answers():
+    stream = Stream("late")
+
+    def open_stream():
+        time.sleep(0.2)
+        return stream
+
+    with pytest.raises(LLMTimeoutError):
+        caller(timeout=0.05).call(open_stream, "menu")
+    assert stream.closed.wait(1)
+
+
+def test_losing_hedge_is_closed_and_winner_is_not():
+    first, hedge = Stream("first"), Stream("hedge")
+    calls = []
+
+    def open_stream():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.3)
+            return first
+        return hedge
+
+    assert caller(timeout=2, hedge_after=0.05).call(open_stream, "menu") is hedge
+    assert first.closed.wait(1)
+    assert not hedge.closed.is_set()
+
+
+def test_queued_attempt_is_cancelled(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(menu_resilience, "_EXECUTOR", executor)
+    release = threading.Event()
+    executor.submit(release.wait)
+    started = []
+
+    with pytest.raises(LLMTimeoutError):
+        caller(timeout=0.05).call(lambda: started.append(None), "menu")
+    release.set()
+    executor.shutdown(wait=True)
+    assert started == []
@@ -0,0 +1,66 @@
+# test_menu_response.py
+"""MenuResponse keeps the parsed blocks of its menu text instead of parsing it on every access."""
+import pickle
+
+import pytest
+
+from menu_generator import MenuResponse
+from menu_utils import MenuParser
+
+MENU = """**Appetizers**
+* Satay (Vegan): Grilled tofu skewers with peanut sauce
+
+**Desserts**
+* Mango Sticky Rice (Vegan, Gluten-Free): Coconut rice and ripe mango"""
+
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    calls = []
+    parse_blocks = MenuParser.parse_blocks
+
+    def counted(menu_text):
+        calls.append(menu_text)
+        return parse_blocks(menu_text)
+
+    monkeypatch.setattr(MenuParser, "parse_blocks", staticmethod(counted))
+    return calls
+
+
+def build() -> MenuResponse:
+    parsed = MenuParser.parse(MENU)
+    return MenuResponse.from_sections("Thai", "The Copper Hearth", MENU, parsed.sections,
+                                      parsed_menu=parsed.parsed_menu)
+
+
+def test_parser_blocks_are_kept(parse_calls):
+    response = build()
+
+    assert response.parsed_menu == MenuParser.parse(MENU).parsed_menu
+    assert response.parsed_menu == response.parsed_menu
+    assert parse_calls == []
+
+
+def test_decoded_response_parses_once(parse_calls):
+    response = MenuResponse.from_bytes(build().to_bytes())
+    assert parse_calls == []
+
+    for _ in range(3):
+        assert response.parsed_menu == MenuParser.parse(MENU).parsed_menu
+    assert len(parse_calls) == 1
+
+
+def test_blocks_do_not_affect_equality_or_pickling():
+    response = build()
+    decoded = MenuResponse.from_bytes(response.to_bytes())
+
+    assert decoded == response
+    assert hash(decoded) == hash(response)
+    assert pickle.loads(pickle.dumps(response)).parsed_menu == response.parsed_menu
+
+
+def test_parsed_menu_copies_cannot_change_the_response():
+    response = build()
+    response.parsed_menu[0][1].append("* Extra")
+
+    assert "* Extra" not in response.parsed_menu[0][1]
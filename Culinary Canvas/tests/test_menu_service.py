@@ -0,0 +1,59 @@
+# test_menu_service.py
+"""HTTP status codes of the service: 422 for bad requests, 502 for bad model output."""
+import asyncio
+
+import httpx
+import pytest
+
+import menu_service
+from llm_backends import FakeMenuLLM
+from menu_generator import RestaurantMenuGenerator
+
+
+class EmptyOutputGenerator(RestaurantMenuGenerator):
+    """Fails the way generation does when the model answers with nothing usable."""
+
+    async def agenerate_menu(self, cuisine, diets, no_of_items=3):
+        raise ValueError("Menu string cannot be empty")
+
+    def stream_menu(self, cuisine, diets, no_of_items=3):
+        raise ValueError("Menu string cannot be empty")
+
+
+def post(generator, path, body):
+    app = menu_service.create_app(generator)
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(path, json=body)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("body", [
+    {'cuisine': "", 'diets': ["Vegan"]},
+    {'cuisine': "Thai", 'diets': []},
+    {'cuisine': "Thai", 'diets': " "},
+    {'cuisine': "Thai", 'diets': ["Vegan"], 'no_of_items': 0},
+])
+@pytest.mark.parametrize("path", ["/menus", "/menus/stream"])
+def test_bad_requests_are_422(path, body):
+    generator = RestaurantMenuGenerator(key="unused", llm=FakeMenuLLM())
+    assert post(generator, path, body).status_code == 422
+
+
+@pytest.mark.parametrize("path", ["/menus", "/menus/stream"])
+def test_unusable_model_output_is_502(path):
+    generator = EmptyOutputGenerator(key="unused", llm=FakeMenuLLM())
+    response = post(generator, path, {'cuisine': "Thai", 'diets': ["Vegan"], 'no_of_items': 3})
+    assert response.status_code == 502
+    assert "Menu string" not in response.json()['detail']
+
+
+def test_good_request_is_served():
+    generator = RestaurantMenuGenerator(key="unused", llm=FakeMenuLLM())
+    response = post(generator, "/menus", {'cuisine': "Thai", 'diets': ["Vegan"], 'no_of_items': 2})
+    assert response.status_code == 200
+    assert set(response.json()['sections']) == {"Appetizers", "Main Courses", "Desserts"}
@@ -0,0 +1,66 @@
+# test_menu_store.py
+"""The in-memory duplicate index of MenuStore follows what is committed to the database."""
+import pytest
+
+from menu_dedup import MenuDeduplicator
+from menu_generator import MenuResponse
+from menu_store import MenuStore
+
+
+def menu(name: str, *items) -> MenuResponse:
+    dishes = [{'name': dish, 'description': description, 'dietary': ["Vegan"]} for dish, description in items]
+    text = "**Appetizers**\n" + "\n".join(f"* {dish} (Vegan): {description}" for dish, description in items)
+    return MenuResponse.from_sections("Thai", name, text, {'Appetizers': dishes})
+
+
+class Unsaveable(MenuResponse):
+    """A response that fails part way through a save, after the menus before it were written."""
+
+    def content_hash(self) -> str:
+        raise RuntimeError("disk full")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MenuStore(str(tmp_path / "menu_store.db"), deduplicator=MenuDeduplicator())
+    yield store
+    store.close()
+
+
+def indexed_ids(store: MenuStore):
+    rows = store._conn.execute("SELECT item_id FROM item_vectors ORDER BY item_id").fetchall()
+    index = store._load_duplicate_index()
+    return [index.id_at(row) for row in range(len(index))], [row[0] for row in rows]
+
+
+def test_committed_items_join_the_index(store):
+    store.save(menu("Lotus", ("Satay", "Grilled tofu skewers"), ("Spring Rolls", "Rice paper and herbs")))
+    store.save(menu("Orchid", ("Tofu Satay", "Grilled tofu skewers"), ("Papaya Salad", "Green papaya")))
+
+    in_memory, committed = indexed_ids(store)
+    assert in_memory == committed
+    assert len(store.duplicates()) == 1
+
+
+def test_rolled_back_items_stay_out_of_the_index(store):
+    store.save(menu("Lotus", ("Satay", "Grilled tofu skewers")))
+    failing = Unsaveable.from_sections("Thai", "Broken", "**Appetizers**", {'Appetizers': []})
+    with pytest.raises(RuntimeError):
+        store.save_many([menu("Orchid", ("Papaya Salad", "Green papaya with lime")), failing])
+
+    in_memory, committed = indexed_ids(store)
+    assert in_memory == committed
+    # Saving the rolled-back dish for real finds no duplicate of an item that was never stored
+    store.save(menu("Orchid", ("Papaya Salad", "Green papaya with lime")))
+    assert store.duplicates() == []
+
+
+def test_rebuild_matches_incremental_saves(store):
+    store.save(menu("Lotus", ("Satay", "Grilled tofu skewers"), ("Spring Rolls", "Rice paper and herbs")))
+    store.save(menu("Orchid", ("Tofu Satay", "Grilled tofu skewers")))
+    before = [(duplicate.id, canonical.id) for duplicate, canonical, _ in store.duplicates()]
+
+    assert store.rebuild_duplicates() == 1
+    assert [(duplicate.id, canonical.id) for duplicate, canonical, _ in store.duplicates()] == before
+    in_memory, committed = indexed_ids(store)
+    assert in_memory == committed
@@ -0,0 +1,84 @@
+# test_parallel_sections.py
+"""The parallel strategy stops the other section calls once a menu cannot be finished."""
+from collections import Counter
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_backends import FakeMenuLLM
+from menu_generator import RestaurantMenuGenerator
+from menu_resilience import ResiliencePolicy
+
+ATTEMPT_SECONDS = 0.02
+
+# Section calls made per section, over the FakeMenuLLM below
+attempts = Counter()
+attempts_lock = threading.Lock()
+
+
+class FlakyMenuLLM(FakeMenuLLM):
+    """Desserts are rejected outright; Main Courses keeps failing with a retryable error."""
+
+    def _answer(self, messages, max_tokens=None):
+        prompt = messages[-1].content
+        for section in ("Main Courses", "Desserts"):
+            if f"only the {section} section" in prompt:
+                with attempts_lock:
+                    attempts[section] += 1
+                time.sleep(ATTEMPT_SECONDS)
+                if section == "Desserts":
+                    raise ValueError("Rejected prompt")
+                raise ConnectionError("Simulated LLM backend failure")
+        return super()._answer(messages, max_tokens)
+
+
+@pytest.fixture
+def generator():
+    attempts.clear()
+    policy = ResiliencePolicy(timeout=None, max_attempts=50, backoff_initial=0.01, backoff_max=0.02,
+                              total_timeout=None, failure_threshold=1000)
+    return RestaurantMenuGenerator(key="unused", llm=FlakyMenuLLM(), strategy="parallel", resilience=policy)
+
+
+def settled_attempts(section: str) -> int:
+    """Attempts for section once any call still in flight has had time to end."""
+    time.sleep(ATTEMPT_SECONDS * 10)
+    return attempts[section]
+
+
+def test_failed_section_stops_its_siblings(generator):
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match="Rejected prompt"):
+        generator.generate_menu("Thai", ["Vegan"], 3)
+
+    # Raised as soon as Desserts failed, not after Main Courses ran out of attempts
+    assert time.perf_counter() - start < ATTEMPT_SECONDS * 20
+    count = settled_attempts("Main Courses")
+    assert count < 50
+    assert settled_attempts("Main Courses") == count
+
+
+def test_async_failed_section_cancels_its_siblings(generator):
+    async def run():
+        with pytest.raises(ValueError, match="Rejected prompt"):
+            await generator.agenerate_menu("Thai", ["Vegan"], 3)
+        # Keep the loop going; asyncio.run would cancel leftover tasks when it returns
+        await asyncio.sleep(ATTEMPT_SECONDS * 10)
+        count = attempts["Main Courses"]
+        await asyncio.sleep(ATTEMPT_SECONDS * 10)
+        return count
+
+    count = asyncio.run(run())
+    assert count < 50
+    assert attempts["Main Courses"] == count
+
+
+def test_closing_stream_stops_background_sections(generator):
+    menu_stream = generator.stream_menu("Thai", ["Vegan"], 3)
+    menu_stream.close()
+
+    count = settled_attempts("Main Courses")
+    assert count < 50
+    assert settled_attempts("Main Courses") == count
@@ -0,0 +1,76 @@
+# test_parser_parity.py
+"""
+MenuParser.parse, parse_blocks and MenuStreamParser agree with the frozen
+legacy parsers in benchmarks/parser_parity.py, on the corpus and on menus
+generated with the formatting drift models produce.
+"""
+import glob
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "benchmarks"))
+
+from parser_parity import CORPUS_DIR, check  # noqa: E402
+
+GENERATED_MENUS = 300
+
+HEADINGS = ["**{}**", "{}", "**{}:**", "{}:", "## {}", "**{} (3 items)**", "🍽️ {}", "  **{}**  "]
+BULLETS = ["* ", "*   ", "- ", "", "• ", "**"]
+NAMES = ["Paneer Tikka", "Garden Bruschetta", "Miso Ramen", "Churros", "Pad Thai", "Tiramisu"]
+TAGS = ["", " (Vegan)", " (Vegetarian, Gluten-Free)", " (Nut-Free)", " (Spicy)", " (vegan, dairy free)"]
+DESCRIPTIONS = ["Grilled with spices.", "Made with basil, garlic and lemon", "A: classic", ""]
+PREAMBLES = ["", "Here is your menu:\n\n", "Restaurant Name: The Copper Hearth\n\n", "🍽️ Menu\n"]
+
+
+def generated_menu(rng: random.Random) -> str:
+    sections = ["Appetizers", "Main Courses", "Desserts"]
+    if rng.random() < 0.2:
+        sections.insert(rng.randrange(4), "Drinks")
+    if rng.random() < 0.2:
+        rng.shuffle(sections)
+    blocks = []
+    for section in sections:
+        lines = [rng.choice(HEADINGS).format(section)]
+        for _ in range(rng.randint(0, 4)):
+            name = rng.choice(NAMES)
+            if rng.random() < 0.3:
+                name = f"**{name}**"
+            item = rng.choice(BULLETS) + name + rng.choice(TAGS)
+            description = rng.choice(DESCRIPTIONS)
+            if rng.random() < 0.2:
+                lines += [item + ":", "  " + description]
+            elif rng.random() < 0.1:
+                lines.append(item)
+            else:
+                lines.append(f"{item}: {description}")
+            if rng.random() < 0.15:
+                lines.append("")
+        blocks.append("\n".join(lines))
+    text = rng.choice(PREAMBLES) + rng.choice(["\n\n", "\n", "\n\n\n"]).join(blocks)
+    if rng.random() < 0.3:
+        text = text.replace("\n", "\r\n")
+    if rng.random() < 0.3:
+        text += rng.choice(["\n", "\n\n", "  \n", "\nEnjoy your meal!"])
+    return text
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(CORPUS_DIR, "*.txt"))),
+                         ids=os.path.basename)
+def test_corpus_menu_matches_legacy(path):
+    with open(path, encoding="utf-8", newline="") as menu_file:
+        menu_text = menu_file.read()
+    assert check(menu_text, random.Random(path)) == []
+
+
+def test_corpus_is_not_empty():
+    assert glob.glob(os.path.join(CORPUS_DIR, "*.txt"))
+
+
+@pytest.mark.parametrize("seed", range(GENERATED_MENUS))
+def test_generated_menu_matches_legacy(seed):
+    rng = random.Random(seed)
+    menu_text = generated_menu(rng)
+    assert check(menu_text, rng, chunk_trials=5) == [], menu_text